@@ -0,0 +1,68 @@
+"""
+Benchmark of the throughput of `get_credentials`, which runs on every authenticated request.
+
+Calls the dependency directly with a fresh PoP header each time, and also compares computing the
+PoP from scratch with `generate_pop` against copying the pre-keyed state of a `PoPVerifier`.
+
+Usage: `python benchmarks/bench_get_credentials.py [--number N]`
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import timeit
+from datetime import datetime, timezone
+
+from Crypto.Random import get_random_bytes
+from fastapi import Request
+from fastapi.security import HTTPAuthorizationCredentials
+
+from excalibur_server.api.cache import MASTER_KEYS_CACHE
+from excalibur_server.src.auth.credentials import generate_auth_token, get_credentials
+from excalibur_server.src.auth.pop import PoPVerifier, generate_pop, generate_pop_header
+
+UUID = "bench-credentials"
+PATH = "/api/auth/pop-demo"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", "-n", type=int, default=20_000, help="Number of simulated requests")
+    args = parser.parse_args()
+
+    os.environ["EXCALIBUR_SERVER_HMAC_ENABLED"] = "true"
+
+    key = get_random_bytes(32)
+    MASTER_KEYS_CACHE[UUID] = key
+    token = generate_auth_token("bench", UUID, datetime.now(tz=timezone.utc).timestamp() + 3600)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    # Headers are generated up front, since each nonce may only be used once
+    timestamp = int(time.time())
+    headers = iter(
+        [generate_pop_header(key, "GET", PATH, timestamp, get_random_bytes(16)) for _ in range(args.number * 5 + 1)]
+    )
+
+    async def call():
+        scope = {"type": "http", "method": "GET", "path": PATH, "query_string": b"", "headers": []}
+        await get_credentials(Request(scope), next(headers), credentials)
+
+    loop = asyncio.new_event_loop()
+    nonce = get_random_bytes(16)
+    verifier = PoPVerifier(key)
+    cases = {
+        "generate_pop()": lambda: generate_pop(key, "GET", PATH, timestamp, nonce),
+        "PoPVerifier.verify()": lambda: verifier.verify("GET", PATH, timestamp, nonce, b"\x00" * 32),
+        "get_credentials()": lambda: loop.run_until_complete(call()),
+    }
+
+    print(f"{args.number} requests")
+    for name, fn in cases.items():
+        per_request = min(timeit.repeat(fn, number=args.number, repeat=5)) / args.number
+        print(f"  {name:<24} {per_request * 1e6:8.2f} µs/request   {1 / per_request:10.0f} requests/s")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
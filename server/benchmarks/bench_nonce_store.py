@@ -0,0 +1,52 @@
+"""
+Benchmark of the PoP nonce store at a sustained request rate.
+
+Simulates a steady stream of requests with fresh nonces for a number of seconds, reporting the
+throughput of `NonceStore.add` and the peak memory used, with plain nonces and with fingerprints.
+
+Usage: `python benchmarks/bench_nonce_store.py [--rate N] [--validity SECONDS] [--seconds N]`
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from excalibur_server.src.auth.nonces import NonceStore
+
+
+def _run(compact: bool, args: argparse.Namespace) -> tuple[float, int, int]:
+    store = NonceStore(validity=args.validity, max_nonces=args.rate * (2 * args.validity + 1), compact=compact)
+    tracemalloc.start()
+    elapsed = 0.0
+    for second in range(args.seconds):
+        nonces = [os.urandom(16) for _ in range(args.rate)]  # Allocated while tracing, as the server would
+        start = time.perf_counter()
+        for nonce in nonces:
+            store.add(nonce, second, now=second)
+        elapsed += time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak, len(store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", "-r", type=int, default=10_000, help="Requests per second")
+    parser.add_argument("--validity", "-v", type=int, default=60, help="Timestamp validity, in seconds")
+    parser.add_argument("--seconds", "-s", type=int, default=90, help="Number of seconds to simulate")
+    args = parser.parse_args()
+
+    print(f"{args.rate} requests/s for {args.seconds} s, with {args.validity} s timestamp validity")
+    for name, compact in {"Nonces": False, "Fingerprints": True}.items():
+        elapsed, peak, held = _run(compact, args)
+        total = args.rate * args.seconds
+        print(
+            f"  {name:<14} {total / elapsed:10.0f} adds/s   "
+            f"peak {peak / 2**20:7.1f} MiB ({peak / held:5.1f} B/nonce)   {held} nonces held"
+        )
+
+
+if __name__ == "__main__":
+    main()
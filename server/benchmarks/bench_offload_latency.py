@@ -0,0 +1,124 @@
+"""
+Benchmark of the latency of small encrypted requests while large encrypted downloads are running.
+
+Drives the encryption handler directly on one event loop: a number of downloads stream large
+bodies in big chunks, while small requests are issued at a steady rate. The p50 and p99 latencies
+of the small requests are reported with and without offloading large chunks to the thread pool.
+
+Usage: `python benchmarks/bench_offload_latency.py [--downloads N] [--chunk BYTES] [--requests N]`
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timezone
+
+from Crypto.Random import get_random_bytes
+
+from excalibur_server.api.cache import MASTER_KEYS_CACHE
+from excalibur_server.src.auth.credentials import generate_auth_token
+from excalibur_server.src.middleware.crypto.middleware import EncryptionHandler
+from excalibur_server.src.middleware.crypto.offload import CryptoOffloader
+from excalibur_server.src.middleware.crypto.structures import EncryptedRoute
+
+UUID = "bench-offload"
+
+
+def _make_scope(token: str) -> dict:
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    }
+
+
+def _make_app(body: bytes, chunks: int):
+    async def app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-length", b"%d" % (len(body) * chunks))],
+            }
+        )
+        for i in range(chunks):
+            await send({"type": "http.response.body", "body": body, "more_body": i < chunks - 1})
+
+    return app
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    await asyncio.sleep(0)  # Stands in for the socket write, which yields to the event loop
+
+
+async def _run(offloader: CryptoOffloader, token: str, args: argparse.Namespace) -> list[float]:
+    route = EncryptedRoute()
+    download_app = _make_app(get_random_bytes(args.chunk), args.chunks)
+    small_app = _make_app(get_random_bytes(args.small), 1)
+
+    stop = asyncio.Event()
+
+    async def download():
+        while not stop.is_set():
+            await EncryptionHandler(download_app, route, True, offloader)(_make_scope(token), _receive, _send)
+
+    async def small() -> float:
+        start = time.perf_counter()
+        await EncryptionHandler(small_app, route, True, offloader)(_make_scope(token), _receive, _send)
+        return time.perf_counter() - start
+
+    downloads = [asyncio.create_task(download()) for _ in range(args.downloads)]
+    await asyncio.sleep(0.05)  # Let the downloads get going
+
+    tasks = []
+    for _ in range(args.requests):
+        tasks.append(asyncio.create_task(small()))
+        await asyncio.sleep(args.interval / 1000)
+    latencies = await asyncio.gather(*tasks)
+
+    stop.set()
+    await asyncio.gather(*downloads)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--downloads", "-d", type=int, default=4, help="Number of concurrent downloads")
+    parser.add_argument("--chunk", "-c", type=int, default=1_048_576, help="Size of each download chunk, in bytes")
+    parser.add_argument("--chunks", type=int, default=16, help="Number of chunks in each download")
+    parser.add_argument("--small", type=int, default=256, help="Size of each small response, in bytes")
+    parser.add_argument("--requests", "-n", type=int, default=500, help="Number of small requests")
+    parser.add_argument("--interval", type=float, default=2, help="Time between small requests, in milliseconds")
+    parser.add_argument("--workers", "-w", type=int, default=4, help="Number of offload threads")
+    parser.add_argument("--threshold", type=int, default=65536, help="Offload threshold, in bytes")
+    args = parser.parse_args()
+
+    MASTER_KEYS_CACHE[UUID] = get_random_bytes(32)
+    token = generate_auth_token("bench", UUID, datetime.now(tz=timezone.utc).timestamp() + 3600)
+
+    cases = {
+        "Inline": CryptoOffloader(0, args.threshold),
+        f"Offloaded ({args.workers} threads)": CryptoOffloader(args.workers, args.threshold),
+    }
+
+    print(
+        f"{args.requests} small requests of {args.small} bytes during {args.downloads} downloads "
+        f"of {args.chunks} x {args.chunk}-byte chunks"
+    )
+    for name, offloader in cases.items():
+        latencies = sorted(asyncio.run(_run(offloader, token, args)))
+        offloader.shutdown()
+
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        print(f"  {name:<24} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
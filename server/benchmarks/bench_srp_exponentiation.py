@@ -0,0 +1,55 @@
+"""
+Benchmark of the server's SRP exponentiations for each group.
+
+Times the computation of the server public value `B = k*v + g^b mod N` with plain `pow()`, with the
+group's fixed-base table, and with a filled ephemeral pool, as well as the time to build the table.
+
+Usage: `python benchmarks/bench_srp_exponentiation.py [--number N]`
+"""
+
+import argparse
+import time
+import timeit
+
+from Crypto.Random.random import getrandbits
+
+from excalibur_server.src.auth.srp import SRP, EphemeralPool, SRPGroup
+from excalibur_server.src.auth.srp.fixed_base import FixedBaseTable
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", "-n", type=int, default=200, help="Number of computations to time")
+    args = parser.parse_args()
+
+    for group in SRPGroup:
+        start = time.perf_counter()
+        FixedBaseTable(group.generator, group.prime)
+        build_time = time.perf_counter() - start
+
+        verifier = pow(group.generator, getrandbits(256), group.prime)
+        group.build_fixed_base()  # Outside of the timings
+
+        def plain():
+            private_value = getrandbits(256)
+            return (group.multiplier * verifier + pow(group.generator, private_value, group.prime)) % group.prime
+
+        fixed_base = SRP(group)
+        pool = EphemeralPool(group, args.number)
+        pool.fill()
+        pooled = SRP(group, pool=pool)
+
+        cases = {
+            "pow()": plain,
+            "Fixed-base table": lambda: fixed_base.compute_server_public_value(verifier),
+            "Ephemeral pool": lambda: pooled.compute_server_public_value(verifier),
+        }
+
+        print(f"{group.name} ({group.bits} bits), table built in {build_time * 1000:.1f} ms")
+        for name, fn in cases.items():
+            per_call = timeit.timeit(fn, number=args.number) / args.number
+            print(f"  {name:<18} {per_call * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Load test of SRP handshakes against transfer latency on the same worker.
+
+Runs a number of concurrent login handshakes with the 2048-bit SRP group (the server public value
+and pre-master secret computations), while small encrypted requests are issued at a steady rate on
+the same event loop. Reports the p50 and p99 latencies of the small requests and the time taken by
+the handshakes, with the SRP computations done inline and in the SRP process pool.
+
+Usage: `python benchmarks/bench_srp_load.py [--handshakes N] [--workers N] [--requests N]`
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timezone
+
+from Crypto.Random import get_random_bytes
+from Crypto.Random.random import getrandbits
+
+from excalibur_server.api.cache import MASTER_KEYS_CACHE
+from excalibur_server.src.auth.credentials import generate_auth_token
+from excalibur_server.src.auth.srp import SRP, SRPGroup, SRPWorkers
+from excalibur_server.src.middleware.crypto.middleware import EncryptionHandler
+from excalibur_server.src.middleware.crypto.offload import CryptoOffloader
+from excalibur_server.src.middleware.crypto.structures import EncryptedRoute
+
+UUID = "bench-srp-load"
+GROUP = SRPGroup.LARGE
+
+
+def _make_scope(token: str) -> dict:
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    }
+
+
+async def _small_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"256")]})
+    await send({"type": "http.response.body", "body": bytes(256), "more_body": False})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    await asyncio.sleep(0)
+
+
+async def _handshake(workers: SRPWorkers, srp_handler: SRP, verifier: int):
+    a_pub = pow(GROUP.generator, getrandbits(256), GROUP.prime)
+    b_priv, b_pub = await workers.compute_server_public_value(srp_handler, verifier)
+    u = srp_handler.compute_u(a_pub, b_pub)
+    await workers.compute_premaster_secret(srp_handler, a_pub, b_priv, u, verifier)
+
+
+async def _run(workers: SRPWorkers, token: str, args: argparse.Namespace) -> tuple[list[float], float]:
+    srp_handler = SRP(GROUP)
+    verifier = srp_handler.compute_verifier(getrandbits(256))
+    route = EncryptedRoute()
+    offloader = CryptoOffloader(0, 0)
+
+    async def small(arrival: float) -> float:
+        await EncryptionHandler(_small_app, route, True, offloader)(_make_scope(token), _receive, _send)
+        return time.perf_counter() - arrival
+
+    async def handshakes() -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(_handshake(workers, srp_handler, verifier) for _ in range(args.handshakes)))
+        return time.perf_counter() - start
+
+    handshakes_task = asyncio.create_task(handshakes())
+    tasks = []
+    first = time.perf_counter()
+    for i in range(args.requests):
+        # Requests arrive on a fixed schedule, so time spent blocked counts against the late ones
+        arrival = first + i * args.interval / 1000
+        await asyncio.sleep(max(0, arrival - time.perf_counter()))
+        tasks.append(asyncio.create_task(small(arrival)))
+    latencies = await asyncio.gather(*tasks)
+    return latencies, await handshakes_task
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--handshakes", "-n", type=int, default=200, help="Number of concurrent handshakes")
+    parser.add_argument("--workers", "-w", type=int, default=2, help="Number of SRP processes")
+    parser.add_argument("--pending", type=int, default=16, help="Most SRP computations handed to the pool at once")
+    parser.add_argument("--requests", "-r", type=int, default=300, help="Number of small requests")
+    parser.add_argument("--interval", type=float, default=2, help="Time between small requests, in milliseconds")
+    args = parser.parse_args()
+
+    MASTER_KEYS_CACHE[UUID] = get_random_bytes(32)
+    token = generate_auth_token("bench", UUID, datetime.now(tz=timezone.utc).timestamp() + 3600)
+
+    pooled = SRPWorkers(args.workers, args.pending, 3600)
+    asyncio.run(pooled.compute_premaster_secret(SRP(GROUP), 2, 2, 2, 2))  # Start the processes beforehand
+    cases = {"Inline": SRPWorkers(0, 0, 0), f"Process pool ({args.workers} processes)": pooled}
+
+    print(f"{args.handshakes} concurrent {GROUP.bits}-bit handshakes during {args.requests} small requests")
+    for name, workers in cases.items():
+        latencies, handshake_time = asyncio.run(_run(workers, token, args))
+        workers.shutdown()
+
+        latencies = sorted(latencies)
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        print(f"  {name:<28} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms   handshakes {handshake_time:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
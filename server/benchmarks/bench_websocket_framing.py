@@ -0,0 +1,49 @@
+"""
+Benchmark of the WebSocket message framings used in the SRP handshake.
+
+Compares the size of each handshake message, and the time to encode and decode it, with JSON (and
+base64 for binary data) against binary frames.
+
+Usage: `python benchmarks/bench_websocket_framing.py [--number N]`
+"""
+
+import argparse
+import json
+import timeit
+
+from Crypto.Random import get_random_bytes
+
+from excalibur_server.src.auth.srp import SRPGroup
+from excalibur_server.src.websocket import WebSocketMsg
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", "-n", type=int, default=100000, help="Number of messages to time")
+    args = parser.parse_args()
+
+    group = SRPGroup.LARGE
+    messages = {
+        f"A/B ({group.bits} bits)": WebSocketMsg(get_random_bytes(group.bits // 8), "OK"),
+        "M1/M2": WebSocketMsg(get_random_bytes(32), "OK"),
+        "Auth token": WebSocketMsg(get_random_bytes(16 + 250 + 16), "OK"),
+        "Status": WebSocketMsg("U is OK", "OK"),
+    }
+
+    print(f"{'Message':<20} {'JSON':>8} {'Binary':>8} {'Saved':>6}   {'JSON time':>10} {'Binary time':>12}")
+    for name, msg in messages.items():
+        json_data = json.dumps(msg.serialize()).encode("utf-8")
+        frame = msg.to_frame()
+
+        json_time = timeit.timeit(lambda: WebSocketMsg(**json.loads(json.dumps(msg.serialize()))), number=args.number)
+        frame_time = timeit.timeit(lambda: WebSocketMsg.from_frame(msg.to_frame()), number=args.number)
+
+        saved = 1 - len(frame) / len(json_data)
+        print(
+            f"{name:<20} {len(json_data):>6} B {len(frame):>6} B {saved:>6.0%}   "
+            f"{json_time / args.number * 1e6:>7.2f} µs {frame_time / args.number * 1e6:>9.2f} µs"
+        )
+
+
+if __name__ == "__main__":
+    main()
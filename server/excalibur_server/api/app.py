@@ -1,8 +1,11 @@
+import asyncio
 import logging
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import APIRouter, FastAPI
 
+from excalibur_server.api.cache import EPHEMERAL_POOL, SESSION_PERSISTER, SRP_WORKERS
 from excalibur_server.api.middlewares import add_middleware
 from excalibur_server.api.pwa import setup_pwa
 from excalibur_server.meta import SUMMARY, TITLE, VERSION
@@ -22,8 +25,31 @@ if os.getenv("EXCALIBUR_SERVER_ENCRYPT_RESPONSES") == "0":
 if os.getenv("EXCALIBUR_SERVER_ENABLE_CORS") == "0":
     logger.warning("CORS is disabled. This is not recommended for production.")
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """
+    Prepares the SRP precomputations on startup, and saves the sessions periodically and on
+    shutdown, if session persistence is enabled.
+    """
+
+    EPHEMERAL_POOL.group.build_fixed_base()  # Now rather than during the first login
+    EPHEMERAL_POOL.start()
+
+    task = None if SESSION_PERSISTER is None else asyncio.create_task(SESSION_PERSISTER.run())
+    try:
+        yield
+    finally:
+        SRP_WORKERS.shutdown()
+        if task is not None:
+            task.cancel()
+            SESSION_PERSISTER.save()
+            logger.info("Saved the sessions.")
+
+
 # Define app
 app = FastAPI(
+    lifespan=lifespan,
     title=TITLE,
     summary=SUMMARY,
     version=VERSION,
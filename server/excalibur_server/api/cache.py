@@ -1,12 +1,41 @@
-from cachetools import TTLCache
+import time
+from typing import MutableMapping
 
+from cachetools import TLRUCache, TTLCache
+
+from excalibur_server.src.auth.pop import PoPVerifier
+from excalibur_server.src.auth.srp import EphemeralPool, SRPWorkers
 from excalibur_server.src.config import CONFIG
+from excalibur_server.src.sessions import SessionSealer, open_session_persister, open_session_store
 
-MASTER_KEYS_CACHE: dict[str, bytes] = TTLCache(
+SESSION_STORE = open_session_store(CONFIG.security)
+"Store of login sessions and PoP nonces, which may be shared between processes"
+SESSION_PERSISTER = open_session_persister(CONFIG.security, SESSION_STORE)
+"Keeper of the in-memory sessions across restarts, if enabled"
+MASTER_KEYS_CACHE: MutableMapping[str, bytes] = SESSION_STORE.master_keys
+"Cache of master keys for UUIDs, used for authentication"
+SESSION_SEALER = SessionSealer(
+    SESSION_STORE, CONFIG.security.sessions.sealing_key_rotation, CONFIG.security.session_duration
+)
+"Sealer of master keys that are carried inside auth tokens, for stateless sessions"
+HANDSHAKE_SEALER = SessionSealer(
+    SESSION_STORE,
+    CONFIG.security.sessions.sealing_key_rotation,
+    CONFIG.security.pop.timestamp_validity,
+    key_prefix="handshake_key/",
+)
+"Sealer of the server state of HTTP login handshakes, which the client carries between requests"
+POP_VERIFIERS_CACHE: dict[str, PoPVerifier] = TTLCache(
     maxsize=CONFIG.security.e2ee.comm_cache_size, ttl=CONFIG.security.session_duration
 )
-"Cache of master keys for UUIDs, used for authentication"
-POP_NONCE_CACHE: dict[bytes, bool] = TTLCache(
-    maxsize=CONFIG.security.pop.nonce_cache_size, ttl=CONFIG.security.pop.timestamp_validity
+"Cache of session-scoped PoP verifiers for UUIDs"
+VERIFIED_TOKENS_CACHE: dict[bytes, tuple[dict, float]] = TLRUCache(
+    maxsize=CONFIG.security.token_cache_size, ttu=lambda _digest, value, _now: value[1], timer=time.time
+)
+"Cache of the claims and expiry timestamps of verified tokens, keyed by token digest; entries expire with their tokens"
+EPHEMERAL_POOL = EphemeralPool(CONFIG.security.srp.group, CONFIG.security.srp.ephemeral_pool_size)
+"Pool of pre-generated server ephemeral values for the configured SRP group"
+SRP_WORKERS = SRPWorkers(
+    CONFIG.security.srp.workers, CONFIG.security.srp.max_pending, CONFIG.security.srp.queue_timeout
 )
-"Cache of nonces for PoP validation"
+"Process pool for the SRP computations of logins"
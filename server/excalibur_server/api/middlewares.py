@@ -46,9 +46,17 @@ def add_middleware(app: FastAPI, logger: logging.Logger):
     from excalibur_server.src.middleware.crypto.middleware import RouteEncryptionMiddleware
 
     app.add_middleware(
-        RouteEncryptionMiddleware, encrypt_response=os.environ.get("EXCALIBUR_SERVER_ENCRYPT_RESPONSES", "1") != "0"
+        RouteEncryptionMiddleware,
+        routes=app.routes,
+        encrypt_response=os.environ.get("EXCALIBUR_SERVER_ENCRYPT_RESPONSES", "1") != "0",
     )
 
+    # Answer with a 503 when a request times out waiting for a busy resource (e.g., the session store).
+    # This must wrap the encryption middleware, which looks up the session of each request.
+    from excalibur_server.src.middleware import ServerBusyMiddleware
+
+    app.add_middleware(ServerBusyMiddleware)
+
     # Add a file size limit middleware
     from excalibur_server.src.middleware import LimitUploadSizeMiddleware
 
@@ -6,13 +6,19 @@ from excalibur_server.api.misc import is_debug
 router = APIRouter(tags=["auth"])
 
 from .comms import comms_endpoint as comms_endpoint
+from .comms import comms_v2_endpoint as comms_v2_endpoint
+from .handshake import finish_handshake_endpoint as finish_handshake_endpoint
+from .handshake import start_handshake_endpoint as start_handshake_endpoint
 from .info import get_group_size_endpoint as get_group_size_endpoint
+from .session import end_session_endpoint as end_session_endpoint
+from .session import refresh_session_endpoint as refresh_session_endpoint
 
 if is_debug():
     from .ack import get_account_creation_key as get_account_creation_key
     from .pop_demo import demo_get_endpoint as demo_get_endpoint
     from .pop_demo import demo_post_encrypted_endpoint as demo_post_encrypted_endpoint
     from .pop_demo import demo_post_endpoint as demo_post_endpoint
+    from .pop_demo import demo_stream_endpoint as demo_stream_endpoint
     from .util import get_token_endpoint as get_token_endpoint
 
 __all__ = ["router"]
@@ -1,22 +1,24 @@
 import json
 from base64 import b64encode
-from datetime import datetime, timezone
-from uuid import uuid4
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from Crypto.Cipher import AES
 from Crypto.Util.number import bytes_to_long, long_to_bytes
 from fastapi import WebSocket, WebSocketDisconnect
 
-from excalibur_server.api.cache import MASTER_KEYS_CACHE
+from excalibur_server.api.cache import EPHEMERAL_POOL, SRP_WORKERS
 from excalibur_server.api.logging import logger
 from excalibur_server.api.routes.auth import router
-from excalibur_server.src.auth.credentials import generate_auth_token
+from excalibur_server.src.auth.credentials import start_session
 from excalibur_server.src.auth.srp import SRP
-from excalibur_server.src.config import CONFIG
-from excalibur_server.src.users import User, get_user
+from excalibur_server.src.middleware.busy import SERVER_BUSY_MESSAGE
+from excalibur_server.src.users import get_user
 from excalibur_server.src.websocket import WebSocketManager, WebSocketMsg
 
+from .srp_values import get_b_priv, get_verifier
+
 MAX_ITER_COUNT = 3
+MALFORMED_MESSAGE = "Malformed message"
 
 
 @router.websocket("")
@@ -31,7 +33,7 @@ async def comms_endpoint(websocket: WebSocket):
     ws_manager = WebSocketManager(websocket)
 
     await ws_manager.accept()
-    try:
+    async with _handle_errors(ws_manager):
         # Get user details
         username = (await ws_manager.receive()).data
         user = get_user(username)
@@ -40,10 +42,10 @@ async def comms_endpoint(websocket: WebSocket):
             await ws_manager.close()
             return
 
-        srp_handler = SRP(user.srp_group)
+        srp_handler = SRP(user.srp_group, pool=EPHEMERAL_POOL if user.srp_group == EPHEMERAL_POOL.group else None)
 
         # Get verifier
-        verifier = _get_verifier(user)
+        verifier = get_verifier(user)
 
         # Send server's SRP group size
         await ws_manager.send(WebSocketMsg(str(srp_handler.bits), "OK"))
@@ -65,7 +67,7 @@ async def comms_endpoint(websocket: WebSocket):
         await ws_manager.send(WebSocketMsg("U is OK", "OK"))
 
         # Compute server's master value
-        premaster = srp_handler.compute_premaster_secret(a_pub, b_priv, u, verifier)
+        premaster = await SRP_WORKERS.compute_premaster_secret(srp_handler, a_pub, b_priv, u, verifier)
         master_server = srp_handler.premaster_to_master(premaster)
 
         # Verify client's M1
@@ -90,44 +92,119 @@ async def comms_endpoint(websocket: WebSocket):
             await ws_manager.close()
             return
 
-        # Add to the master key cache
-        uuid = uuid4().hex
-        MASTER_KEYS_CACHE[uuid] = master_server
-
         # Send the auth token for client to use
-        await _send_auth_token(ws_manager, user.username, uuid)
+        await _start_session(ws_manager, user.username, master_server)
 
         # Finally, close connection
         await ws_manager.close()
-    except WebSocketDisconnect:
-        pass
 
 
-def _get_verifier(user: User) -> int:
+@router.websocket("/v2")
+async def comms_v2_endpoint(websocket: WebSocket):
     """
-    Get the verifier for the user.
+    Endpoint that handles the authentication communication of incoming requests, in two round trips.
+
+    Uses the same SRP computations as the original endpoint, but pipelines the messages in the style
+    of TLS-SRP (RFC 5054 section 2.2):
 
-    The extraction of the verifier from the user object is done this way so that we can monkeypatch
-    it in tests.
+    1. The client sends its username and its public value, A, one after the other, without waiting.
+    2. The server checks A and replies with the group size, the salt and its public value, B. The
+       server picks B such that the shared U value is not 0, so the client need not accept it.
+    3. The client sends M1.
+    4. The server checks M1 and replies with M2 and the encrypted auth token. The client must check
+       M2 before using the token.
 
-    :param user: the user
-    :return: the verifier
+    The client computes A using the group size from the `/group-size` endpoint; if the group size
+    sent by the server differs, the client should log in again with the right group.
     """
 
-    return bytes_to_long(user.srp_verifier)
+    ws_manager = WebSocketManager(websocket)
+
+    await ws_manager.accept()
+    async with _handle_errors(ws_manager):
+        # Get user details and client's public value
+        username = (await ws_manager.receive()).data
+        a_response = await ws_manager.receive()
+        user = get_user(username)
+        if user is None:
+            await ws_manager.send(WebSocketMsg("User does not exist", "ERR"))
+            await ws_manager.close()
+            return
+
+        if a_response.status == "ERR" or not isinstance(a_response.data, bytes):
+            await ws_manager.close()
+            return
 
+        srp_handler = SRP(user.srp_group, pool=EPHEMERAL_POOL if user.srp_group == EPHEMERAL_POOL.group else None)
+        a_pub = bytes_to_long(a_response.data)
+        if a_pub % srp_handler.prime == 0:
+            await ws_manager.send(WebSocketMsg("Client public value is illegal; A mod N cannot be 0", "ERR"))
+            await ws_manager.close()
+            return
 
-def _get_b_priv() -> int | None:
-    """
-    Get the server's private value.
+        # Compute server's ephemeral values, such that the shared U value is not 0
+        verifier = get_verifier(user)
+        for _ in range(MAX_ITER_COUNT):
+            b_priv, b_pub = await SRP_WORKERS.compute_server_public_value(
+                srp_handler, verifier, private_value=get_b_priv()
+            )
+            u = srp_handler.compute_u(a_pub, b_pub)
+            if u != 0:
+                break
+        else:
+            await ws_manager.send(WebSocketMsg("Shared U value is 0", "ERR"))
+            await ws_manager.close()
+            return
 
-    The extraction of the verifier from the user object is done this way so that we can monkeypatch
-    it in tests.
+        # Send server's SRP group size, salt and public value together
+        await ws_manager.send(WebSocketMsg(str(srp_handler.bits), "OK"))
+        await ws_manager.send(WebSocketMsg(user.srp_salt, "OK"))
+        await ws_manager.send(WebSocketMsg(long_to_bytes(b_pub), "OK"))
 
-    :return: the verifier
+        # Compute server's master value while the client computes its M1
+        premaster = await SRP_WORKERS.compute_premaster_secret(srp_handler, a_pub, b_priv, u, verifier)
+        master_server = srp_handler.premaster_to_master(premaster)
+
+        # Verify client's M1
+        m1_server = srp_handler.generate_m1(user.username, user.srp_salt, a_pub, b_pub, master_server)
+        m1_response = await ws_manager.receive()
+        if m1_response.status != "OK":
+            await ws_manager.close()
+            return
+
+        if m1_response.data != m1_server:
+            await ws_manager.send(WebSocketMsg("M1 values do not match", "ERR"))
+            await ws_manager.close()
+            return
+
+        # Send server's M2 and the auth token together
+        await ws_manager.send(WebSocketMsg(srp_handler.generate_m2(a_pub, m1_server, master_server), "OK"))
+        await _start_session(ws_manager, user.username, master_server)
+
+        # Finally, close connection
+        await ws_manager.close()
+
+
+@asynccontextmanager
+async def _handle_errors(ws_manager: WebSocketManager) -> AsyncIterator[None]:
     """
+    Ends a login handshake cleanly if it cannot go on, telling the client why where possible.
 
-    return None
+    :param ws_manager: the WebSocket manager
+    """
+
+    try:
+        yield
+    except TimeoutError:
+        # Too many logins are waiting for their SRP computations
+        await ws_manager.send(WebSocketMsg(SERVER_BUSY_MESSAGE, "ERR"))
+        await ws_manager.close()
+    except ValueError:
+        # The client sent a message that could not be read (e.g., a truncated binary frame)
+        await ws_manager.send(WebSocketMsg(MALFORMED_MESSAGE, "ERR"))
+        await ws_manager.close()
+    except WebSocketDisconnect:
+        pass
 
 
 async def _negotiate_ephemeral_values(
@@ -143,12 +220,12 @@ async def _negotiate_ephemeral_values(
     """
 
     # Compute server's ephemeral values
-    b_priv = _get_b_priv()
+    b_priv = get_b_priv()
     b_pub = 0
     client_accepted = False
     iter_count = 0
     while not client_accepted and iter_count < MAX_ITER_COUNT:
-        b_priv, b_pub = srp_handler.compute_server_public_value(verifier, private_value=b_priv)
+        b_priv, b_pub = await SRP_WORKERS.compute_server_public_value(srp_handler, verifier, private_value=b_priv)
         await ws_manager.send(WebSocketMsg(long_to_bytes(b_pub)))
 
         # Await client's response
@@ -189,28 +266,26 @@ async def _negotiate_ephemeral_values(
     return a_pub, b_pub, b_priv
 
 
-async def _send_auth_token(ws_manager: WebSocketManager, username: str, comm_uuid: str) -> None:
+async def _start_session(ws_manager: WebSocketManager, username: str, master_key: bytes) -> None:
     """
-    Send the authentication token to the client.
+    Start a communication session for a user who has logged in, and send its encrypted auth token.
 
-    Encrypts the authentication token using the master value and sends it to the client.
+    Over binary frames, the encrypted token is sent as the raw nonce, ciphertext and tag, one after
+    the other; otherwise, they are sent as base64 values in a JSON object.
 
     :param ws_manager: the WebSocket manager
     :param username: the username
-    :param comm_uuid: the UUID of the communication session
+    :param master_key: the master value of the session
     """
 
-    auth_token = generate_auth_token(
-        username, comm_uuid, datetime.now(tz=timezone.utc).timestamp() + CONFIG.security.session_duration
-    )
-
-    cipher = AES.new(MASTER_KEYS_CACHE[comm_uuid], AES.MODE_GCM)
-    auth_token_enc = cipher.encrypt(auth_token.encode("UTF-8"))
-    tag = cipher.digest()
+    nonce, auth_token_enc, tag = start_session(username, master_key)
+    if ws_manager.binary:
+        await ws_manager.send(WebSocketMsg(nonce + auth_token_enc + tag))
+        return
 
     auth_token_data = json.dumps(
         {
-            "nonce": b64encode(cipher.nonce).decode("utf-8"),
+            "nonce": b64encode(nonce).decode("utf-8"),
             "token": b64encode(auth_token_enc).decode("utf-8"),
             "tag": b64encode(tag).decode("utf-8"),
         }
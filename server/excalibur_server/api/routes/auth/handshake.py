@@ -0,0 +1,236 @@
+import binascii
+from base64 import b64decode, b64encode
+from datetime import datetime, timezone
+from typing import Annotated
+from uuid import uuid4
+
+from Crypto.Util.number import bytes_to_long, long_to_bytes
+from fastapi import Body, HTTPException, status
+from pydantic import BaseModel, field_serializer
+
+from excalibur_server.api.cache import EPHEMERAL_POOL, HANDSHAKE_SEALER, SESSION_STORE, SRP_WORKERS
+from excalibur_server.api.routes.auth import router
+from excalibur_server.src.auth.credentials import start_session
+from excalibur_server.src.auth.srp import SRP
+from excalibur_server.src.auth.srp.group import EXPONENT_BITS
+from excalibur_server.src.config import CONFIG
+from excalibur_server.src.users import User, get_user
+
+from .comms import MAX_ITER_COUNT, SERVER_BUSY_MESSAGE
+from .srp_values import get_b_priv, get_verifier
+
+_TIMESTAMP_SIZE = 8
+_PRIVATE_VALUE_SIZE = EXPONENT_BITS // 8
+
+SERVER_BUSY_EXCEPTION = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail=SERVER_BUSY_MESSAGE,
+    headers={"Retry-After": "1"},
+)
+INVALID_HANDSHAKE_EXCEPTION = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Invalid, expired or already finished handshake",
+)
+
+
+class HandshakeChallenge(BaseModel):
+    group_size: int
+    salt: bytes
+    b: bytes
+    handshake_id: str
+    state: str
+
+    @field_serializer("salt", "b")
+    def serialize_bytes(self, a_bytes: bytes, _info) -> str:
+        return b64encode(a_bytes).decode("utf-8")
+
+
+class HandshakeResult(BaseModel):
+    m2: bytes
+    nonce: bytes
+    token: bytes
+    tag: bytes
+
+    @field_serializer("m2", "nonce", "token", "tag")
+    def serialize_bytes(self, a_bytes: bytes, _info) -> str:
+        return b64encode(a_bytes).decode("utf-8")
+
+
+def _get_srp_handler(username: str) -> tuple[User, SRP]:
+    """
+    Get the user taking part in a handshake, along with an SRP handler for their group.
+
+    :param username: the username
+    :raises HTTPException: if the user does not exist
+    :return: (user, SRP handler)
+    """
+
+    user = get_user(username)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User does not exist")
+
+    srp_handler = SRP(user.srp_group, pool=EPHEMERAL_POOL if user.srp_group == EPHEMERAL_POOL.group else None)
+    return user, srp_handler
+
+
+def _decode_value(value: str, name: str) -> bytes:
+    """
+    Decode a base64 value of a request.
+
+    :param value: the base64 string
+    :param name: the name of the value, for the error message
+    :raises HTTPException: if the value is not valid base64
+    :return: the decoded value
+    """
+
+    try:
+        return b64decode(value, validate=True)
+    except binascii.Error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid base64 string for {name}")
+
+
+@router.post(
+    "/handshake",
+    summary="Start HTTP Login Handshake",
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Illegal client public value"},
+        status.HTTP_404_NOT_FOUND: {"description": "User does not exist"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Server busy"},
+    },
+)
+async def start_handshake_endpoint(
+    username: Annotated[str, Body(description="The username")],
+    a: Annotated[str, Body(description="Base64 string of the client's public value, A.")],
+) -> HandshakeChallenge:
+    """
+    Starts a login handshake over HTTP, as an alternative to the `/api/auth/v2` WebSocket.
+
+    The messages are those of the version 2 WebSocket handshake, but the server keeps no state
+    between the two requests: its private value is sealed into the returned `state`, which the
+    client sends back (along with the `handshake_id`) to finish the handshake. Either request may
+    thus be served by any worker that shares the session store. The handshake must be finished
+    within the PoP timestamp validity.
+
+    The client computes A using the group size from the `/group-size` endpoint; if the returned
+    group size differs, the client should start again with the right group.
+    """
+
+    user, srp_handler = _get_srp_handler(username)
+    a_pub = bytes_to_long(_decode_value(a, "A"))
+    if a_pub % srp_handler.prime == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Client public value is illegal; A mod N cannot be 0"
+        )
+
+    # Compute server's ephemeral values, such that the shared U value is not 0
+    verifier = get_verifier(user)
+    try:
+        for _ in range(MAX_ITER_COUNT):
+            b_priv, b_pub = await SRP_WORKERS.compute_server_public_value(
+                srp_handler, verifier, private_value=get_b_priv()
+            )
+            if srp_handler.compute_u(a_pub, b_pub) != 0:
+                break
+        else:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Shared U value is 0")
+    except TimeoutError:
+        raise SERVER_BUSY_EXCEPTION
+
+    # Seal the state needed to finish the handshake
+    value_size = (srp_handler.bits + 7) // 8
+    issued = int(datetime.now(tz=timezone.utc).timestamp())
+    state = (
+        issued.to_bytes(_TIMESTAMP_SIZE, "big")
+        + long_to_bytes(b_priv, _PRIVATE_VALUE_SIZE)
+        + long_to_bytes(a_pub, value_size)
+        + long_to_bytes(b_pub, value_size)
+    )
+    handshake_id = uuid4().hex
+
+    return HandshakeChallenge(
+        group_size=srp_handler.bits,
+        salt=user.srp_salt,
+        b=long_to_bytes(b_pub),
+        handshake_id=handshake_id,
+        state=HANDSHAKE_SEALER.seal(state, user.username, handshake_id),
+    )
+
+
+@router.post(
+    "/handshake/finish",
+    summary="Finish HTTP Login Handshake",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Invalid handshake or M1 value"},
+        status.HTTP_404_NOT_FOUND: {"description": "User does not exist"},
+        status.HTTP_429_TOO_MANY_REQUESTS: {"description": "Too many handshakes"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Server busy"},
+    },
+)
+async def finish_handshake_endpoint(
+    username: Annotated[str, Body(description="The username")],
+    handshake_id: Annotated[str, Body(description="The handshake ID given when the handshake was started.")],
+    state: Annotated[str, Body(description="The sealed state given when the handshake was started.")],
+    m1: Annotated[str, Body(description="Base64 string of the client's M1 value.")],
+) -> HandshakeResult:
+    """
+    Finishes a login handshake over HTTP.
+
+    Returns the server's M2, along with the auth token encrypted with AES-GCM under the master key
+    of the new session. The client must check M2 before using the token.
+
+    Each handshake can only be finished once, whether or not M1 is correct.
+    """
+
+    user, srp_handler = _get_srp_handler(username)
+    m1_client = _decode_value(m1, "M1")
+
+    # Recover the sealed state
+    value_size = (srp_handler.bits + 7) // 8
+    now = datetime.now(tz=timezone.utc).timestamp()
+    unsealed = HANDSHAKE_SEALER.unseal(state, user.username, handshake_id)
+    if unsealed is None or len(unsealed) != _TIMESTAMP_SIZE + _PRIVATE_VALUE_SIZE + 2 * value_size:
+        raise INVALID_HANDSHAKE_EXCEPTION
+
+    issued = int.from_bytes(unsealed[:_TIMESTAMP_SIZE], "big")
+    if now - issued > CONFIG.security.pop.timestamp_validity:
+        raise INVALID_HANDSHAKE_EXCEPTION
+
+    values = unsealed[_TIMESTAMP_SIZE + _PRIVATE_VALUE_SIZE :]
+    b_priv = bytes_to_long(unsealed[_TIMESTAMP_SIZE : _TIMESTAMP_SIZE + _PRIVATE_VALUE_SIZE])
+    a_pub = bytes_to_long(values[:value_size])
+    b_pub = bytes_to_long(values[value_size:])
+
+    # Only allow one attempt at M1 per handshake, like the WebSocket handshake does. This is checked
+    # before the expensive computation, so that replaying a handshake costs the server nothing.
+    try:
+        fresh = SESSION_STORE.add_nonce(handshake_id.encode("UTF-8"), issued, now)
+    except OverflowError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": "1"},
+        )
+    if not fresh:
+        raise INVALID_HANDSHAKE_EXCEPTION
+
+    # Compute server's master value
+    u = srp_handler.compute_u(a_pub, b_pub)
+    verifier = get_verifier(user)
+    try:
+        premaster = await SRP_WORKERS.compute_premaster_secret(srp_handler, a_pub, b_priv, u, verifier)
+    except TimeoutError:
+        raise SERVER_BUSY_EXCEPTION
+    master_server = srp_handler.premaster_to_master(premaster)
+
+    # Verify client's M1
+    m1_server = srp_handler.generate_m1(user.username, user.srp_salt, a_pub, b_pub, master_server)
+    if m1_client != m1_server:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="M1 values do not match")
+
+    nonce, auth_token_enc, tag = start_session(user.username, master_server)
+    return HandshakeResult(
+        m2=srp_handler.generate_m2(a_pub, m1_server, master_server),
+        nonce=nonce,
+        token=auth_token_enc,
+        tag=tag,
+    )
@@ -1,9 +1,11 @@
 from typing import Annotated
 
-from fastapi import Body, Depends
+from fastapi import Body, Depends, Query
+from fastapi.responses import StreamingResponse
 
 from excalibur_server.api.routes.auth import router
 from excalibur_server.src.auth.credentials import get_credentials
+from excalibur_server.src.middleware.crypto import encrypted_route
 
 
 @router.get("/pop-demo", tags=["debug"])
@@ -31,6 +33,7 @@ def demo_post_endpoint(
 
 
 @router.post("/pop-demo/encrypted", tags=["debug"])
+@encrypted_route()
 def demo_post_encrypted_endpoint(
     credential: Annotated[str, Depends(get_credentials)],
     data: Annotated[str, Body(description="Some data")],
@@ -43,3 +46,20 @@ def demo_post_encrypted_endpoint(
         "credential": credential,
         "data": data,
     }
+
+
+@router.get("/pop-demo/stream", tags=["debug"])
+@encrypted_route(encrypted_body=False)
+def demo_stream_endpoint(
+    credential: Annotated[str, Depends(get_credentials)],
+    count: Annotated[int, Query(description="Number of lines to stream")] = 3,
+):
+    """
+    Demo endpoint for an encrypted streamed response, sent as newline-delimited JSON.
+    """
+
+    def generate():
+        for i in range(count):
+            yield f'{{"credential": "{credential}", "line": {i}}}\n'
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
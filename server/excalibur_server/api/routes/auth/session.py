@@ -0,0 +1,110 @@
+from datetime import datetime, timezone
+from typing import Annotated
+from uuid import uuid4
+
+from fastapi import Depends, HTTPException, Query, Request, Response, status
+from pydantic import BaseModel
+
+from excalibur_server.api.cache import POP_VERIFIERS_CACHE, SESSION_PERSISTER, SESSION_STORE
+from excalibur_server.api.routes.auth import router
+from excalibur_server.src.auth.consts import KEY
+from excalibur_server.src.auth.context import AUTH_CONTEXT_STATE_KEY, AuthContext
+from excalibur_server.src.auth.credentials import get_credentials, issue_session_token, ratchet_master_key
+from excalibur_server.src.auth.jwt import forget_token
+from excalibur_server.src.config import CONFIG
+from excalibur_server.src.middleware.crypto import encrypted_route
+
+
+class RefreshedSession(BaseModel):
+    token: str
+    expiry: int
+    ratcheted: bool
+
+
+def _end_session(context: AuthContext):
+    """
+    Ends a login session, so that its token and master key can no longer be used.
+
+    :param context: the authentication details of the session
+    """
+
+    SESSION_STORE.revoke(context.comm_uuid)
+    POP_VERIFIERS_CACHE.pop(context.comm_uuid, None)
+    forget_token(context.token, KEY)
+
+    if SESSION_PERSISTER is not None:
+        SESSION_PERSISTER.save_soon()  # So that the revocation survives a crash
+
+
+@router.delete(
+    "/session",
+    summary="End Session",
+    dependencies=[Depends(get_credentials)],
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_204_NO_CONTENT: {"description": "Session ended"},
+    },
+)
+def end_session_endpoint(request: Request):
+    """
+    Ends the current login session (i.e., logs out).
+
+    The session's token and master key can no longer be used, even if the token has not expired.
+    """
+
+    _end_session(getattr(request.state, AUTH_CONTEXT_STATE_KEY))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post(
+    "/session/refresh",
+    summary="Refresh Session",
+    dependencies=[Depends(get_credentials)],
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Session cannot be extended any further"},
+    },
+    response_model=RefreshedSession,
+    tags=["encrypted"],
+)
+@encrypted_route(encrypted_body=False)
+def refresh_session_endpoint(
+    request: Request,
+    ratchet: Annotated[
+        bool,
+        Query(
+            description="Whether to derive a new master key from the current one. If so, the current token and "
+            "master key stop working, and the client derives the new key itself."
+        ),
+    ] = False,
+):
+    """
+    Issues a new token for the current login session, so that the user need not log in again when
+    the current token expires.
+
+    Unless the master key is ratcheted, the new token belongs to the same session as the current
+    one, so ending either ends both. The new token lasts for another session duration, up to the
+    maximum session lifetime since the user logged in. The response is encrypted with the current master key.
+    """
+
+    context: AuthContext = getattr(request.state, AUTH_CONTEXT_STATE_KEY)
+
+    now = datetime.now(tz=timezone.utc).timestamp()
+    expiry = min(now + CONFIG.security.session_duration, context.auth_time + CONFIG.security.max_session_lifetime)
+    if expiry <= now:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session lifetime exceeded",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # A refresh replaces the session rather than adding one, so that refreshing cannot crowd other
+    # sessions out of the master keys cache. Without a ratchet, the session keeps its UUID (and its
+    # entry is renewed); with one, it moves to a new UUID and the old one is ended below.
+    master_key = ratchet_master_key(context.master_key) if ratchet else context.master_key
+    comm_uuid = uuid4().hex if ratchet else context.comm_uuid
+    token = issue_session_token(context.username, comm_uuid, expiry, master_key, auth_time=context.auth_time)
+
+    if ratchet:
+        _end_session(context)  # The old key must not outlive the ratchet
+
+    return RefreshedSession(token=token, expiry=int(expiry), ratcheted=ratchet)
@@ -0,0 +1,30 @@
+from Crypto.Util.number import bytes_to_long
+
+from excalibur_server.src.users import User
+
+
+def get_verifier(user: User) -> int:
+    """
+    Get the verifier for the user.
+
+    The extraction of the verifier from the user object is done this way so that we can monkeypatch
+    it in tests.
+
+    :param user: the user
+    :return: the verifier
+    """
+
+    return bytes_to_long(user.srp_verifier)
+
+
+def get_b_priv() -> int | None:
+    """
+    Get the server's private value.
+
+    This is done this way so that we can monkeypatch it in tests; None lets the SRP handler generate
+    a random one.
+
+    :return: the private value, or None to generate one
+    """
+
+    return None
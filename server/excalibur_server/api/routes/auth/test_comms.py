@@ -9,6 +9,7 @@ from fastapi.testclient import TestClient
 from excalibur_server.api.app import app
 from excalibur_server.src.auth.srp import SRP, SRPGroup
 from excalibur_server.src.users import User
+from excalibur_server.src.websocket import BINARY_SUBPROTOCOL, WebSocketMsg
 
 # Values from RFC5054, Appendix B
 S = int("BEB25379 D1A8581E B5A72767 3A2441EE".replace(" ", ""), 16)
@@ -75,8 +76,8 @@ def mock_is_user(username: str):
 def mock_test_user(monkeypatch: pytest.MonkeyPatch):
     # Note that we monkeypatch the destination, not the source
     monkeypatch.setattr("excalibur_server.api.routes.auth.comms.get_user", mock_get_user)
-    monkeypatch.setattr("excalibur_server.api.routes.auth.comms._get_verifier", lambda _: V)
-    monkeypatch.setattr("excalibur_server.api.routes.auth.comms._get_b_priv", lambda: B_PRIV)
+    monkeypatch.setattr("excalibur_server.api.routes.auth.comms.get_verifier", lambda _: V)
+    monkeypatch.setattr("excalibur_server.api.routes.auth.comms.get_b_priv", lambda: B_PRIV)
     yield
 
 
@@ -131,6 +132,112 @@ def test_auth_negotiation():
         cipher.verify(b64decode(auth_token_data["tag"]))
 
 
+def test_auth_negotiation_binary():
+    with client.websocket_connect("/api/auth", subprotocols=[BINARY_SUBPROTOCOL]) as ws:
+        assert ws.accepted_subprotocol == BINARY_SUBPROTOCOL
+
+        ws.send_bytes(WebSocketMsg("test-user").to_frame())
+        response = WebSocketMsg.from_frame(ws.receive_bytes())
+        assert response.status == "OK", "Failed to find user"
+        assert response.data == str(SRP_HANDLER.bits), "Failed to receive group size"
+
+        # Receive server's public value, as raw bytes
+        response = WebSocketMsg.from_frame(ws.receive_bytes())
+        assert response.data == long_to_bytes(B_PUB), "Server sent incorrect public value"
+
+        # Send client's public value
+        ws.send_bytes(WebSocketMsg(long_to_bytes(A_PUB), "OK").to_frame())
+        response = WebSocketMsg.from_frame(ws.receive_bytes())
+        assert response.status == "OK", "Server rejected acceptable client public value"
+
+        # Check M values
+        ws.send_bytes(WebSocketMsg(long_to_bytes(M1), "OK").to_frame())
+        response = WebSocketMsg.from_frame(ws.receive_bytes())
+        assert response.status == "OK", "Server failed to verify client's M1 value"
+        assert bytes_to_long(response.data) == M2, "Server failed to send correct M2 value"
+
+        ws.send_bytes(WebSocketMsg(status="OK").to_frame())
+
+        # Check received auth token, which is the nonce, ciphertext and tag
+        auth_token_data = WebSocketMsg.from_frame(ws.receive_bytes()).data
+        cipher = AES.new(SRP_HANDLER.premaster_to_master(PREMASTER_SECRET), AES.MODE_GCM, nonce=auth_token_data[:16])
+        cipher.decrypt(auth_token_data[16:-16])
+        cipher.verify(auth_token_data[-16:])
+
+
+def test_auth_negotiation_v2():
+    with client.websocket_connect("/api/auth/v2") as ws:
+        # Send username and client's public value together
+        ws.send_json({"data": "test-user"})
+        ws.send_json({"status": "OK", "binary": True, "data": b64encode(long_to_bytes(A_PUB)).decode("utf-8")})
+
+        # Receive group size, salt and server's public value together
+        response = ws.receive_json()
+        assert response["status"] == "OK", "Failed to find user"
+        assert response["data"] == str(SRP_HANDLER.bits), "Failed to receive group size"
+        response = ws.receive_json()
+        assert bytes_to_long(b64decode(response["data"])) == S, "Server sent incorrect salt"
+        response = ws.receive_json()
+        assert bytes_to_long(b64decode(response["data"])) == B_PUB, "Server sent incorrect public value"
+
+        # Send M1, then receive M2 and the auth token together
+        ws.send_json({"status": "OK", "binary": True, "data": b64encode(long_to_bytes(M1)).decode("utf-8")})
+        response = ws.receive_json()
+        assert response["status"] == "OK", "Server failed to verify client's M1 value"
+        assert bytes_to_long(b64decode(response["data"])) == M2, "Server failed to send correct M2 value"
+
+        auth_token_data = json.loads(ws.receive_json()["data"])
+        cipher = AES.new(
+            SRP_HANDLER.premaster_to_master(PREMASTER_SECRET),
+            AES.MODE_GCM,
+            nonce=b64decode(auth_token_data["nonce"]),
+        )
+        cipher.decrypt(b64decode(auth_token_data["token"]))
+        cipher.verify(b64decode(auth_token_data["tag"]))
+
+
+def test_auth_negotiation_v2_binary():
+    with client.websocket_connect("/api/auth/v2", subprotocols=[BINARY_SUBPROTOCOL]) as ws:
+        ws.send_bytes(WebSocketMsg("test-user").to_frame())
+        ws.send_bytes(WebSocketMsg(long_to_bytes(A_PUB), "OK").to_frame())
+
+        assert WebSocketMsg.from_frame(ws.receive_bytes()).data == str(SRP_HANDLER.bits)
+        assert WebSocketMsg.from_frame(ws.receive_bytes()).data == long_to_bytes(S)
+        assert WebSocketMsg.from_frame(ws.receive_bytes()).data == long_to_bytes(B_PUB)
+
+        ws.send_bytes(WebSocketMsg(long_to_bytes(M1), "OK").to_frame())
+        assert bytes_to_long(WebSocketMsg.from_frame(ws.receive_bytes()).data) == M2
+
+        auth_token_data = WebSocketMsg.from_frame(ws.receive_bytes()).data
+        cipher = AES.new(SRP_HANDLER.premaster_to_master(PREMASTER_SECRET), AES.MODE_GCM, nonce=auth_token_data[:16])
+        cipher.decrypt(auth_token_data[16:-16])
+        cipher.verify(auth_token_data[-16:])
+
+
+def test_abort_v2():
+    # Invalid username
+    with client.websocket_connect("/api/auth/v2") as ws:
+        ws.send_json({"data": "fake_username"})
+        ws.send_json({"status": "OK", "binary": True, "data": b64encode(long_to_bytes(A_PUB)).decode("utf-8")})
+        assert ws.receive_json()["status"] == "ERR", "Failed to deny user"
+
+    # Illegal client public value
+    with client.websocket_connect("/api/auth/v2") as ws:
+        ws.send_json({"data": "test-user"})
+        ws.send_json({"status": "OK", "binary": True, "data": b64encode(long_to_bytes(N)).decode("utf-8")})
+        assert ws.receive_json()["status"] == "ERR", "Server accepted illegal client public value"
+
+    # Wrong M1
+    with client.websocket_connect("/api/auth/v2") as ws:
+        ws.send_json({"data": "test-user"})
+        ws.send_json({"status": "OK", "binary": True, "data": b64encode(long_to_bytes(A_PUB)).decode("utf-8")})
+        for _ in range(3):
+            ws.receive_json()
+
+        ws.send_json({"status": "OK", "binary": True, "data": b64encode(b"12345").decode("utf-8")})
+        assert ws.receive_json()["status"] == "ERR", "Server accepted invalid client M1 value"
+
+
 def test_abort_on_invalid_username():
     with client.websocket_connect("/api/auth") as ws:
         ws.send_json({"data": "fake_username"})
@@ -181,3 +288,32 @@ def test_abort_on_invalid_client_m1():
         ws.send_json({"status": "OK", "binary": True, "data": b64encode(b"12345").decode("utf-8")})
         response = ws.receive_json()
         assert response["status"] == "ERR", "Server accepted invalid client M1 value"
+
+
+def test_server_busy(monkeypatch: pytest.MonkeyPatch):
+    from excalibur_server.src.auth.srp import SRPWorkers
+
+    from .comms import SERVER_BUSY_MESSAGE
+
+    # No computation can ever get a slot
+    monkeypatch.setattr("excalibur_server.api.routes.auth.comms.SRP_WORKERS", SRPWorkers(1, 0, 0))
+
+    with client.websocket_connect("/api/auth") as ws:
+        ws.send_json({"data": "test-user"})
+        response = ws.receive_json()
+        assert response["status"] == "OK", "Failed to find user"
+
+        response = ws.receive_json()
+        assert response["status"] == "ERR"
+        assert response["data"] == SERVER_BUSY_MESSAGE
+
+
+@pytest.mark.parametrize("endpoint", ["/api/auth", "/api/auth/v2"])
+def test_malformed_frame(endpoint: str):
+    from .comms import MALFORMED_MESSAGE
+
+    with client.websocket_connect(endpoint, subprotocols=[BINARY_SUBPROTOCOL]) as ws:
+        ws.send_bytes(b"\x00")  # Truncated frame
+        response = WebSocketMsg.from_frame(ws.receive_bytes())
+        assert response.status == "ERR"
+        assert response.data == MALFORMED_MESSAGE
@@ -0,0 +1,114 @@
+from base64 import b64decode, b64encode
+
+import pytest
+from Crypto.Cipher import AES
+from Crypto.Util.number import bytes_to_long, long_to_bytes
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from excalibur_server.api.app import app
+from excalibur_server.src.config import CONFIG
+
+from .test_comms import A_PUB, B_PRIV, B_PUB, M1, M2, PREMASTER_SECRET, SRP_HANDLER, N, S, V, mock_get_user
+
+
+@pytest.fixture(autouse=True)
+def mock_test_user(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("excalibur_server.api.routes.auth.handshake.get_user", mock_get_user)
+    monkeypatch.setattr("excalibur_server.api.routes.auth.handshake.get_verifier", lambda _: V)
+    monkeypatch.setattr("excalibur_server.api.routes.auth.handshake.get_b_priv", lambda: B_PRIV)
+    yield
+
+
+client = TestClient(app)
+
+
+def _b64(value: int | bytes) -> str:
+    if isinstance(value, int):
+        value = long_to_bytes(value)
+    return b64encode(value).decode("utf-8")
+
+
+def _start(username: str = "test-user", a_pub: int = A_PUB):
+    return client.post("/api/auth/handshake", json={"username": username, "a": _b64(a_pub)})
+
+
+def _finish(challenge: dict, m1: int | bytes = M1, **overrides):
+    body = {"username": "test-user", "handshake_id": challenge["handshake_id"], "state": challenge["state"]}
+    body.update(m1=_b64(m1), **overrides)
+    return client.post("/api/auth/handshake/finish", json=body)
+
+
+def test_handshake():
+    response = _start()
+    assert response.status_code == status.HTTP_200_OK
+    challenge = response.json()
+    assert challenge["group_size"] == SRP_HANDLER.bits
+    assert bytes_to_long(b64decode(challenge["salt"])) == S
+    assert bytes_to_long(b64decode(challenge["b"])) == B_PUB
+
+    response = _finish(challenge)
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert bytes_to_long(b64decode(result["m2"])) == M2
+
+    cipher = AES.new(SRP_HANDLER.premaster_to_master(PREMASTER_SECRET), AES.MODE_GCM, nonce=b64decode(result["nonce"]))
+    token = cipher.decrypt(b64decode(result["token"]))
+    cipher.verify(b64decode(result["tag"]))
+
+    # The token can be used straight away
+    response = client.delete("/api/auth/session", headers={"Authorization": f"Bearer {token.decode('utf-8')}"})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+def test_handshake_finished_once():
+    challenge = _start().json()
+    assert _finish(challenge).status_code == status.HTTP_200_OK
+    assert _finish(challenge).status_code == status.HTTP_401_UNAUTHORIZED
+
+    # A wrong M1 also uses the handshake up
+    challenge = _start().json()
+    assert _finish(challenge, m1=b"12345").status_code == status.HTTP_401_UNAUTHORIZED
+    assert _finish(challenge).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_handshake_replay_not_computed(monkeypatch: pytest.MonkeyPatch):
+    # Replays are refused before the server does any expensive work
+    challenge = _start().json()
+    assert _finish(challenge).status_code == status.HTTP_200_OK
+
+    async def fail(*_args):
+        raise AssertionError("premaster secret computed for a replay")
+
+    monkeypatch.setattr("excalibur_server.api.routes.auth.handshake.SRP_WORKERS.compute_premaster_secret", fail)
+    assert _finish(challenge).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_handshake_invalid_state():
+    challenge = _start().json()
+    other_challenge = _start().json()
+
+    # State of another handshake
+    assert _finish(challenge, state=other_challenge["state"]).status_code == status.HTTP_401_UNAUTHORIZED
+
+    # Tampered state
+    tampered = challenge["state"][:-4] + ("AAAA" if challenge["state"][-4:] != "AAAA" else "BBBB")
+    assert _finish(challenge, state=tampered).status_code == status.HTTP_401_UNAUTHORIZED
+
+    # The handshakes are still usable
+    assert _finish(challenge).status_code == status.HTTP_200_OK
+    assert _finish(other_challenge).status_code == status.HTTP_200_OK
+
+
+def test_handshake_expired(monkeypatch: pytest.MonkeyPatch):
+    challenge = _start().json()
+    monkeypatch.setattr(CONFIG.security.pop, "timestamp_validity", -1)
+    assert _finish(challenge).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_handshake_abort():
+    assert _start(username="fake_username").status_code == status.HTTP_404_NOT_FOUND
+    assert _start(a_pub=N).status_code == status.HTTP_400_BAD_REQUEST
+
+    response = client.post("/api/auth/handshake", json={"username": "test-user", "a": "not base64!"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -46,6 +46,34 @@ class TestBasicHMACChecks:
         assert response.status_code == 401
         assert response.json()["detail"] == "Invalid timestamp"
 
+    def test_future_timestamp(self, auth_client: TestClient):
+        import time
+
+        header = generate_pop_header(
+            master_key=b"one demo 16B key",
+            method="GET",
+            path="/api/auth/pop-demo",
+            timestamp=int(time.time()) + 3600,
+            nonce=_gen_nonce(),
+        )
+        response = auth_client.get("/api/auth/pop-demo", headers={"X-SRP-PoP": header})
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Invalid timestamp"
+
+    def test_wrong_pop(self, auth_client: TestClient):
+        import time
+
+        header = generate_pop_header(
+            master_key=b"another 16B key!",
+            method="GET",
+            path="/api/auth/pop-demo",
+            timestamp=int(time.time()),
+            nonce=_gen_nonce(),
+        )
+        response = auth_client.get("/api/auth/pop-demo", headers={"X-SRP-PoP": header})
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Invalid PoP"
+
     def test_nonce_reuse(self, auth_client: TestClient):
         import time
 
@@ -117,12 +145,18 @@ def test_post_no_encrypt(auth_client: TestClient):
     assert response["data"] == "hello world"
 
 
-def test_post_encrypted(auth_client: TestClient):
+def test_post_encrypted(auth_client: TestClient, monkeypatch: pytest.MonkeyPatch):
     import json
     import time
 
+    from excalibur_server.src.auth import context
     from excalibur_server.src.exef import ExEF
 
+    # The token should only be verified once, by the middleware
+    decode_calls = []
+    decode_token = context.decode_token
+    monkeypatch.setattr(context, "decode_token", lambda *args: decode_calls.append(args) or decode_token(*args))
+
     transit_encrypted_data = ExEF(b"one demo 16B key").encrypt(b"hello world")
     hmac_header = generate_pop_header(
         master_key=b"one demo 16B key",
@@ -147,3 +181,151 @@ def test_post_encrypted(auth_client: TestClient):
     response = json.loads(ExEF(b"one demo 16B key").decrypt(response.content))
     assert response["credential"] == "test-user"
     assert response["data"] == "hello world"
+    assert len(decode_calls) == 1
+
+
+@pytest.mark.parametrize(
+    ("key", "algorithm", "version"),
+    [
+        (b"one demo 16B key", "chacha20-poly1305", 2),  # Key too short, so falls back to AES-GCM
+        (b"a longer demo key of 32 B length", "chacha20-poly1305", 4),
+        (b"a longer demo key of 32 B length", "not-an-algorithm", 2),
+    ],
+)
+def test_post_encrypted_algorithm(key: bytes, algorithm: str, version: int):
+    import json
+    import time
+    from datetime import datetime, timezone
+
+    from excalibur_server.api.app import app
+    from excalibur_server.api.cache import MASTER_KEYS_CACHE
+    from excalibur_server.src.auth.credentials import generate_auth_token
+    from excalibur_server.src.exef import Algorithm, ExEF
+
+    MASTER_KEYS_CACHE["algorithm-uuid"] = key
+    token = generate_auth_token("test-user", "algorithm-uuid", datetime.now(tz=timezone.utc).timestamp() + 9999)
+    client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+    request_algorithm = Algorithm.CHACHA20_POLY1305 if len(key) == 32 else None
+    response = client.post(
+        "/api/auth/pop-demo/encrypted",
+        headers={
+            "Content-Type": "application/octet-stream",
+            "X-Encrypted": "true",
+            "X-Encryption-Algorithm": algorithm,
+            "X-SRP-PoP": generate_pop_header(
+                master_key=key,
+                method="POST",
+                path="/api/auth/pop-demo/encrypted",
+                timestamp=int(time.time()),
+                nonce=_gen_nonce(),
+            ),
+        },
+        content=ExEF(key, algorithm=request_algorithm).encrypt(b"hello world"),
+    )
+    assert response.status_code == 200
+    assert int.from_bytes(response.content[4:6], "big") == version
+
+    response = json.loads(ExEF(key).decrypt(response.content))
+    assert response["data"] == "hello world"
+
+
+@pytest.mark.parametrize(
+    ("data", "accept_encoding", "encoding"),
+    [
+        ("hello world " * 200, "deflate", "deflate"),
+        ("hello world " * 200, None, None),
+        ("hello world", "deflate", None),  # Below the compression threshold
+    ],
+)
+def test_post_encrypted_compressed(
+    auth_client: TestClient, data: str, accept_encoding: str | None, encoding: str | None
+):
+    import json
+    import time
+
+    from excalibur_server.src.exef import ExEF
+    from excalibur_server.src.middleware.crypto.compression import decompress
+
+    headers = {
+        "Content-Type": "application/octet-stream",
+        "X-Encrypted": "true",
+        "X-SRP-PoP": generate_pop_header(
+            master_key=b"one demo 16B key",
+            method="POST",
+            path="/api/auth/pop-demo/encrypted",
+            timestamp=int(time.time()),
+            nonce=_gen_nonce(),
+        ),
+    }
+    if accept_encoding is not None:
+        headers["X-Encrypted-Accept-Encoding"] = accept_encoding
+
+    response = auth_client.post(
+        "/api/auth/pop-demo/encrypted",
+        headers=headers,
+        content=ExEF(b"one demo 16B key").encrypt(data.encode("UTF-8")),
+    )
+    assert response.status_code == 200
+    assert response.headers.get("X-Encrypted-Encoding") == encoding
+    assert int(response.headers["Content-Length"]) == len(response.content)
+
+    body = ExEF(b"one demo 16B key").decrypt(response.content)
+    if encoding is not None:
+        assert len(response.content) < len(data)
+        body = decompress(body, encoding)
+    assert json.loads(body)["data"] == data
+
+
+@pytest.mark.parametrize("count", [0, 1, 5])
+def test_get_streamed(auth_client: TestClient, count: int):
+    import json
+    import time
+
+    from excalibur_server.src.exef import FramedDecryptor
+
+    response = auth_client.get(
+        f"/api/auth/pop-demo/stream?count={count}",
+        headers={
+            "X-SRP-PoP": generate_pop_header(
+                master_key=b"one demo 16B key",
+                method="GET",
+                path="/api/auth/pop-demo/stream",
+                timestamp=int(time.time()),
+                nonce=_gen_nonce(),
+            )
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Encrypted"] == "true"
+    assert "Content-Length" not in response.headers
+
+    body = FramedDecryptor(b"one demo 16B key").decrypt(response.content)
+    lines = [json.loads(line) for line in body.decode("UTF-8").splitlines()]
+    assert lines == [{"credential": "test-user", "line": i} for i in range(count)]
+
+
+def test_post_encrypted_tampered(auth_client: TestClient):
+    import time
+
+    from excalibur_server.src.exef import ExEF
+
+    transit_encrypted_data = bytearray(ExEF(b"one demo 16B key").encrypt(b"hello world"))
+    transit_encrypted_data[-1] ^= 0x01
+
+    response = auth_client.post(
+        "/api/auth/pop-demo/encrypted",
+        headers={
+            "Content-Type": "application/octet-stream",
+            "X-Encrypted": "true",
+            "X-SRP-PoP": generate_pop_header(
+                master_key=b"one demo 16B key",
+                method="POST",
+                path="/api/auth/pop-demo/encrypted",
+                timestamp=int(time.time()),
+                nonce=_gen_nonce(),
+            ),
+        },
+        content=bytes(transit_encrypted_data),
+    )
+    assert response.status_code == 400
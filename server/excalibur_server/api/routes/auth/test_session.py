@@ -0,0 +1,154 @@
+import json
+import sqlite3
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from excalibur_server.api.app import app
+from excalibur_server.api.cache import MASTER_KEYS_CACHE
+from excalibur_server.src.auth.credentials import generate_auth_token, ratchet_master_key
+from excalibur_server.src.config import CONFIG
+from excalibur_server.src.exef import ExEF
+from excalibur_server.src.sessions import SQLiteSessionStore
+
+KEY = b"one demo 16B key"
+
+
+def _client(comm_uuid: str, master_key: bytes | None = None, auth_time: float | None = None) -> TestClient:
+    token = generate_auth_token(
+        "test-user",
+        comm_uuid,
+        datetime.now(tz=timezone.utc).timestamp() + 9999,
+        master_key=master_key,
+        auth_time=auth_time,
+    )
+    return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+def _stateful_client(auth_time: float | None = None) -> TestClient:
+    comm_uuid = uuid4().hex
+    MASTER_KEYS_CACHE[comm_uuid] = KEY
+    return _client(comm_uuid, auth_time=auth_time)
+
+
+def _refresh(client: TestClient, ratchet: bool = False) -> dict:
+    response = client.post("/api/auth/session/refresh", params={"ratchet": ratchet})
+    assert response.status_code == 200
+    return json.loads(ExEF(KEY).decrypt(response.content))
+
+
+def test_end_session():
+    client = _stateful_client()
+    assert client.get("/api/well-known/heartbeat").status_code == 202
+
+    response = client.delete("/api/auth/session")
+    assert response.status_code == 204
+    assert client.get("/api/well-known/heartbeat").status_code == 200
+    assert client.delete("/api/auth/session").status_code == 401
+
+
+def test_end_session_store_busy(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    # A store locked by another worker gives a response that can be retried, not an error
+    store = SQLiteSessionStore(tmp_path / "sessions.sqlite3", session_duration=60, validity=60, max_nonces=16)
+    monkeypatch.setattr("excalibur_server.src.auth.context.SESSION_STORE", store)
+    monkeypatch.setattr("excalibur_server.api.routes.auth.session.SESSION_STORE", store)
+    client = _client(uuid4().hex, master_key=KEY)
+
+    other = sqlite3.connect(tmp_path / "sessions.sqlite3", isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    response = client.delete("/api/auth/session")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    other.execute("ROLLBACK")
+    other.close()
+    assert client.delete("/api/auth/session").status_code == 204
+    store.close()
+
+
+def test_end_stateless_session():
+    client = _client(uuid4().hex, master_key=KEY)
+    assert client.get("/api/well-known/heartbeat").status_code == 202
+
+    assert client.delete("/api/auth/session").status_code == 204
+    assert client.get("/api/well-known/heartbeat").status_code == 200
+    assert client.delete("/api/auth/session").status_code == 401
+
+
+def test_refresh(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(CONFIG.security.sessions, "stateless", False)
+    auth_time = int(time.time()) - 100
+    client = _stateful_client(auth_time=auth_time)
+    refreshed = _refresh(client)
+    assert not refreshed["ratcheted"]
+    assert refreshed["expiry"] >= time.time() + CONFIG.security.session_duration - 5
+
+    claims = jwt.decode(refreshed["token"], options={"verify_signature": False})
+    old_claims = jwt.decode(client.headers["Authorization"][7:], options={"verify_signature": False})
+    assert claims["auth_time"] == auth_time
+    assert claims["uuid"] == old_claims["uuid"]
+    assert MASTER_KEYS_CACHE[claims["uuid"]] == KEY
+
+    # Both tokens stay usable
+    new_client = TestClient(app, headers={"Authorization": f"Bearer {refreshed['token']}"})
+    assert new_client.get("/api/well-known/heartbeat").status_code == 202
+    assert client.get("/api/well-known/heartbeat").status_code == 202
+
+
+def test_refresh_does_not_add_sessions(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(CONFIG.security.sessions, "stateless", False)
+    client = _stateful_client()
+    sessions = len(list(MASTER_KEYS_CACHE))
+
+    for _ in range(5):
+        _refresh(client)
+    assert len(list(MASTER_KEYS_CACHE)) == sessions
+
+    _refresh(client, ratchet=True)
+    assert len(list(MASTER_KEYS_CACHE)) == sessions
+
+
+def test_refresh_ratchet(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(CONFIG.security.sessions, "stateless", False)
+    client = _stateful_client()
+    refreshed = _refresh(client, ratchet=True)
+    assert refreshed["ratcheted"]
+
+    claims = jwt.decode(refreshed["token"], options={"verify_signature": False})
+    new_key = ratchet_master_key(KEY)
+    assert new_key != KEY and len(new_key) == len(KEY)
+    assert MASTER_KEYS_CACHE[claims["uuid"]] == new_key
+
+    # The old key is gone
+    assert client.get("/api/well-known/heartbeat").status_code == 200
+
+
+def test_refresh_stateless(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(CONFIG.security.sessions, "stateless", True)
+    client = _client(uuid4().hex, master_key=KEY)
+    refreshed = _refresh(client, ratchet=True)
+
+    claims = jwt.decode(refreshed["token"], options={"verify_signature": False})
+    assert claims["uuid"] not in MASTER_KEYS_CACHE
+
+    new_client = TestClient(app, headers={"Authorization": f"Bearer {refreshed['token']}"})
+    assert new_client.get("/api/well-known/heartbeat").status_code == 202
+    assert client.get("/api/well-known/heartbeat").status_code == 200
+
+
+def test_refresh_lifetime_cap():
+    max_lifetime = CONFIG.security.max_session_lifetime
+
+    # Nearly at the cap, so the new token lasts for less than a session duration
+    auth_time = int(time.time()) - max_lifetime + 60
+    refreshed = _refresh(_stateful_client(auth_time=auth_time))
+    assert refreshed["expiry"] == auth_time + max_lifetime
+
+    # Past the cap
+    response = _stateful_client(auth_time=time.time() - max_lifetime).post("/api/auth/session/refresh")
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Session lifetime exceeded"
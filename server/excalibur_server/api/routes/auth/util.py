@@ -18,15 +18,11 @@ def get_token_endpoint(
     from datetime import datetime, timezone
     from uuid import uuid4
 
-    from excalibur_server.api.cache import MASTER_KEYS_CACHE
-    from excalibur_server.src.auth.credentials import generate_auth_token
-
-    uuid = uuid4().hex
-    MASTER_KEYS_CACHE[uuid] = b"one demo 16B key"
-    token = generate_auth_token(
-        username,
-        uuid,
-        datetime.now(tz=timezone.utc).timestamp() + expiry_time,
+    from excalibur_server.src.auth.credentials import issue_session_token
+
+    master_key = b"one demo 16B key"
+    token = issue_session_token(
+        username, uuid4().hex, datetime.now(tz=timezone.utc).timestamp() + expiry_time, master_key
     )
 
     return {"token": token, "master": "one demo 16B key"}
@@ -8,6 +8,7 @@ from fastapi.responses import PlainTextResponse
 from excalibur_server.api.routes.files import router
 from excalibur_server.src.auth.credentials import get_credentials
 from excalibur_server.src.config import CONFIG
+from excalibur_server.src.middleware.crypto import encrypted_route
 from excalibur_server.src.path import check_path_length, check_path_subdir
 
 
@@ -58,6 +59,7 @@ async def get_spooled_file(request: Request) -> Generator[tempfile.SpooledTempor
         }
     },
 )
+@encrypted_route()
 async def upload_file_endpoint(
     username: Annotated[str, Depends(get_credentials)],
     path: Annotated[str, Path(description="The path to upload the file to (use `.` to specify root directory)")],
@@ -124,6 +126,7 @@ async def upload_file_endpoint(
     status_code=status.HTTP_201_CREATED,
     response_class=PlainTextResponse,
 )
+@encrypted_route()
 async def create_directory_endpoint(
     username: Annotated[str, Depends(get_credentials)],
     path: Annotated[
@@ -8,6 +8,7 @@ from excalibur_server.src.auth.credentials import get_credentials
 from excalibur_server.src.config import CONFIG
 from excalibur_server.src.files.listings import listdir
 from excalibur_server.src.files.structures import Directory
+from excalibur_server.src.middleware.crypto import encrypted_route
 from excalibur_server.src.path import check_path_subdir
 
 
@@ -29,6 +30,7 @@ class FileResponse(FastAPIFileResponse):
     },
     response_class=FileResponse,
 )
+@encrypted_route()
 async def download_file_endpoint(
     username: Annotated[str, Depends(get_credentials)],
     path: Annotated[str, Path(description="The file to download")],
@@ -59,6 +61,7 @@ async def download_file_endpoint(
     },
     response_model=Directory,
 )
+@encrypted_route()
 def listdir_endpoint(
     username: Annotated[str, Depends(get_credentials)],
     path: Annotated[str, Path(description="The path to list (use `.` to specify root directory)")],
@@ -12,6 +12,7 @@ from excalibur_server.api.misc import is_debug
 from excalibur_server.api.routes.users import router
 from excalibur_server.src.auth.credentials import get_credentials
 from excalibur_server.src.config import CONFIG
+from excalibur_server.src.middleware.crypto import encrypted_route
 from excalibur_server.src.users import User, add_user, get_user, is_user, remove_user
 
 
@@ -94,6 +95,7 @@ def get_user_security_details_endpoint(username: Annotated[str, Path()]):
     response_model=EncryptedVaultKey,
     tags=["encrypted"],
 )
+@encrypted_route()
 def get_user_vault_key_endpoint(username: Annotated[str, Path()]):
     """
     Returns the vault key of a user with the specified username.
@@ -6,5 +6,6 @@ router = APIRouter(tags=["well-known"])
 # Include all well-known endpoints
 from .clock import clock_endpoint as clock_endpoint
 from .compatibility import compatible_endpoint as compatible_endpoint
+from .encryption import encryption_endpoint as encryption_endpoint
 from .heartbeat import heartbeat_endpoint as heartbeat_endpoint
 from .version import version_endpoint as version_endpoint
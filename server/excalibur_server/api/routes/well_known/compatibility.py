@@ -1,10 +1,12 @@
 from typing import Annotated
 
-from fastapi import HTTPException, Query, status
+from fastapi import HTTPException, Query, Response, status
 from semver.version import Version
 
 from excalibur_server.api.routes.well_known import router
-from excalibur_server.src.compatibility import check_compatibility
+from excalibur_server.src.compatibility import AUTH_PROTOCOLS, check_compatibility
+
+AUTH_PROTOCOLS_HEADER = "X-Auth-Protocols"
 
 
 @router.get(
@@ -20,15 +22,26 @@ from excalibur_server.src.compatibility import check_compatibility
                     },
                 }
             },
+            "headers": {
+                AUTH_PROTOCOLS_HEADER: {
+                    "description": "Comma-separated versions of the login handshake that the server supports",
+                    "schema": {"type": "string", "example": "1, 2"},
+                }
+            },
         },
         status.HTTP_400_BAD_REQUEST: {"description": "Invalid Version"},
     },
 )
 def compatible_endpoint(
     version: Annotated[str, Query(description="The client version to check")],
+    response: Response,
 ) -> bool:
     """
     Checks if the client version is compatible with the server version.
+
+    The versions of the login handshake that the server supports are listed in the
+    `X-Auth-Protocols` header. Clients should use the latest version that they support (version 1
+    at `/api/auth`, version 2 at `/api/auth/v2`), and version 1 if the header is missing.
     """
 
     try:
@@ -36,4 +49,5 @@ def compatible_endpoint(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid version '{version}'")
 
+    response.headers[AUTH_PROTOCOLS_HEADER] = ", ".join(str(protocol) for protocol in AUTH_PROTOCOLS)
     return check_compatibility(parsed_version)
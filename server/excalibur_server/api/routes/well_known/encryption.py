@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+
+from excalibur_server.api.routes.well_known import router
+from excalibur_server.src.config import CONFIG
+from excalibur_server.src.config.security import SESSION_ALGORITHMS
+
+
+class EncryptionResponse(BaseModel):
+    preferred: str
+    supported: list[str]
+
+
+@router.get(
+    "/encryption",
+    summary="Get supported encryption algorithms",
+)
+async def encryption_endpoint() -> EncryptionResponse:
+    """
+    Returns the end-to-end encryption algorithms supported by the server, along with the one that
+    the server prefers.
+
+    Clients can request an algorithm by setting the `X-Encryption-Algorithm` header on encrypted
+    requests; the response will then be encrypted using that algorithm.
+    """
+
+    return EncryptionResponse(
+        preferred=CONFIG.security.e2ee.preferred_alg.label,
+        supported=[alg.label for alg in SESSION_ALGORITHMS],
+    )
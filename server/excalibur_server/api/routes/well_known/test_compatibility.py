@@ -29,3 +29,10 @@ def test_compatibility_abnormal():
     # Version should not have leading `v`
     response = _send_compatibility_request("v0.0.0")
     assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_compatibility_auth_protocols():
+    """Test that the compatibility endpoint lists the login handshake versions."""
+
+    response = _send_compatibility_request("0.0.0")
+    assert response.headers["X-Auth-Protocols"] == "1, 2"
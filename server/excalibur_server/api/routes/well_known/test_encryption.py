@@ -0,0 +1,16 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from excalibur_server.api.app import app
+from excalibur_server.src.config import CONFIG
+
+client = TestClient(app)
+
+
+def test_encryption():
+    """Test the encryption endpoint with GET request."""
+    response = client.get("/api/well-known/encryption")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["preferred"] == CONFIG.security.e2ee.preferred_alg.label
+    assert data["supported"] == ["aes-256-gcm", "chacha20-poly1305"]
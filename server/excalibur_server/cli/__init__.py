@@ -63,6 +63,7 @@ app.add_typer(user_app, name="user")
 from .init_server import init_server as init_server
 from .start_server import start_server as start_server
 from .reset_server import reset_server as reset_server
+from .benchmark import benchmark as benchmark
 
 # Handle possibly excluded commands
 try:
@@ -0,0 +1,100 @@
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated
+
+import typer
+
+from excalibur_server.cli import app
+
+if TYPE_CHECKING:
+    from excalibur_server.src.exef import Algorithm
+
+
+@app.command(name="benchmark")
+def benchmark(
+    size: Annotated[int, typer.Option("--size", "-s", help="Size of each test message, in bytes.")] = 1_048_576,
+    duration: Annotated[
+        float, typer.Option("--duration", "-t", help="Minimum time to spend measuring each cipher, in seconds.")
+    ] = 1.0,
+    save: Annotated[
+        bool,
+        typer.Option("--save/--no-save", help="Whether to record the faster cipher in the config file."),
+    ] = True,
+):
+    """
+    Measures the end-to-end encryption ciphers on this machine.
+
+    The faster cipher is recorded as the preferred algorithm in the config file, which is then
+    advertised to clients.
+    """
+
+    from excalibur_server.consts import CONFIG_FILE
+    from excalibur_server.src.config.security import SESSION_ALGORITHMS
+
+    results = {}
+    for alg in SESSION_ALGORITHMS:
+        typer.secho(f"Measuring {alg.label}...", nl=False, fg="yellow")
+        results[alg] = _measure_throughput(alg, size, duration)
+        typer.secho(f" {results[alg] / 1_048_576:.1f} MiB/s", fg="green")
+
+    preferred = max(results, key=results.get)
+    typer.secho(f"Preferred algorithm: {preferred.label}", fg="cyan")
+
+    if not save:
+        return
+
+    if not CONFIG_FILE.exists():
+        typer.secho("Config file not found; did you initialize the server?", fg="red")
+        raise typer.Exit(1)
+
+    _save_preferred_alg(CONFIG_FILE, preferred.label)
+    typer.secho(f"Saved preferred algorithm to '{CONFIG_FILE}'.", fg="green")
+
+
+def _measure_throughput(alg: "Algorithm", size: int, duration: float) -> float:
+    """
+    Measures how fast the algorithm encrypts and decrypts ExEF messages.
+
+    :param alg: The algorithm to measure
+    :param size: The size of each test message, in bytes
+    :param duration: The minimum time to spend measuring, in seconds
+    :return: The throughput, in bytes per second
+    """
+
+    import time
+
+    from Crypto.Random import get_random_bytes
+
+    from excalibur_server.src.exef import ExEFSession
+
+    key = get_random_bytes(alg.keysize // 8)
+    data = get_random_bytes(size)
+
+    processed = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < duration:
+        encrypted = ExEFSession(key, algorithm=alg).encrypt(data)
+        ExEFSession(key).decrypt(encrypted)
+        processed += 2 * size
+
+    return processed / elapsed
+
+
+def _save_preferred_alg(config_path: Path, label: str):
+    """
+    Records the preferred algorithm in the config file, keeping the rest of the file intact.
+
+    :param config_path: The path to the config file
+    :param label: The label of the preferred algorithm
+    """
+
+    contents = config_path.read_text()
+    line = f'preferred_alg = "{label}"'
+
+    if re.search(r"^preferred_alg\s*=.*$", contents, flags=re.MULTILINE):
+        contents = re.sub(r"^preferred_alg\s*=.*$", line, contents, count=1, flags=re.MULTILINE)
+    else:
+        # Older config files do not have the field yet; add it to the E2EE section
+        contents = re.sub(r"^\[security\.e2ee\]$", f"[security.e2ee]\n{line}", contents, count=1, flags=re.MULTILINE)
+
+    config_path.write_text(contents)
@@ -9,6 +9,15 @@ from excalibur_server.cli import app
 def start_server(
     host: Annotated[str, typer.Option(help="Host for the server to listen on.")] = "localhost",
     port: Annotated[int, typer.Option(help="Port for the server to listen on.")] = 52419,
+    workers: Annotated[
+        int,
+        typer.Option(
+            "--workers",
+            "-w",
+            min=1,
+            help="Number of worker processes. More than one needs the 'sqlite' store under `security.sessions`.",
+        ),
+    ] = 1,
     debug: Annotated[bool, typer.Option(help="Whether to run the server in debug mode.")] = False,
     encrypt_responses: Annotated[
         bool,
@@ -54,6 +63,13 @@ def start_server(
     from excalibur_server.consts import ROOT_FOLDER
     from excalibur_server.src.config import CONFIG
 
+    if workers > 1 and CONFIG.security.sessions.store == "memory":
+        typer.secho(
+            'Multiple workers cannot share in-memory sessions; set `store = "sqlite"` under [security.sessions].',
+            fg="red",
+        )
+        raise typer.Exit(1)
+
     # Set environment variables
     os.environ["EXCALIBUR_SERVER_DEBUG"] = "1" if debug else "0"
     os.environ["EXCALIBUR_SERVER_ENCRYPT_RESPONSES"] = "0" if not encrypt_responses else "1"
@@ -79,6 +95,7 @@ def start_server(
         port=port,
         log_config=log_config,
         reload=debug,
+        workers=workers,
         reload_dirs=[Path(__file__).parent.parent],
         reload_excludes=["test_*.py"],
     )
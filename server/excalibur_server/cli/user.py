@@ -1,25 +1,123 @@
 import binascii
 from base64 import b64decode
+from pathlib import Path
 from typing import Annotated
 
 import typer
 
 user_app = typer.Typer(no_args_is_help=True, help="User operations.")
 
+IMPORT_FIELDS = ("username", "password", "vault_key")
+
+
+def _decode_vault_key(value: str) -> bytes:
+    """
+    Decodes a base64 vault key.
+
+    :param value: the base64 string of the vault key
+    :raises ValueError: if the vault key is empty, not valid base64, or not 32 bytes
+    :return: the vault key
+    """
 
-def _vault_key_callback(value: str) -> str:
     if value.isspace():
-        raise typer.BadParameter("Vault key cannot be empty.")
+        raise ValueError("Vault key cannot be empty.")
     try:
         decoded = b64decode(value)
     except binascii.Error:
-        raise typer.BadParameter("Vault key must be a valid base64 string.")
+        raise ValueError("Vault key must be a valid base64 string.")
 
     if len(decoded) != 32:
-        raise typer.BadParameter("Vault key must be 32 bytes.")
+        raise ValueError("Vault key must be 32 bytes.")
+    return decoded
+
+
+def _vault_key_callback(value: str) -> str:
+    try:
+        _decode_vault_key(value)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
     return value
 
 
+def _read_json_user(line: str) -> dict | str:
+    """
+    Reads a user from a line of a JSONL file.
+
+    :param line: the line
+    :return: the user, as a dictionary of their fields, or a description of why it cannot be read
+    """
+
+    import json
+
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError as e:
+        return f"Invalid JSON ({e.msg})."
+
+    if not isinstance(row, dict):
+        return "Must be a JSON object."
+    return row
+
+
+def _read_users_file(file: Path) -> list[dict | str]:
+    """
+    Reads the users in a CSV (with a header row) or JSONL file.
+
+    :param file: the file, whose format is chosen by its extension
+    :raises typer.BadParameter: if the format of the file is not supported
+    :return: the users, as dictionaries of their fields, or descriptions of why they cannot be read
+    """
+
+    import csv
+
+    suffix = file.suffix.lower()
+    with open(file, "r", encoding="utf-8", newline="") as f:
+        if suffix == ".csv":
+            return list(csv.DictReader(f))
+        if suffix in (".jsonl", ".ndjson"):
+            return [_read_json_user(line) for line in f if line.strip()]
+
+    raise typer.BadParameter(f"Unsupported file type '{suffix}'; use a .csv or .jsonl file.", param_hint="FILE")
+
+
+def _check_import_rows(rows: list[dict | str]) -> tuple[dict[str, tuple[str, bytes]], list[str]]:
+    """
+    Checks the users read from an import file.
+
+    :param rows: the users, as dictionaries of their fields, or descriptions of why they cannot be read
+    :return: (password and vault key of each user by username, descriptions of the problems found)
+    """
+
+    users: dict[str, tuple[str, bytes]] = {}
+    errors = []
+    for row_num, row in enumerate(rows, start=1):
+        if isinstance(row, str):
+            errors.append(f"User {row_num}: {row}")
+            continue
+
+        missing = [field for field in IMPORT_FIELDS if not row.get(field)]
+        if missing:
+            errors.append(f"User {row_num}: missing {', '.join(missing)}.")
+            continue
+
+        not_text = [field for field in IMPORT_FIELDS if not isinstance(row[field], str)]
+        if not_text:
+            errors.append(f"User {row_num}: {', '.join(not_text)} must be text.")
+            continue
+
+        username = row["username"]
+        if username in users:
+            errors.append(f"User {row_num}: '{username}' appears more than once.")
+            continue
+
+        try:
+            users[username] = (row["password"], _decode_vault_key(row["vault_key"]))
+        except ValueError as e:
+            errors.append(f"User {row_num}: {e}")
+
+    return users, errors
+
+
 @user_app.command(name="add")
 def add_user(
     username: Annotated[str, typer.Option(help="Username for the API server.", prompt=True)],
@@ -42,47 +140,81 @@ def add_user(
     Assumes the server has been initialized.
     """
 
-    from base64 import b64decode
+    from excalibur_server.src.config import CONFIG
+    from excalibur_server.src.users import add_user, create_user
 
-    import typer
-    from Crypto.Random import get_random_bytes
-    from Crypto.Util.number import bytes_to_long, long_to_bytes
+    add_user(create_user(username, password, b64decode(vault_key), CONFIG.security.srp.group))
 
-    from excalibur_server.src.auth.keygen import generate_key
-    from excalibur_server.src.auth.srp import SRP
-    from excalibur_server.src.config import CONFIG
-    from excalibur_server.src.exef.exef import ExEF
-    from excalibur_server.src.users import User, add_user
+    typer.secho(f"Added '{username}' to the database.", fg="green")
 
-    srp_handler = SRP(CONFIG.security.srp.group)
 
-    # Generate salts and keys
-    auk_salt = get_random_bytes(16)
-    auk_key = generate_key(password, {"username": username}, auk_salt)
+@user_app.command(name="import")
+def import_users(
+    file: Annotated[
+        Path,
+        typer.Argument(
+            help="CSV or JSONL file of the users, with `username`, `password` and `vault_key` (base64) fields.",
+            exists=True,
+            dir_okay=False,
+        ),
+    ],
+    workers: Annotated[
+        int | None,
+        typer.Option(
+            "--workers", "-w", help="Number of processes deriving keys. Defaults to the number of CPUs.", min=1
+        ),
+    ] = None,
+    skip_existing: Annotated[
+        bool, typer.Option("--skip-existing", help="Skip users that already exist, instead of importing no one.")
+    ] = False,
+):
+    """
+    Adds many users to the API server at once.
 
-    srp_salt = get_random_bytes(16)
-    srp_key = generate_key(password, {"username": username}, srp_salt)
+    The keys of the users are derived in parallel, then all the users are added in a single
+    transaction; if anything goes wrong, no one is added.
 
-    # Generate SRP verifier
-    verifier = long_to_bytes(srp_handler.compute_verifier(bytes_to_long(srp_key)))
+    Assumes the server has been initialized.
+    """
+
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import repeat
+
+    from excalibur_server.src.config import CONFIG
+    from excalibur_server.src.users import add_users, create_user, get_existing_usernames
+
+    # Check the users before doing any slow work
+    new_users, errors = _check_import_rows(_read_users_file(file))
+    if errors:
+        for error in errors:
+            typer.secho(error, fg="red")
+        raise typer.Exit(code=1)
+
+    existing = get_existing_usernames(new_users)
+    if existing and not skip_existing:
+        typer.secho(f"Users already exist: {', '.join(sorted(existing))}", fg="red")
+        raise typer.Exit(code=1)
+
+    for username in existing:
+        del new_users[username]
+    if not new_users:
+        typer.secho("No users to add.", fg="yellow")
+        return
 
-    # Encrypt vault key
-    vault_key: bytes = b64decode(vault_key)
-    vault_key_enc = ExEF(auk_key, get_random_bytes(12)).encrypt(vault_key)
+    # Derive the keys of the users in parallel
+    users = []
+    passwords, vault_keys = zip(*new_users.values())
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(create_user, new_users, passwords, vault_keys, repeat(CONFIG.security.srp.group))
+        with typer.progressbar(results, length=len(new_users), label="Deriving keys") as progress:
+            users.extend(progress)
 
-    # Create user
-    add_user(
-        User(
-            username=username,
-            auk_salt=auk_salt,
-            srp_group=CONFIG.security.srp.group,
-            srp_salt=srp_salt,
-            srp_verifier=verifier,
-            key_enc=vault_key_enc,
-        )
-    )
+    add_users(users)
 
-    typer.secho(f"Added '{username}' to the database.", fg="green")
+    message = f"Added {len(users)} users to the database."
+    if existing:
+        message += f" Skipped {len(existing)} existing users."
+    typer.secho(message, fg="green")
 
 
 @user_app.command(name="remove")
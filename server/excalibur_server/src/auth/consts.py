@@ -1,9 +1,8 @@
-from Crypto.Random import get_random_bytes
-
+from excalibur_server.api.cache import SESSION_STORE
 from excalibur_server.api.misc import is_debug
 
 KEYSIZE = 256  # In bits
 if is_debug():
     KEY = b"one demo 16B key"
 else:
-    KEY = get_random_bytes(KEYSIZE // 8)
+    KEY = SESSION_STORE.secret("token_key", KEYSIZE // 8)  # Shared by all processes using the store
@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+
+from starlette.types import Scope
+
+from excalibur_server.api.cache import MASTER_KEYS_CACHE, SESSION_SEALER, SESSION_STORE
+from excalibur_server.src.auth.consts import KEY
+
+from .jwt import decode_token, forget_token
+
+AUTH_CONTEXT_STATE_KEY = "auth_context"
+SEALED_KEY_CLAIM = "key"
+AUTH_TIME_CLAIM = "auth_time"
+
+
+@dataclass(frozen=True)
+class AuthContext:
+    """
+    Authentication details of a request, found by verifying its bearer token.
+    """
+
+    token: str
+    "The bearer token that was verified"
+    username: str
+    "The subject of the token"
+    comm_uuid: str
+    "The UUID of the communication session"
+    master_key: bytes
+    "The master key of the communication session"
+    auth_time: int = 0
+    "When the user logged in to start the session, as a timestamp"
+
+
+def get_master_key(token: str, decoded: dict) -> bytes | None:
+    """
+    Gets the master key of the session that a verified token belongs to.
+
+    Tokens of stateless sessions carry the key themselves, sealed by the server; for other tokens,
+    the key is looked up in the master keys cache.
+
+    :param token: the bearer token
+    :param decoded: the claims of the token
+    :return: the master key, or None if the session has ended
+    """
+
+    comm_uuid = decoded["uuid"]
+    sealed_key = decoded.get(SEALED_KEY_CLAIM)
+    if sealed_key is None:
+        master_key = MASTER_KEYS_CACHE.get(comm_uuid)
+    elif SESSION_STORE.is_revoked(comm_uuid):
+        master_key = None
+    else:
+        master_key = SESSION_SEALER.unseal(sealed_key, decoded["sub"], comm_uuid)
+
+    if master_key is None:
+        forget_token(token, KEY)  # The session has ended, so the token is no longer of use
+    return master_key
+
+
+def get_auth_context(scope: Scope, token: str) -> AuthContext | None:
+    """
+    Gets the authentication details of a request.
+
+    The token is only verified by the first component of the request that asks for the details
+    (usually the route encryption middleware). The details are then kept in the request state, so
+    later components (e.g., `get_credentials`) reuse them.
+
+    :param scope: the scope of the request
+    :param token: the bearer token of the request
+    :return: the authentication details, or None if the token is invalid or the session has ended
+    """
+
+    state = scope.setdefault("state", {})
+    context: AuthContext | None = state.get(AUTH_CONTEXT_STATE_KEY)
+    if context is not None and context.token == token:
+        return context
+
+    decoded = decode_token(token, KEY)
+    if decoded is None or "uuid" not in decoded:
+        return None
+
+    master_key = get_master_key(token, decoded)
+    if master_key is None:
+        return None
+
+    context = AuthContext(
+        token=token,
+        username=decoded["sub"],
+        comm_uuid=decoded["uuid"],
+        master_key=master_key,
+        auth_time=decoded.get(AUTH_TIME_CLAIM, 0),
+    )
+    state[AUTH_CONTEXT_STATE_KEY] = context
+    return context
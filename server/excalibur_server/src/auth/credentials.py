@@ -1,18 +1,25 @@
 import os
 from datetime import datetime, timezone
 from typing import Annotated
+from uuid import uuid4
 
+from Crypto.Cipher import AES
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
 from fastapi import Header, HTTPException, Request, Security, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-from excalibur_server.api.cache import MASTER_KEYS_CACHE, POP_NONCE_CACHE
+from excalibur_server.api.cache import MASTER_KEYS_CACHE, POP_VERIFIERS_CACHE, SESSION_SEALER, SESSION_STORE
 from excalibur_server.src.auth.consts import KEY
-from excalibur_server.src.auth.pop import POP_HEADER_PATTERN, generate_pop, parse_pop_header
+from excalibur_server.src.auth.pop import POP_HEADER_PATTERN, PoPVerifier, parse_pop_header
 from excalibur_server.src.config import CONFIG
 from excalibur_server.src.url import get_url_encoded_path
 
+from .context import AUTH_TIME_CLAIM, SEALED_KEY_CLAIM, get_auth_context, get_master_key
 from .jwt import decode_token, generate_token
 
+RATCHET_CONTEXT = b"excalibur-session-ratchet"
+
 API_TOKEN_HEADER = HTTPBearer(scheme_name="SRP-Identity", auto_error=False)
 CREDENTIALS_EXCEPTION = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -21,24 +28,103 @@ CREDENTIALS_EXCEPTION = HTTPException(
 )
 
 
-def generate_auth_token(username: str, comm_uuid: str, expiry_timestamp: float) -> str:
+def generate_auth_token(
+    username: str,
+    comm_uuid: str,
+    expiry_timestamp: float,
+    master_key: bytes | None = None,
+    auth_time: float | None = None,
+) -> str:
     """
     Generates a JWT token for the given E2EE key and expiry timestamp.
 
     :param username: the username
     :param comm_uuid: the UUID of the communication session
     :param expiry_timestamp: the timestamp when the token expires
+    :param master_key: the master key of a stateless session, which is sealed into the token. If
+        not provided, the key must be in the master keys cache
+    :param auth_time: the timestamp when the user logged in, for refreshed tokens. If not provided,
+        the user is taken to have just logged in
     :return: a serialized JWT
     """
 
+    now = datetime.now(tz=timezone.utc).timestamp()
+    data = {"uuid": comm_uuid, AUTH_TIME_CLAIM: int(now if auth_time is None else auth_time)}
+    if master_key is not None:
+        data[SEALED_KEY_CLAIM] = SESSION_SEALER.seal(master_key, username, comm_uuid)
+
     return generate_token(
         sub=username,
-        data={"uuid": comm_uuid},
+        data=data,
         key=KEY,
-        expiry=int(round(expiry_timestamp - datetime.now(tz=timezone.utc).timestamp())),
+        expiry=int(round(expiry_timestamp - now)),
+    )
+
+
+def issue_session_token(
+    username: str, comm_uuid: str, expiry_timestamp: float, master_key: bytes, auth_time: float | None = None
+) -> str:
+    """
+    Issues the auth token of a communication session, keeping its master key where the session
+    store setting says: in the master keys cache, or sealed into the token itself.
+
+    :param username: the username
+    :param comm_uuid: the UUID of the communication session. If it is already in the master keys
+        cache, its entry is replaced
+    :param expiry_timestamp: the timestamp when the token expires
+    :param master_key: the master key of the session
+    :param auth_time: the timestamp when the user logged in, for refreshed tokens. If not provided,
+        the user is taken to have just logged in
+    :return: a serialized JWT
+    """
+
+    stateless = CONFIG.security.sessions.stateless
+    if not stateless:
+        MASTER_KEYS_CACHE[comm_uuid] = master_key
+
+    return generate_auth_token(
+        username,
+        comm_uuid,
+        expiry_timestamp,
+        master_key=master_key if stateless else None,
+        auth_time=auth_time,
     )
 
 
+def start_session(username: str, master_key: bytes) -> tuple[bytes, bytes, bytes]:
+    """
+    Starts a communication session for a user who has just logged in, and issues its auth token.
+
+    The token is encrypted with AES-GCM under the master key, so that only the client that took
+    part in the login can use it.
+
+    :param username: the username
+    :param master_key: the master key of the session
+    :return: (nonce, encrypted auth token, tag)
+    """
+
+    auth_token = issue_session_token(
+        username, uuid4().hex, datetime.now(tz=timezone.utc).timestamp() + CONFIG.security.session_duration, master_key
+    )
+
+    cipher = AES.new(master_key, AES.MODE_GCM)
+    auth_token_enc, tag = cipher.encrypt_and_digest(auth_token.encode("UTF-8"))
+    return cipher.nonce, auth_token_enc, tag
+
+
+def ratchet_master_key(master_key: bytes) -> bytes:
+    """
+    Derives the next master key of a session from the current one.
+
+    The derivation is one-way, so the new key does not reveal the old one.
+
+    :param master_key: the current master key
+    :return: the next master key, of the same length
+    """
+
+    return HKDF(master_key, len(master_key), b"", SHA256, context=RATCHET_CONTEXT)
+
+
 def check_auth_token(token: str) -> bool:
     """
     Checks the validity of the auth token.
@@ -48,14 +134,26 @@ def check_auth_token(token: str) -> bool:
     """
 
     decoded = decode_token(token, KEY)
-    if decoded is None:
+    if decoded is None or "uuid" not in decoded:
         return False
 
-    comm_uuid = decoded.pop("uuid")
-    if comm_uuid not in MASTER_KEYS_CACHE:
-        return False
+    return get_master_key(token, decoded) is not None
 
-    return True
+
+def get_pop_verifier(comm_uuid: str, master_key: bytes) -> PoPVerifier:
+    """
+    Gets the PoP verifier of a session, creating it if needed.
+
+    :param comm_uuid: the UUID of the communication session
+    :param master_key: the master key of the session
+    :return: the PoP verifier
+    """
+
+    verifier = POP_VERIFIERS_CACHE.get(comm_uuid)
+    if verifier is None or verifier.master_key != master_key:
+        verifier = PoPVerifier(master_key)
+        POP_VERIFIERS_CACHE[comm_uuid] = verifier
+    return verifier
 
 
 async def get_credentials(
@@ -82,15 +180,11 @@ async def get_credentials(
     if not credentials:
         raise CREDENTIALS_EXCEPTION
 
-    # Check if the provided identity token is valid
-    decoded = decode_token(credentials.credentials, KEY)
-    if decoded is None:
-        raise CREDENTIALS_EXCEPTION
-    sub = decoded["sub"]
-    comm_uuid = decoded["uuid"]
-
-    if comm_uuid not in MASTER_KEYS_CACHE:
+    # Check if the provided identity token is valid (reusing the middleware's check, if any)
+    context = get_auth_context(request.scope, credentials.credentials)
+    if context is None:
         raise CREDENTIALS_EXCEPTION
+    sub = context.username
 
     if os.getenv("EXCALIBUR_SERVER_HMAC_ENABLED", "true") != "true":
         # No need to proceed to check header
@@ -106,35 +200,44 @@ async def get_credentials(
 
     timestamp, nonce, hmac = parse_pop_header(hmac_validation)
 
-    # Check if timestamp is within acceptable range
-    if timestamp < datetime.now(tz=timezone.utc).timestamp() - CONFIG.security.pop.timestamp_validity:
+    # Check if timestamp is within acceptable range (in either direction, so that nonces need only be
+    # remembered for a bounded time)
+    now = datetime.now(tz=timezone.utc).timestamp()
+    if abs(now - timestamp) > CONFIG.security.pop.timestamp_validity:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid timestamp",
             headers={"X-SRP-PoP": POP_HEADER_PATTERN},
         )
 
-    # Check if nonce is fresh
-    if nonce in POP_NONCE_CACHE:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Nonce reused",
-            headers={"X-SRP-PoP": POP_HEADER_PATTERN},
-        )
-
-    # Add nonce to cache of known nonces
-    POP_NONCE_CACHE[nonce] = True
-
     # Extract parts needed for the SRP Proof of Possession (PoP)
-    master_key = MASTER_KEYS_CACHE[comm_uuid]
+    verifier = get_pop_verifier(context.comm_uuid, context.master_key)
     method = request.method
     path = get_url_encoded_path(request.url)
 
     # Check if the SRP PoP is valid
-    hmac_computed = generate_pop(master_key, method, path, timestamp, nonce)
-    if hmac_computed != hmac:
+    if not verifier.verify(method, path, timestamp, nonce, hmac):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid PoP",
         )
+
+    # Check if nonce is fresh, remembering it if so (only authentic nonces are stored, so that they
+    # cannot be used to fill the store up)
+    try:
+        fresh = SESSION_STORE.add_nonce(nonce, timestamp, now)
+    except OverflowError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": "1"},
+        )
+
+    if not fresh:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Nonce reused",
+            headers={"X-SRP-PoP": POP_HEADER_PATTERN},
+        )
+
     return sub
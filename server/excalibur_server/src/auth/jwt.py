@@ -1,14 +1,22 @@
 import hashlib
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
 import jwt
 from jwt.exceptions import InvalidTokenError
 
+from excalibur_server.api.cache import VERIFIED_TOKENS_CACHE
 
+KEY_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def _generate_key(username: str, key: bytes) -> bytes:
     """
     Generates a key for the given username.
 
+    The keys are memoised, since the same few users sign and verify tokens over and over.
+
     :param username: the username
     :param key: the key to use for the token
     :return: the generated key
@@ -34,16 +42,46 @@ def generate_token(sub: str, data: dict, key: bytes, expiry: int = 3600) -> str:
     return jwt.encode(data, _generate_key(sub, key), algorithm="HS256")
 
 
+def _token_digest(token: str, key: bytes) -> bytes:
+    """
+    Gets the digest that identifies a token in the verified tokens cache.
+
+    :param token: serialized JWT
+    :param key: the key to use for the token
+    :return: the digest
+    """
+
+    return hashlib.sha256(key + token.encode("utf-8")).digest()
+
+
+def forget_token(token: str, key: bytes):
+    """
+    Removes the given token from the verified tokens cache, so that it is verified again next time.
+
+    :param token: serialized JWT
+    :param key: the key to use for the token
+    """
+
+    VERIFIED_TOKENS_CACHE.pop(_token_digest(token, key), None)
+
+
 def decode_token(token: str, key: bytes) -> dict | None:
     """
     Decodes the given token.
 
+    Tokens that have been verified before are looked up in the verified tokens cache instead of
+    being verified again. Entries leave the cache once their tokens expire.
+
     :param token: serialized JWT
-    :param sub: the subject of the token
     :param key: the key to use for the token
     :return: the decoded payload, or None if the token is invalid or expired
     """
 
+    digest = _token_digest(token, key)
+    cached = VERIFIED_TOKENS_CACHE.get(digest)
+    if cached is not None:
+        return cached[0].copy()
+
     # Try to get the subject
     try:
         decoded: dict = jwt.decode(token, options={"verify_signature": False})
@@ -66,4 +104,5 @@ def decode_token(token: str, key: bytes) -> dict | None:
     if expiry < now:
         return None
 
+    VERIFIED_TOKENS_CACHE[digest] = (decoded.copy(), expiry)
     return decoded
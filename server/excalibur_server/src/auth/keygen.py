@@ -65,4 +65,4 @@ def generate_key(password: str, additional_info: KeygenAdditionalInfo, salt: byt
     password_buf = normalize_password(password)
     i_key_1 = slow_hash(password_buf, salt)
     i_key_2 = fast_hash(additional_info, salt)
-    return b"".join([bytes([i_key_1[i] ^ i_key_2[i]]) for i in range(KEY_LENGTH)])
+    return (int.from_bytes(i_key_1) ^ int.from_bytes(i_key_2)).to_bytes(KEY_LENGTH)
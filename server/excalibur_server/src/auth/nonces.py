@@ -0,0 +1,171 @@
+import os
+import time
+from array import array
+from hashlib import blake2b
+
+FINGERPRINT_SIZE = 8  # Bytes
+
+
+class _FingerprintSet:
+    """
+    Set of 64-bit nonce fingerprints, stored in a flat open-addressing table.
+
+    Uses 16 to 32 bytes per fingerprint, compared to around 100 bytes per nonce in a `set`.
+    """
+
+    __slots__ = ("_table", "_mask", "_count")
+
+    def __init__(self, capacity: int = 16):
+        """
+        Initializes the set.
+
+        :param capacity: The initial number of slots, which must be a power of 2
+        """
+
+        self._table = array("Q", bytes(FINGERPRINT_SIZE * capacity))
+        self._mask = capacity - 1
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, fingerprint: int) -> bool:
+        table, mask = self._table, self._mask
+        i = fingerprint & mask
+        while (current := table[i]) != 0:
+            if current == fingerprint:
+                return True
+            i = (i + 1) & mask
+        return False
+
+    def _insert(self, fingerprint: int):
+        table, mask = self._table, self._mask
+        i = fingerprint & mask
+        while table[i] != 0:
+            i = (i + 1) & mask
+        table[i] = fingerprint
+
+    def add(self, fingerprint: int):
+        """
+        Adds a fingerprint that is not yet in the set.
+
+        :param fingerprint: The non-zero fingerprint
+        """
+
+        if (self._count + 1) * 2 > len(self._table):
+            # Keep the table at most half full, so that probe sequences stay short
+            old_table = self._table
+            self._table = array("Q", bytes(FINGERPRINT_SIZE * len(old_table) * 2))
+            self._mask = len(self._table) - 1
+            for current in old_table:
+                if current != 0:
+                    self._insert(current)
+
+        self._insert(fingerprint)
+        self._count += 1
+
+
+class NonceStore:
+    """
+    Store of recently seen nonces, used to reject replayed Proofs of Possession (PoPs).
+
+    Nonces are grouped into buckets by the timestamp of the request they came with. A replayed
+    request carries the same timestamp (which the PoP covers), so it always lands in the same bucket
+    as the original. Once a timestamp is too old to be accepted at all, its whole bucket is dropped.
+
+    The number of nonces held is capped. Rather than evicting nonces that are still valid (which
+    would let them be replayed), new nonces are refused once the store is full.
+    """
+
+    def __init__(self, validity: int, max_nonces: int, compact: bool = False):
+        """
+        Initializes the store.
+
+        :param validity: How long a timestamp is accepted for, in seconds
+        :param max_nonces: The most nonces to hold at once
+        :param compact: Whether to keep 64-bit keyed fingerprints of the nonces instead of the nonces
+            themselves, which uses several times less memory
+        """
+
+        self.validity = validity
+        self.max_nonces = max_nonces
+        self.compact = compact
+
+        self._buckets: dict[int, set[bytes] | _FingerprintSet] = {}
+        self._count = 0
+        self._horizon = 0  # Buckets for timestamps before this have been dropped
+
+        self._fingerprint_key = os.urandom(16)  # Keyed, so that collisions cannot be chosen by clients
+
+    def __len__(self) -> int:
+        return self._count
+
+    # Helper methods
+    def _fingerprint(self, nonce: bytes) -> int:
+        """
+        Gets the fingerprint of a nonce.
+
+        :param nonce: The nonce
+        :return: The fingerprint, which is never 0 (as 0 marks an empty slot)
+        """
+
+        digest = blake2b(nonce, digest_size=FINGERPRINT_SIZE, key=self._fingerprint_key).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def _expire(self, now: int):
+        """
+        Drops the buckets of timestamps that are no longer accepted.
+
+        :param now: The current timestamp
+        """
+
+        self.refuse_before(now - self.validity)
+
+    # Public methods
+    def refuse_before(self, timestamp: int):
+        """
+        Refuses all nonces of requests made before a time, as if they had been seen already.
+
+        Used when the nonces seen before that time are not known (e.g., after a restart).
+
+        :param timestamp: The earliest timestamp to accept
+        """
+
+        if timestamp <= self._horizon:
+            return
+
+        self._horizon = timestamp
+        for old_timestamp in [old_timestamp for old_timestamp in self._buckets if old_timestamp < timestamp]:
+            self._count -= len(self._buckets.pop(old_timestamp))
+
+    def add(self, nonce: bytes, timestamp: int, now: float | None = None) -> bool:
+        """
+        Records a nonce, if it has not been seen before.
+
+        :param nonce: The nonce
+        :param timestamp: The timestamp of the request that the nonce came with
+        :param now: The current time. If not provided, the system time is used
+        :raises OverflowError: If the nonce is new but the store is full
+        :return: True if the nonce is new and False if it is a replay (or its timestamp is too old
+            to tell)
+        """
+
+        self._expire(int(time.time() if now is None else now))
+        if timestamp < self._horizon:
+            return False
+
+        key = self._fingerprint(nonce) if self.compact else nonce
+        bucket = self._buckets.get(timestamp)
+        if bucket is not None and key in bucket:
+            return False
+
+        if self._count >= self.max_nonces:
+            raise OverflowError("nonce store is full")
+
+        if bucket is None:
+            bucket = _FingerprintSet() if self.compact else set()
+            self._buckets[timestamp] = bucket
+
+        bucket.add(key)
+        self._count += 1
+        return True
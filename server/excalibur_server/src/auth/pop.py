@@ -1,8 +1,23 @@
 import re
 from base64 import b64decode, b64encode
-from hmac import HMAC
+from hmac import HMAC, compare_digest
 
 POP_HEADER_PATTERN = r"^(?:(?<timestamp>[0-9]{1,10}) (?<nonce>[A-Za-z0-9+\/]{22}==) (?<hmac>[A-Za-z0-9+\/]{43}=)|)$"
+_POP_HEADER_REGEX = re.compile(POP_HEADER_PATTERN.replace(r"?<", r"?P<"))  # Python spells named groups `?P<`
+
+
+def _pop_message(method: str, path: str, timestamp: int, nonce: bytes) -> bytes:
+    """
+    Builds the message that the Proof of Possession (PoP) authenticates.
+
+    :param method: the HTTP method
+    :param path: the path
+    :param timestamp: the timestamp
+    :param nonce: the nonce
+    :return: the message
+    """
+
+    return f"{method} {path} {timestamp} ".encode("UTF-8") + nonce
 
 
 def generate_pop(master_key: bytes, method: str, path: str, timestamp: int, nonce: bytes) -> bytes:
@@ -17,8 +32,7 @@ def generate_pop(master_key: bytes, method: str, path: str, timestamp: int, nonc
     :return: the PoP
     """
 
-    hmac_msg = f"{method} {path} {timestamp} ".encode("UTF-8") + nonce
-    return HMAC(master_key, hmac_msg, "sha256").digest()
+    return HMAC(master_key, _pop_message(method, path, timestamp, nonce), "sha256").digest()
 
 
 def generate_pop_header(master_key: bytes, method: str, path: str, timestamp: int, nonce: bytes) -> str:
@@ -48,10 +62,58 @@ def parse_pop_header(pop_header: str) -> tuple[int, bytes, bytes]:
     :return: a tuple of the timestamp, nonce, and HMAC
     """
 
-    match = re.match(POP_HEADER_PATTERN.replace(r"?<", r"?P<"), pop_header)
+    match = _POP_HEADER_REGEX.match(pop_header)
 
     timestamp = int(match.group("timestamp"))
     nonce = b64decode(match.group("nonce"))
     hmac = b64decode(match.group("hmac"))
 
     return timestamp, nonce, hmac
+
+
+class PoPVerifier:
+    """
+    Verifies the Proofs of Possession (PoPs) of one session.
+
+    The HMAC is keyed once, when the verifier is created; each check then only copies the keyed
+    state, rather than setting up the key again.
+    """
+
+    def __init__(self, master_key: bytes):
+        """
+        Initializes the verifier.
+
+        :param master_key: the master key of the session
+        """
+
+        self.master_key = master_key
+        self._hmac = HMAC(master_key, digestmod="sha256")
+
+    def generate(self, method: str, path: str, timestamp: int, nonce: bytes) -> bytes:
+        """
+        Generates the Proof of Possession (PoP) for a request, as `generate_pop` does.
+
+        :param method: the HTTP method
+        :param path: the path
+        :param timestamp: the timestamp
+        :param nonce: the nonce
+        :return: the PoP
+        """
+
+        hmac = self._hmac.copy()
+        hmac.update(_pop_message(method, path, timestamp, nonce))
+        return hmac.digest()
+
+    def verify(self, method: str, path: str, timestamp: int, nonce: bytes, pop: bytes) -> bool:
+        """
+        Checks the Proof of Possession (PoP) of a request, in constant time.
+
+        :param method: the HTTP method
+        :param path: the path
+        :param timestamp: the timestamp
+        :param nonce: the nonce
+        :param pop: the PoP to check
+        :return: True if the PoP is valid and False otherwise
+        """
+
+        return compare_digest(self.generate(method, path, timestamp, nonce), pop)
@@ -1,4 +1,6 @@
 from .group import SRPGroup
 from .operation import SRP
+from .pool import EphemeralPool
+from .workers import SRPWorkers
 
-__all__ = ["SRP", "SRPGroup"]
+__all__ = ["SRP", "EphemeralPool", "SRPGroup", "SRPWorkers"]
@@ -0,0 +1,63 @@
+class FixedBaseTable:
+    """
+    Table for fast exponentiation of a fixed base modulo a fixed modulus.
+
+    Uses the fixed-base windowed method: the exponent is split into digits of `window` bits, and the
+    table holds `base^(d * 2^(window * i))` for every digit `d` at every position `i`. An
+    exponentiation is then one modular multiplication per non-zero digit, instead of one squaring
+    per bit of the exponent.
+    """
+
+    def __init__(self, base: int, modulus: int, max_bits: int = 256, window: int = 8):
+        """
+        Builds the table.
+
+        The table takes `ceil(max_bits / window) * 2^window` numbers of the size of the modulus
+        (about 2 MiB for a 2048-bit modulus and the defaults).
+
+        :param base: The fixed base
+        :param modulus: The fixed modulus
+        :param max_bits: The largest exponent, in bits, that the table covers. Larger exponents
+            are computed with `pow()`
+        :param window: The number of exponent bits handled by each multiplication
+        """
+
+        self.base = base
+        self.modulus = modulus
+        self.max_bits = max_bits
+        self.window = window
+
+        self._mask = (1 << window) - 1
+        self._rows: list[list[int]] = []
+
+        row_base = base % modulus
+        for _ in range(-(-max_bits // window)):
+            row = [1] * (1 << window)
+            for digit in range(1, 1 << window):
+                row[digit] = row[digit - 1] * row_base % modulus
+            self._rows.append(row)
+            row_base = row[-1] * row_base % modulus  # base^(2^window) of the previous row
+
+    def pow(self, exponent: int) -> int:
+        """
+        Computes `base^exponent mod modulus`.
+
+        :param exponent: The exponent
+        :return: The result
+        """
+
+        if exponent < 0 or exponent.bit_length() > self.max_bits:
+            return pow(self.base, exponent, self.modulus)
+
+        modulus, mask, window = self.modulus, self._mask, self.window
+        result = 1
+        for row in self._rows:
+            if exponent == 0:
+                break
+
+            digit = exponent & mask
+            if digit:
+                result = result * row[digit] % modulus
+            exponent >>= window
+
+        return result % modulus
@@ -3,6 +3,11 @@ from enum import Enum
 from Crypto.Hash import SHA1
 from Crypto.Util.number import bytes_to_long, long_to_bytes
 
+from .fixed_base import FixedBaseTable
+
+EXPONENT_BITS = 256
+"""Size of the exponents raised to the generator: server private values and verifier keys"""
+
 
 class SRPGroup(Enum):
     """
@@ -46,3 +51,24 @@ class SRPGroup(Enum):
         predigest = long_to_bytes(self.prime) + padded_generator
         digest = SHA1.new(predigest).digest()
         self.multiplier = bytes_to_long(digest)
+
+        self._fixed_base: FixedBaseTable | None = None
+
+    @property
+    def fixed_base(self) -> FixedBaseTable:
+        """
+        Table for fast exponentiation of the generator, which is built on first use.
+        """
+
+        return self.build_fixed_base()
+
+    def build_fixed_base(self) -> FixedBaseTable:
+        """
+        Builds the fixed-base table now, if it was not built yet, rather than on first use.
+
+        :return: The table
+        """
+
+        if self._fixed_base is None:
+            self._fixed_base = FixedBaseTable(self.generator, self.prime, max_bits=EXPONENT_BITS)
+        return self._fixed_base
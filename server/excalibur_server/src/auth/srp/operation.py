@@ -2,7 +2,8 @@ from Crypto.Hash import SHA1, SHA3_256
 from Crypto.Random.random import getrandbits
 from Crypto.Util.number import bytes_to_long, long_to_bytes
 
-from excalibur_server.src.auth.srp.group import SRPGroup
+from excalibur_server.src.auth.srp.group import EXPONENT_BITS, SRPGroup
+from excalibur_server.src.auth.srp.pool import EphemeralPool
 
 
 class SRP:
@@ -10,14 +11,20 @@ class SRP:
     Class that handles the SRP operations, as described in RFC5054.
     """
 
-    def __init__(self, group: SRPGroup):
+    def __init__(self, group: SRPGroup, pool: EphemeralPool | None = None):
         """
         Constructor.
 
         :param group: SRP group
+        :param pool: pool of pre-generated server ephemeral values to draw from, if any
+        :raises ValueError: if the pool is for another group
         """
 
+        if pool is not None and pool.group != group:
+            raise ValueError(f"Ephemeral pool is for {pool.group}, not {group}")
+
         self.group = group
+        self.pool = pool
 
     def __repr__(self) -> str:
         return f"SRP({self.group})"
@@ -64,7 +71,7 @@ class SRP:
         :return: verifier value
         """
 
-        return pow(self.group.generator, key, self.group.prime)
+        return self.group.fixed_base.pow(key)
 
     def compute_server_public_value(self, verifier: int, private_value: int | None = None) -> tuple[int, int]:
         """
@@ -75,12 +82,15 @@ class SRP:
         :return: (server private value, server public value)
         """
 
-        if private_value is None:
-            private_value = getrandbits(256)
+        if private_value is not None:
+            generator_power = self.group.fixed_base.pow(private_value)
+        elif self.pool is not None:
+            private_value, generator_power = self.pool.take()
+        else:
+            private_value = getrandbits(EXPONENT_BITS)
+            generator_power = self.group.fixed_base.pow(private_value)
 
-        public_value = (
-            self.group.multiplier * verifier + pow(self.group.generator, private_value, self.group.prime)
-        ) % self.group.prime
+        public_value = (self.group.multiplier * verifier + generator_power) % self.group.prime
         return private_value, public_value
 
     def compute_u(self, client_public_value: int, server_public_value: int) -> int:
@@ -0,0 +1,84 @@
+import threading
+from collections import deque
+
+from Crypto.Random.random import getrandbits
+
+from .group import EXPONENT_BITS, SRPGroup
+
+
+class EphemeralPool:
+    """
+    Pool of pre-generated server ephemeral pairs `(b, g^b mod N)` for an SRP group.
+
+    Handshakes take pairs from the pool, so that they only need to compute `k*v + g^b`. A background
+    thread tops the pool up once it is half empty. Each pair is handed out once.
+    """
+
+    def __init__(self, group: SRPGroup, size: int):
+        """
+        Initializes the pool, which starts empty.
+
+        :param group: The SRP group
+        :param size: The number of pairs to keep ready. If 0, pairs are always generated on demand
+        """
+
+        self.group = group
+        self.size = size
+
+        self._pairs: deque[tuple[int, int]] = deque()
+        self._wanted = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+    # Helper methods
+    def _generate(self) -> tuple[int, int]:
+        private_value = getrandbits(EXPONENT_BITS)
+        return private_value, self.group.fixed_base.pow(private_value)
+
+    def _run(self):
+        while True:
+            self._wanted.wait()
+            self._wanted.clear()
+            self.fill()
+
+    # Public methods
+    def fill(self):
+        """
+        Generates pairs until the pool is full.
+        """
+
+        while len(self._pairs) < self.size:
+            self._pairs.append(self._generate())
+
+    def start(self):
+        """
+        Starts the background thread that keeps the pool full, if it is not running yet.
+        """
+
+        if self.size == 0:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="excalibur-srp-pool", daemon=True)
+                self._thread.start()
+        self._wanted.set()
+
+    def take(self) -> tuple[int, int]:
+        """
+        Takes a pair from the pool, generating one if the pool is empty.
+
+        :return: (server private value, generator raised to it)
+        """
+
+        try:
+            pair = self._pairs.popleft()
+        except IndexError:
+            pair = self._generate()
+
+        if len(self._pairs) <= self.size // 2:
+            self.start()
+        return pair
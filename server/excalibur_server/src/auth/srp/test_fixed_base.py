@@ -0,0 +1,26 @@
+import pytest
+from Crypto.Random.random import getrandbits
+
+from .fixed_base import FixedBaseTable
+from .group import SRPGroup
+
+GROUP = SRPGroup.SMALL
+
+
+@pytest.mark.parametrize("window", [1, 4, 5, 8])
+def test_pow(window: int):
+    table = FixedBaseTable(GROUP.generator, GROUP.prime, max_bits=256, window=window)
+    for exponent in [0, 1, 2, 255, 256, 2**256 - 1] + [getrandbits(256) for _ in range(20)]:
+        assert table.pow(exponent) == pow(GROUP.generator, exponent, GROUP.prime)
+
+
+def test_out_of_range():
+    table = FixedBaseTable(GROUP.generator, GROUP.prime, max_bits=64)
+    for exponent in [2**64, getrandbits(512), -5]:
+        assert table.pow(exponent) == pow(GROUP.generator, exponent, GROUP.prime)
+
+
+def test_group_table():
+    assert GROUP.build_fixed_base() is GROUP.fixed_base is GROUP.fixed_base
+    exponent = getrandbits(256)
+    assert GROUP.fixed_base.pow(exponent) == pow(GROUP.generator, exponent, GROUP.prime)
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from .group import SRPGroup
+from .operation import SRP
+from .pool import EphemeralPool
+
+GROUP = SRPGroup.SMALL
+
+
+def _wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_take():
+    pool = EphemeralPool(GROUP, 4)
+    pool.fill()
+    assert len(pool) == 4
+
+    pairs = [pool.take() for _ in range(8)]  # More than the pool holds
+    assert len({private_value for private_value, _ in pairs}) == 8
+    for private_value, generator_power in pairs:
+        assert generator_power == pow(GROUP.generator, private_value, GROUP.prime)
+
+
+def test_background_refill():
+    pool = EphemeralPool(GROUP, 8)
+    pool.take()
+    _wait_for(lambda: len(pool) == 8)
+
+    for _ in range(5):
+        pool.take()
+    _wait_for(lambda: len(pool) == 8)
+
+
+def test_disabled():
+    pool = EphemeralPool(GROUP, 0)
+    private_value, generator_power = pool.take()
+    assert generator_power == pow(GROUP.generator, private_value, GROUP.prime)
+    assert len(pool) == 0
+
+
+def test_srp_with_pool():
+    pool = EphemeralPool(GROUP, 2)
+    pool.fill()
+    handler = SRP(GROUP, pool=pool)
+
+    verifier = handler.compute_verifier(12345)
+    private_value, public_value = handler.compute_server_public_value(verifier)
+    expected = (GROUP.multiplier * verifier + pow(GROUP.generator, private_value, GROUP.prime)) % GROUP.prime
+    assert public_value == expected
+
+
+def test_srp_pool_group():
+    with pytest.raises(ValueError):
+        SRP(SRPGroup.MEDIUM, pool=EphemeralPool(GROUP, 2))
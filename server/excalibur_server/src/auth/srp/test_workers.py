@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from .group import SRPGroup
+from .operation import SRP
+from .pool import EphemeralPool
+from .test_operation import A_PUB, B_PRIV, B_PUB, PREMASTER_SECRET, U, V
+from .workers import SRPWorkers
+
+SRP_HANDLER = SRP(SRPGroup.SMALL)
+
+
+@pytest.fixture(scope="module")
+def workers() -> SRPWorkers:
+    workers = SRPWorkers(1, 4, 30)
+    yield workers
+    workers.shutdown()
+
+
+def test_offloaded(workers: SRPWorkers):
+    assert asyncio.run(workers.compute_server_public_value(SRP_HANDLER, V, B_PRIV)) == (B_PRIV, B_PUB)
+    assert asyncio.run(workers.compute_premaster_secret(SRP_HANDLER, A_PUB, B_PRIV, U, V)) == PREMASTER_SECRET
+    assert workers._executor is not None
+
+
+def test_random_private_value(workers: SRPWorkers):
+    b_priv, b_pub = asyncio.run(workers.compute_server_public_value(SRP_HANDLER, V))
+    assert (b_priv, b_pub) == SRP_HANDLER.compute_server_public_value(V, b_priv)
+
+
+def test_pooled_inline():
+    workers = SRPWorkers(1, 4, 30)
+    pool = EphemeralPool(SRPGroup.SMALL, 0)
+    b_priv, b_pub = asyncio.run(workers.compute_server_public_value(SRP(SRPGroup.SMALL, pool=pool), V))
+    assert (b_priv, b_pub) == SRP_HANDLER.compute_server_public_value(V, b_priv)
+    assert workers._executor is None  # Never created
+
+
+def test_disabled():
+    workers = SRPWorkers(0, 0, 0)
+    assert not workers.enabled
+    assert asyncio.run(workers.compute_premaster_secret(SRP_HANDLER, A_PUB, B_PRIV, U, V)) == PREMASTER_SECRET
+    assert workers._executor is None
+
+
+def test_busy():
+    workers = SRPWorkers(1, 1, 0.01)
+
+    async def handshakes():
+        # The first computation holds the only slot while the worker process starts
+        return await asyncio.gather(
+            workers.compute_premaster_secret(SRP_HANDLER, A_PUB, B_PRIV, U, V),
+            workers.compute_premaster_secret(SRP_HANDLER, A_PUB, B_PRIV, U, V),
+            return_exceptions=True,
+        )
+
+    first, second = asyncio.run(handshakes())
+    workers.shutdown()
+
+    assert first == PREMASTER_SECRET
+    assert isinstance(second, TimeoutError)
@@ -0,0 +1,151 @@
+import asyncio
+import multiprocessing
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, TypeVar
+
+from .group import SRPGroup
+from .operation import SRP
+
+T = TypeVar("T")
+
+
+def _compute_server_public_value(group: SRPGroup, verifier: int, private_value: int | None) -> tuple[int, int]:
+    return SRP(group).compute_server_public_value(verifier, private_value)
+
+
+def _compute_premaster_secret(
+    group: SRPGroup, client_public_value: int, server_private_value: int, u: int, verifier: int
+) -> int:
+    return SRP(group).compute_premaster_secret(client_public_value, server_private_value, u, verifier)
+
+
+class SRPWorkers:
+    """
+    Runs the modular exponentiations of SRP handshakes in a process pool, so that a burst of logins
+    does not block the event loop (big integer arithmetic holds the GIL, so threads would not help).
+
+    At most `max_pending` computations are handed to the pool at once; further ones wait for a slot.
+    A computation that cannot get a slot within the queue timeout is refused, so that clients are
+    told the server is busy instead of their handshakes timing out.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, queue_timeout: float):
+        """
+        Initializes the workers.
+
+        :param max_workers: The number of processes in the pool. If 0, all work is done inline
+        :param max_pending: The most computations to hand to the pool at once
+        :param queue_timeout: How long a computation may wait for a slot, in seconds
+        """
+
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    # Properties
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether any work is done in the pool at all.
+        """
+
+        return self.max_workers > 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """
+        The process pool, which is created when first needed.
+
+        Processes are spawned rather than forked, since the server has other threads running.
+        """
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    # Helper methods
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        """
+        Runs the function in the pool, once a slot is free.
+
+        :param fn: The function to run, which must be picklable
+        :param args: The arguments to the function
+        :raises TimeoutError: If no slot became free within the queue timeout
+        :return: The result of the function
+        """
+
+        if not self.enabled:
+            return fn(*args)
+
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = asyncio.Semaphore(self.max_pending)
+            self._slots[loop] = slots
+
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except TimeoutError:
+            raise TimeoutError("server busy") from None
+
+        try:
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            slots.release()
+
+    # Public methods
+    async def compute_server_public_value(
+        self, srp_handler: SRP, verifier: int, private_value: int | None = None
+    ) -> tuple[int, int]:
+        """
+        Computes the server public value, B, as `SRP.compute_server_public_value` does.
+
+        Values drawn from the handler's ephemeral pool need no exponentiation, so they are computed
+        inline.
+
+        :param srp_handler: The SRP handler
+        :param verifier: The verifier value
+        :param private_value: The private exponent, b, to use. If not provided, a random one is used
+        :raises TimeoutError: If the server is too busy
+        :return: (server private value, server public value)
+        """
+
+        if private_value is None and srp_handler.pool is not None:
+            return srp_handler.compute_server_public_value(verifier)
+        return await self._run(_compute_server_public_value, srp_handler.group, verifier, private_value)
+
+    async def compute_premaster_secret(
+        self, srp_handler: SRP, client_public_value: int, server_private_value: int, u: int, verifier: int
+    ) -> int:
+        """
+        Computes the SRP pre-master secret, as `SRP.compute_premaster_secret` does.
+
+        :param srp_handler: The SRP handler
+        :param client_public_value: The client public value, A
+        :param server_private_value: The server private value, b
+        :param u: The shared `u` value
+        :param verifier: The verifier value
+        :raises TimeoutError: If the server is too busy
+        :return: The pre-master secret
+        """
+
+        return await self._run(
+            _compute_premaster_secret, srp_handler.group, client_public_value, server_private_value, u, verifier
+        )
+
+    def shutdown(self):
+        """
+        Shuts the process pool down, if it was created.
+        """
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+
+from excalibur_server.api.cache import MASTER_KEYS_CACHE, SESSION_STORE, VERIFIED_TOKENS_CACHE
+from excalibur_server.src.auth.consts import KEY as TOKEN_KEY
+
+from . import context as context_module
+from .context import AUTH_CONTEXT_STATE_KEY, get_auth_context
+from .credentials import check_auth_token, generate_auth_token
+from .jwt import _token_digest
+
+KEY = b"one demo 16B key"
+
+
+def _token(comm_uuid: str, master_key: bytes | None = None) -> str:
+    return generate_auth_token(
+        "test-user", comm_uuid, datetime.now(tz=timezone.utc).timestamp() + 9999, master_key=master_key
+    )
+
+
+@pytest.fixture
+def decode_count(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    count = [0]
+    decode_token = context_module.decode_token
+
+    def counting_decode_token(*args):
+        count[0] += 1
+        return decode_token(*args)
+
+    monkeypatch.setattr(context_module, "decode_token", counting_decode_token)
+    return count
+
+
+def test_decoded_once(decode_count: list[int]):
+    MASTER_KEYS_CACHE["context-uuid"] = KEY
+    token = _token("context-uuid")
+    scope = {"type": "http"}
+
+    context = get_auth_context(scope, token)
+    assert context.username == "test-user"
+    assert context.comm_uuid == "context-uuid"
+    assert context.master_key == KEY
+    assert scope["state"][AUTH_CONTEXT_STATE_KEY] is context
+
+    assert get_auth_context(scope, token) is context
+    assert decode_count[0] == 1
+
+
+def test_other_token(decode_count: list[int]):
+    MASTER_KEYS_CACHE["context-uuid"] = KEY
+    MASTER_KEYS_CACHE["other-uuid"] = KEY
+    scope = {"type": "http"}
+
+    get_auth_context(scope, _token("context-uuid"))
+    assert get_auth_context(scope, _token("other-uuid")).comm_uuid == "other-uuid"
+    assert decode_count[0] == 2
+
+
+def test_invalid_token():
+    scope = {"type": "http"}
+    assert get_auth_context(scope, "not.a.token") is None
+    assert AUTH_CONTEXT_STATE_KEY not in scope["state"]
+
+
+def test_session_ended():
+    MASTER_KEYS_CACHE["ended-uuid"] = KEY
+    token = _token("ended-uuid")
+    del MASTER_KEYS_CACHE["ended-uuid"]
+
+    assert get_auth_context({"type": "http"}, token) is None
+    assert _token_digest(token, TOKEN_KEY) not in VERIFIED_TOKENS_CACHE
+
+
+def test_stateless_session():
+    token = _token("stateless-uuid", master_key=KEY)
+    assert "stateless-uuid" not in MASTER_KEYS_CACHE
+
+    context = get_auth_context({"type": "http"}, token)
+    assert context.comm_uuid == "stateless-uuid"
+    assert context.master_key == KEY
+    assert check_auth_token(token)
+
+
+def test_stateless_session_revoked():
+    comm_uuid = uuid4().hex
+    token = _token(comm_uuid, master_key=KEY)
+    assert get_auth_context({"type": "http"}, token) is not None
+
+    SESSION_STORE.revoke(comm_uuid)
+    assert get_auth_context({"type": "http"}, token) is None
+    assert not check_auth_token(token)
@@ -1,4 +1,8 @@
-from .jwt import decode_token, generate_token
+import time
+
+from excalibur_server.api.cache import VERIFIED_TOKENS_CACHE
+
+from .jwt import _generate_key, _token_digest, decode_token, forget_token, generate_token
 
 KEY = b"one demo 16B key"
 SAMPLE_DATA = {"sub": "1234567890", "uuid": "some-uuid"}
@@ -15,3 +19,39 @@ def test_invalid_token():
     wrong_token[0] = "A"
     wrong_token = "".join(wrong_token)
     assert decode_token(wrong_token, KEY) is None
+
+
+def test_verified_token_cached():
+    token = generate_token("1234567890", SAMPLE_DATA, KEY)
+    assert decode_token(token, KEY) == SAMPLE_DATA
+
+    cached = VERIFIED_TOKENS_CACHE[_token_digest(token, KEY)]
+    assert cached[0] == SAMPLE_DATA
+    assert cached[1] > time.time()
+
+    # Callers get their own copy of the claims
+    decode_token(token, KEY)["uuid"] = "changed"
+    assert decode_token(token, KEY) == SAMPLE_DATA
+
+
+def test_expired_entry_ignored():
+    # A cache entry must not outlive its token, even if the token would not verify on its own
+    token = "not.a.token"
+    VERIFIED_TOKENS_CACHE[_token_digest(token, KEY)] = (SAMPLE_DATA, time.time() - 1)
+    assert decode_token(token, KEY) is None
+
+
+def test_forget_token():
+    token = generate_token("1234567890", SAMPLE_DATA, KEY)
+    decode_token(token, KEY)
+
+    forget_token(token, KEY)
+    assert _token_digest(token, KEY) not in VERIFIED_TOKENS_CACHE
+    assert decode_token(token, KEY) == SAMPLE_DATA
+
+
+def test_key_memoised():
+    _generate_key.cache_clear()
+    generate_token("memo-user", SAMPLE_DATA, KEY)
+    generate_token("memo-user", SAMPLE_DATA, KEY)
+    assert _generate_key.cache_info().hits == 1
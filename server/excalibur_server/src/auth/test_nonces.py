@@ -0,0 +1,77 @@
+import pytest
+
+from .nonces import NonceStore, _FingerprintSet
+
+
+@pytest.fixture(params=[False, True], ids=["nonces", "fingerprints"])
+def compact(request: pytest.FixtureRequest) -> bool:
+    return request.param
+
+
+def test_replay(compact: bool):
+    store = NonceStore(validity=60, max_nonces=100, compact=compact)
+    assert store.add(b"nonce", 1000, now=1000)
+    assert not store.add(b"nonce", 1000, now=1010)
+    assert store.add(b"other", 1000, now=1010)
+    assert len(store) == 2
+
+
+def test_expiry(compact: bool):
+    store = NonceStore(validity=60, max_nonces=100, compact=compact)
+    store.add(b"nonce", 1000, now=1000)
+    store.add(b"later", 1030, now=1030)
+
+    # The first bucket rotates out once its timestamp is no longer accepted
+    assert store.add(b"other", 1030, now=1061)
+    assert len(store) == 2
+
+    # Timestamps that old cannot be told apart from replays any more
+    assert not store.add(b"nonce", 1000, now=1061)
+
+
+def test_refuse_before(compact: bool):
+    store = NonceStore(validity=60, max_nonces=100, compact=compact)
+    store.add(b"nonce", 1000, now=1000)
+    store.add(b"later", 1010, now=1010)
+
+    store.refuse_before(1005)
+    assert len(store) == 1
+    assert not store.add(b"other", 1004, now=1010)
+    assert store.add(b"other", 1005, now=1010)
+
+
+def test_full(compact: bool):
+    store = NonceStore(validity=60, max_nonces=2, compact=compact)
+    store.add(b"one", 1000, now=1000)
+    store.add(b"two", 1000, now=1000)
+
+    # Live nonces are never evicted to make room, so replays are still caught
+    with pytest.raises(OverflowError, match="nonce store is full"):
+        store.add(b"three", 1000, now=1000)
+    assert not store.add(b"one", 1000, now=1000)
+
+    # Room is made once the bucket rotates out
+    assert store.add(b"three", 1061, now=1061)
+
+
+def test_high_rate(compact: bool):
+    # 10k requests per second, each replayed a second later
+    rate, validity = 10_000, 2
+    store = NonceStore(validity=validity, max_nonces=rate * (validity + 1), compact=compact)
+
+    for second in range(6):
+        for i in range(rate):
+            assert store.add(b"%d-%d" % (second, i), second, now=second)
+        for i in range(0, rate, 7):
+            assert not store.add(b"%d-%d" % (second - 1, i), second - 1, now=second) or second == 0
+        assert len(store) <= store.max_nonces
+
+
+def test_fingerprint_set_growth():
+    fingerprints = _FingerprintSet()
+    for fingerprint in range(1, 10_001):
+        fingerprints.add(fingerprint * 0x9E3779B97F4A7C15 % 2**64 or 1)
+
+    assert len(fingerprints) == 10_000
+    assert all(fingerprint * 0x9E3779B97F4A7C15 % 2**64 in fingerprints for fingerprint in range(1, 10_001))
+    assert 12345 not in fingerprints
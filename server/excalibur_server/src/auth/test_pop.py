@@ -1,4 +1,4 @@
-from excalibur_server.src.auth.pop import generate_pop, generate_pop_header, parse_pop_header
+from excalibur_server.src.auth.pop import PoPVerifier, generate_pop, generate_pop_header, parse_pop_header
 
 
 def test_generate_pop():
@@ -30,3 +30,16 @@ def test_parse_pop_header():
     assert timestamp == 1234
     assert nonce == b"some nonce value"
     assert hmac.hex() == "4116ecf4f60c9af95fdfeaa53704eab6eb816aa526a3e0a93550f2adfc702deb"
+
+
+def test_verifier():
+    verifier = PoPVerifier(b"one demo 16B key")
+    pop = bytes.fromhex("4116ecf4f60c9af95fdfeaa53704eab6eb816aa526a3e0a93550f2adfc702deb")
+
+    # The keyed state must be reusable across requests
+    for _ in range(2):
+        assert verifier.generate("GET", "/some-path", 1234, b"some nonce value") == pop
+        assert verifier.verify("GET", "/some-path", 1234, b"some nonce value", pop)
+
+    assert not verifier.verify("POST", "/some-path", 1234, b"some nonce value", pop)
+    assert not verifier.verify("GET", "/some-path", 1234, b"some nonce value", pop[:-1])
@@ -8,6 +8,9 @@ from excalibur_server.src.versioning import py2semver, tilde
 
 COMPATIBILITY_FILE = Path(__file__).parent.parent / "COMPATIBILITY.toml"
 
+AUTH_PROTOCOLS = {1: "/api/auth", 2: "/api/auth/v2"}
+"Versions of the login handshake that the server supports, with their endpoints"
+
 with open(COMPATIBILITY_FILE, "r") as f:
     data = toml.loads(f.read())
     BACKWARDS_COMPATIBLE = data["backwards_compatible"]
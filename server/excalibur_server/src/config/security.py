@@ -1,11 +1,35 @@
+from pathlib import Path
+from typing import Literal
+
 from pydantic import BaseModel, field_validator
 
 from excalibur_server.src.auth.srp.group import SRPGroup
+from excalibur_server.src.exef.algorithms import Algorithm
+
+SESSION_ALGORITHMS = (Algorithm.AES_256_GCM, Algorithm.CHACHA20_POLY1305)
+"""Algorithms that can be used with the 256-bit session keys"""
 
 
 class Security(BaseModel):
     class SRP(BaseModel):
         group: SRPGroup
+        ephemeral_pool_size: int = 0
+        workers: int = 2
+        max_pending: int = 16
+        queue_timeout: float = 10
+
+        @field_validator("ephemeral_pool_size", "workers")
+        def validate_positive(cls, value: int) -> int:
+            if value < 0:
+                raise ValueError("must be greater than 0")
+            return value
+
+        @field_validator("max_pending", "queue_timeout")
+        def validate_queue(cls, value: float) -> float:
+            # With no slots or no time to wait for one, every login would be refused
+            if value <= 0:
+                raise ValueError("must be greater than 0")
+            return value
 
         @field_validator("group", mode="before")
         def edit_srp_group(cls, value: str) -> SRPGroup:
@@ -16,16 +40,35 @@ class Security(BaseModel):
 
     class E2EE(BaseModel):
         comm_cache_size: int
+        preferred_alg: Algorithm = Algorithm.AES_256_GCM
+        compression_threshold: int = 1024
+        compression_level: int = 6
+        offload_workers: int = 4
+        offload_threshold: int = 65536
 
-        @field_validator("comm_cache_size")
+        @field_validator("comm_cache_size", "compression_threshold", "offload_workers", "offload_threshold")
         def validate_positive(cls, value: int) -> int:
             if value < 0:
                 raise ValueError("must be greater than 0")
             return value
 
+        @field_validator("compression_level")
+        def validate_compression_level(cls, value: int) -> int:
+            if not 1 <= value <= 9:
+                raise ValueError("must be between 1 and 9")
+            return value
+
+        @field_validator("preferred_alg", mode="before")
+        def edit_preferred_alg(cls, value: str) -> Algorithm:
+            alg = Algorithm.from_label(value)
+            if alg not in SESSION_ALGORITHMS:
+                raise ValueError(f"Invalid algorithm '{value}'; choose from {[a.label for a in SESSION_ALGORITHMS]}")
+            return alg
+
     class PoP(BaseModel):
         nonce_cache_size: int
         timestamp_validity: int
+        compact_nonces: bool = False
 
         @field_validator("nonce_cache_size", "timestamp_validity")
         def validate_positive(cls, value: int) -> int:
@@ -33,13 +76,32 @@ class Security(BaseModel):
                 raise ValueError("must be greater than 0")
             return value
 
+    class Sessions(BaseModel):
+        store: Literal["memory", "sqlite"] = "memory"
+        file: Path = Path("sessions.sqlite3")
+        stateless: bool = False
+        sealing_key_rotation: int = 86400
+        persist: bool = False
+        persist_file: Path = Path("sessions.sealed")
+        persist_key_file: Path = Path("sessions.key")
+        persist_interval: int = 60
+
+        @field_validator("sealing_key_rotation", "persist_interval")
+        def validate_rotation(cls, value: int) -> int:
+            if value <= 0:
+                raise ValueError("must be greater than 0")
+            return value
+
     session_duration: int
+    max_session_lifetime: int = 86400
     account_creation_key: bytes
+    token_cache_size: int = 4096
     srp: SRP
     e2ee: E2EE
     pop: PoP
+    sessions: Sessions = Sessions()
 
-    @field_validator("session_duration")
+    @field_validator("session_duration", "max_session_lifetime", "token_cache_size")
     def validate_positive(cls, value: int) -> int:
         if value < 0:
             raise ValueError("must be greater than 0")
@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+from typing import Iterable
+
+from sqlalchemy import create_engine, select
 from sqlalchemy.orm import Session, sessionmaker
 
 from excalibur_server.consts import ROOT_FOLDER
@@ -30,6 +32,33 @@ def add_user(user: User):
             session.add(user)
 
 
+def add_users(users: Iterable[User]):
+    """
+    Adds several users to the database, in a single transaction.
+
+    Either all the users are added or, if any cannot be (e.g., one already exists), none are.
+
+    :param users: The users to add
+    """
+
+    with _get_session() as session:
+        with session.begin():
+            session.add_all(users)
+
+
+def get_existing_usernames(usernames: Iterable[str]) -> set[str]:
+    """
+    Finds which of several usernames already belong to users in the database.
+
+    :param usernames: The usernames to look for
+    :return: The usernames that exist
+    """
+
+    with _get_session() as session:
+        with session.begin():
+            return set(session.scalars(select(User.username).where(User.username.in_(list(usernames)))))
+
+
 def get_user(username: str) -> User | None:
     """
     Gets a user from the database.
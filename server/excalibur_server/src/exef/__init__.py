@@ -1,3 +1,14 @@
-from .exef import ExEF
+from .algorithms import Algorithm
+from .exef import ExEF, ExEFSession
+from .framed import FramedDecryptor, FramedEncryptor
+from .segmented import SegmentedDecryptor, SegmentedEncryptor
 
-__all__ = ["ExEF"]
+__all__ = [
+    "Algorithm",
+    "ExEF",
+    "ExEFSession",
+    "FramedDecryptor",
+    "FramedEncryptor",
+    "SegmentedDecryptor",
+    "SegmentedEncryptor",
+]
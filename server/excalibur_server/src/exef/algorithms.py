@@ -0,0 +1,87 @@
+from enum import IntEnum
+
+from Crypto.Cipher import AES, ChaCha20_Poly1305, _mode_gcm
+from Crypto.Cipher.ChaCha20_Poly1305 import ChaCha20Poly1305Cipher
+
+AEADCipher = _mode_gcm.GcmMode | ChaCha20Poly1305Cipher
+"""Any of the AEAD cipher objects supported by ExEF"""
+
+
+class Algorithm(IntEnum):
+    """
+    AEAD algorithms supported by ExEF.
+
+    The value of each member is the algorithm identifier stored in the ExEF header.
+    """
+
+    AES_128_GCM = 1
+    AES_192_GCM = 2
+    AES_256_GCM = 3
+    CHACHA20_POLY1305 = 4
+
+    # Properties
+    @property
+    def label(self) -> str:
+        """
+        Human-readable name of the algorithm (e.g., `aes-256-gcm`).
+        """
+
+        return self.name.lower().replace("_", "-")
+
+    @property
+    def keysize(self) -> int:
+        """
+        Size of the key that the algorithm uses, in bits.
+        """
+
+        if self == Algorithm.CHACHA20_POLY1305:
+            return 256
+        return int(self.name.split("_")[1])
+
+    # Public methods
+    def new(self, key: bytes, nonce: bytes) -> AEADCipher:
+        """
+        Creates a new cipher object for the algorithm.
+
+        :param key: The encryption key
+        :param nonce: The 12-byte nonce
+        :raises ValueError: If the key is not of the right size for the algorithm
+        :return: The cipher object
+        """
+
+        if len(key) * 8 != self.keysize:
+            raise ValueError(f"{self.label} requires a {self.keysize}-bit key")
+
+        if self == Algorithm.CHACHA20_POLY1305:
+            return ChaCha20_Poly1305.new(key=key, nonce=nonce)
+        return AES.new(key, AES.MODE_GCM, nonce=nonce)
+
+    @classmethod
+    def from_label(cls, label: str) -> "Algorithm":
+        """
+        Gets the algorithm from its human-readable name.
+
+        :param label: The name of the algorithm (case insensitive)
+        :raises ValueError: If the algorithm is not supported
+        :return: The algorithm
+        """
+
+        try:
+            return cls[label.upper().replace("-", "_")]
+        except KeyError:
+            raise ValueError(f"Unsupported algorithm '{label}'; choose from {[alg.label for alg in cls]}")
+
+    @classmethod
+    def aes_gcm(cls, keysize: int) -> "Algorithm":
+        """
+        Gets the AES-GCM algorithm for the given key size.
+
+        :param keysize: The size of the key, in bits
+        :raises ValueError: If the key size is not supported
+        :return: The algorithm
+        """
+
+        try:
+            return cls[f"AES_{keysize}_GCM"]
+        except KeyError:
+            raise ValueError("keysize must be 128, 192, or 256")
@@ -1,8 +1,13 @@
-from queue import Empty, Queue
+from collections import deque
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
 
-from Crypto.Cipher import AES, _mode_gcm
+from .algorithms import AEADCipher, Algorithm
+from .structures import RawFooter, RawHeader
 
-from .structures import Footer, Header
+Buffer = bytes | bytearray | memoryview
+"""Any bytes-like object that can be read from"""
+WritableBuffer = bytearray | memoryview
+"""Any bytes-like object that can be written to"""
 
 
 class Encryptor:
@@ -10,40 +15,43 @@ class Encryptor:
     Class that handles the encryption of ExEF messages.
     """
 
-    def __init__(self, key: bytes, nonce: bytes):
+    def __init__(self, key: bytes, nonce: bytes, alg: Algorithm | None = None):
         """
         Initializes the Encryptor with a given key and nonce.
 
         :param key: The encryption key as bytes.
-        :param nonce: The nonce used for AES-GCM encryption.
+        :param nonce: The nonce used for encryption.
+        :param alg: The algorithm to encrypt with. If not provided, AES-GCM is used and a version 2
+            header is written.
         """
 
         self.key = key
+        self.alg = alg
         self._nonce = nonce
 
         self._ct_len: int = -1
-        self._header: Header | None = None
+        self._header: RawHeader | None = None
 
-        self._cipher: _mode_gcm.GcmMode | None = None
+        self._cipher: AEADCipher | None = None
 
         self._header_sent = False
         self._ct_sent_len = 0
-        self._queue = Queue()
+        self._pending: deque[bytes] = deque()  # Encrypted chunks not yet collected by `get()`
 
     # Properties
     @property
-    def cipher(self) -> _mode_gcm.GcmMode:
+    def cipher(self) -> AEADCipher:
         """
-        The AES-GCM cipher object.
+        The AEAD cipher object.
 
         :raises ValueError: If parameters are not set before requesting the cipher.
-        :return: The AES-GCM cipher object.
+        :return: The AEAD cipher object.
         """
 
         if self._cipher is None:
             if self._nonce is None or self._ct_len == -1 or self._header is None:
                 raise ValueError("parameters must be set")
-            self._cipher = AES.new(self.key, AES.MODE_GCM, nonce=self._nonce)
+            self._cipher = self._header.algorithm.new(self.key, self._nonce)
 
         return self._cipher
 
@@ -60,6 +68,62 @@ class Encryptor:
             raise ValueError("parameters must be set")
         return self._ct_sent_len == self._ct_len
 
+    @property
+    def remaining(self) -> int:
+        """
+        Number of plaintext bytes that still need to be encrypted.
+
+        :raises ValueError: If parameters are not set
+        :return: The number of bytes left to encrypt
+        """
+
+        if self._ct_len == -1:
+            raise ValueError("parameters must be set")
+        return self._ct_len - self._ct_sent_len
+
+    # Helper methods
+    def _header_bytes(self) -> bytes:
+        """
+        Gets the serialized header, marking it as sent.
+
+        :raises ValueError: If parameters are not set.
+        :return: The serialized header.
+        """
+
+        if self._header is None:
+            raise ValueError("parameters must be set")
+
+        self._header_sent = True
+        return self._header.pack()
+
+    def _encrypt(self, data: Buffer) -> bytes:
+        """
+        Encrypts a chunk of the body.
+
+        :param data: The data to be encrypted.
+        :raises ValueError: If more data is given than was declared.
+        :return: The encrypted chunk.
+        """
+
+        if len(data) > self.remaining:
+            raise ValueError(f"got {len(data)} bytes but only {self.remaining} bytes remain")
+
+        self._ct_sent_len += len(data)
+        return self.cipher.encrypt(data)
+
+    def _footer_bytes(self) -> bytes:
+        """
+        Gets the serialized footer.
+
+        :raises ValueError: If not all data has been encrypted yet.
+        :return: The serialized footer.
+        """
+
+        if not self.fully_processed:
+            raise ValueError(f"expected {self._ct_len} bytes but only got {self._ct_sent_len} bytes")
+
+        return self.cipher.digest()
+
     # Public methods
     def set_params(self, *, length: int):
         """
@@ -70,18 +134,70 @@ class Encryptor:
         """
 
         self._ct_len = length  # Ciphertext length is equal to plaintext length
-        self._header = Header(keysize=len(self.key) * 8, nonce=self._nonce, ct_len=length)
+        self._header = RawHeader(len(self.key) * 8, self._nonce, length, self.alg)
 
-    def update(self, data: bytes):
+    def update(self, data: Buffer):
         """
         Encrypts the given data.
 
         :param data: The data to be encrypted.
         """
 
-        self._queue.put(self.cipher.encrypt(data))
+        self._pending.append(self.cipher.encrypt(data))
         self._ct_sent_len += len(data)
 
+    def update_into(self, data: Buffer, output: WritableBuffer) -> int:
+        """
+        Encrypts the given data directly into a caller-supplied buffer.
+
+        Unlike `update()`, the ciphertext is not queued; it is up to the caller to send the header,
+        the ciphertext written into `output`, and the footer in that order.
+
+        :param data: The data to be encrypted.
+        :param output: The buffer to write the ciphertext to. Must be at least as long as `data`.
+        :raises ValueError: If the output buffer is too small.
+        :return: The number of bytes written to the output buffer.
+        """
+
+        length = len(data)
+        if len(output) < length:
+            raise ValueError(f"output buffer must be at least {length} bytes")
+
+        self.cipher.encrypt(data, output=memoryview(output)[:length])
+        self._ct_sent_len += length
+        return length
+
+    def header_into(self, output: WritableBuffer) -> int:
+        """
+        Writes the header into a caller-supplied buffer.
+
+        :param output: The buffer to write the header to.
+        :raises ValueError: If parameters are not set.
+        :return: The number of bytes written to the output buffer.
+        """
+
+        if self._header is None:
+            raise ValueError("parameters must be set")
+
+        self._header.pack_into(output)
+        self._header_sent = True
+        return RawHeader.size
+
+    def footer_into(self, output: WritableBuffer) -> int:
+        """
+        Writes the footer into a caller-supplied buffer.
+
+        :param output: The buffer to write the footer to.
+        :raises ValueError: If not all data has been encrypted yet.
+        :return: The number of bytes written to the output buffer.
+        """
+
+        if not self.fully_processed:
+            raise ValueError("all data must be encrypted before the footer is written")
+
+        output[: RawFooter.size] = self.cipher.digest()
+        return RawFooter.size
+
     def get(self) -> bytes:
         """
         Gets the next piece of encrypted data.
@@ -97,22 +213,106 @@ class Encryptor:
         # Get header first
         if not self._header_sent:
             self._header_sent = True
-            return self._header.serialize_as_bytes()
+            return self._header.pack()
 
         # Get body
-        try:
-            return self._queue.get(block=False)
-        except Empty:
-            # Nothing left in queue, see if we sent all data
-            if self._ct_sent_len >= self._ct_len:
-                tag = self.cipher.digest()
-                footer = Footer(tag=tag)
-                return footer.serialize_as_bytes()
-
-            # Nothing in queue but not all data sent...
-            return b""
+        if self._pending:
+            return self._pending.popleft()
+
+        # Nothing left in queue, see if we sent all data
+        if self._ct_sent_len >= self._ct_len:
+            return self._footer_bytes()
+
+        # Nothing in queue but not all data sent...
+        return b""
+
+    def encrypt_chunk(self, data: Buffer) -> bytes:
+        """
+        Encrypts the next chunk of the message, prefixing the header and suffixing the footer when
+        needed.
+
+        This is meant for push-style callers (e.g., ASGI middleware) that receive the plaintext one
+        chunk at a time: the first call's output starts with the header, and the call that completes
+        the message has the footer appended.
+
+        :param data: The data to be encrypted.
+        :raises ValueError: If parameters are not set, or if more data is given than was declared.
+        :return: Everything that should be sent for this chunk.
+        """
+
+        if len(data) > self.remaining:
+            raise ValueError(f"got {len(data)} bytes but only {self.remaining} bytes remain")
+
+        header = b"" if self._header_sent else self._header_bytes()
+        ct = self._encrypt(data)
+        footer = self._footer_bytes() if self.fully_processed else b""
+
+        # Chunks in the middle of the message are sent as the ciphertext itself, without a copy
+        if not header and not footer:
+            return ct
+        return b"".join((header, ct, footer))
+
+    def iter_encrypt(self, chunks: Iterable[Buffer], length: int | None = None) -> Iterator[bytes]:
+        """
+        Encrypts the given plaintext chunks, yielding the header, the encrypted body, and the footer.
+
+        :param chunks: The plaintext chunks to be encrypted.
+        :param length: The total length of the plaintext. Can be omitted if `set_params()` was
+            already called.
+        :raises ValueError: If the chunks do not add up to the declared length.
+        :return: An iterator over the pieces of the ExEF message.
+        """
+
+        if length is not None:
+            self.set_params(length=length)
+
+        yield self._header_bytes()
+        for chunk in chunks:
+            yield self._encrypt(chunk)
+        yield self._footer_bytes()
 
-    def encrypt(self, pt: bytes) -> bytes:
+    async def aiter_encrypt(self, chunks: AsyncIterable[Buffer], length: int | None = None) -> AsyncIterator[bytes]:
+        """
+        Asynchronous version of `iter_encrypt()`.
+
+        :param chunks: The plaintext chunks to be encrypted.
+        :param length: The total length of the plaintext. Can be omitted if `set_params()` was
+            already called.
+        :raises ValueError: If the chunks do not add up to the declared length.
+        :return: An asynchronous iterator over the pieces of the ExEF message.
+        """
+
+        if length is not None:
+            self.set_params(length=length)
+
+        yield self._header_bytes()
+        async for chunk in chunks:
+            yield self._encrypt(chunk)
+        yield self._footer_bytes()
+
+    def encrypt_into(self, pt: Buffer, output: WritableBuffer) -> int:
+        """
+        Encrypts the given plaintext into a caller-supplied buffer as a full ExEF message.
+
+        :param pt: The plaintext to be encrypted.
+        :param output: The buffer to write the message to. Must be at least
+            `len(pt) + ExEF.additional_size` bytes long.
+        :raises ValueError: If the output buffer is too small.
+        :return: The number of bytes written to the output buffer.
+        """
+
+        total = RawHeader.size + len(pt) + RawFooter.size
+        if len(output) < total:
+            raise ValueError(f"output buffer must be at least {total} bytes")
+
+        view = memoryview(output)
+        self.set_params(length=len(pt))
+        offset = self.header_into(view)
+        offset += self.update_into(pt, view[offset:])
+        offset += self.footer_into(view[offset:])
+        return offset
+
+    def encrypt(self, pt: Buffer) -> bytes:
         """
         Encrypts the given plaintext.
 
@@ -120,10 +320,9 @@ class Encryptor:
         :return: The encrypted ciphertext as bytes.
         """
 
-        self.set_params(length=len(pt))
-        self.update(pt)
-        output = self.get() + self.get() + self.get()  # First is header, then body, then footer
-        return output
+        output = bytearray(RawHeader.size + len(pt) + RawFooter.size)
+        self.encrypt_into(pt, output)
+        return bytes(output)
 
 
 class Decryptor:
@@ -140,31 +339,36 @@ class Decryptor:
 
         self.key = key
 
-        self._header: Header | None = None
-        self._footer: Footer | None = None
+        self._header: RawHeader | None = None
+        self._footer: RawFooter | None = None
+
+        self._cipher: AEADCipher | None = None
 
-        self._cipher: _mode_gcm.GcmMode | None = None
+        # Fixed-size scratch space for the header and footer, which may arrive split across chunks
+        self._buffer = bytearray(max(RawHeader.size, RawFooter.size))
+        self._buffer_len = 0
 
-        self._buffer = b""
-        self._header_remaining = Header.size
-        self._footer_remaining = Footer.size
+        self._header_remaining = RawHeader.size
+        self._footer_remaining = RawFooter.size
         self._ct_len_left = -1
-        self._queue = Queue()  # Queue of ciphertext chunks
+        self._pending: deque[bytes] = deque()  # Decrypted chunks not yet collected by `get()`
 
     # Properties
     @property
-    def cipher(self) -> _mode_gcm.GcmMode:
+    def cipher(self) -> AEADCipher:
         """
-        The AES-GCM cipher object used for decryption.
+        The AEAD cipher object used for decryption.
+
+        The algorithm is taken from the header of the message.
 
         :raises ValueError: If the header is not set before requesting the cipher.
-        :return: The AES-GCM cipher object.
+        :return: The AEAD cipher object.
         """
 
         if self._cipher is None:
             if self._header is None:
                 raise ValueError("header must be set")
-            self._cipher = AES.new(self.key, AES.MODE_GCM, nonce=self._header.nonce)
+            self._cipher = self._header.algorithm.new(self.key, self._header.nonce)
 
         return self._cipher
 
@@ -178,51 +382,93 @@ class Decryptor:
 
         return self._header is not None and self._footer is not None
 
-    # Public methods
-    def update(self, data: bytes):
+    # Helper methods
+    def _fill_buffer(self, data: memoryview, remaining: int) -> tuple[memoryview, int]:
         """
-        Updates the decryptor with the given ciphertext data.
+        Copies as much of the data into the scratch buffer as is still needed.
 
-        :param data: The ciphertext data as bytes
+        :param data: The incoming data
+        :param remaining: The number of bytes still needed
+        :return: The unconsumed part of the data, and the number of bytes still needed
+        """
+
+        take = min(remaining, len(data))
+        self._buffer[self._buffer_len : self._buffer_len + take] = data[:take]
+        self._buffer_len += take
+        return data[take:], remaining - take
+
+    def _process(self, data: Buffer) -> memoryview | None:
         """
+        Consumes the header and footer parts of the incoming data.
+
+        :param data: The incoming data
+        :return: A view of the ciphertext part of the data, or None if there is none
+        """
+
+        view = memoryview(data)
 
         # Handle header
         if self._header_remaining > 0:
-            self._buffer += data
-            self._header_remaining -= len(data)
-
-            if self._header_remaining <= 0:
-                # We have enough data to set the header
-                self._header = Header.from_serialized(self._buffer[: Header.size])
+            view, self._header_remaining = self._fill_buffer(view, self._header_remaining)
+            if self._header_remaining > 0:
+                return None
 
-                # Enqueue first part
-                data = self._buffer[Header.size :]
-                self._ct_len_left = self._header.ct_len
-                self._buffer = b""
-            else:
-                return
+            # We have enough data to set the header
+            self._header = RawHeader.unpack(memoryview(self._buffer)[: RawHeader.size])
+            self._ct_len_left = self._header.ct_len
+            self._buffer_len = 0
 
         # Handle ciphertext
+        ct = None
         if self._ct_len_left > 0:
-            if len(data) <= self._ct_len_left:
-                # Just put incoming data into the queue
-                self._queue.put(self.cipher.decrypt(data))
-                self._ct_len_left -= len(data)
-                return
-            else:  # Incoming data contains part of footer
-                self._queue.put(self.cipher.decrypt(data[: self._ct_len_left]))
-                data = data[self._ct_len_left :]
-                self._ct_len_left = 0
+            ct = view[: self._ct_len_left]
+            view = view[len(ct) :]
+            self._ct_len_left -= len(ct)
 
         # Handle footer
-        if self._footer_remaining > 0:
-            self._buffer += data
-            self._footer_remaining -= len(data)
-
+        if self._footer_remaining > 0 and len(view) > 0:
+            _, self._footer_remaining = self._fill_buffer(view, self._footer_remaining)
             if self._footer_remaining <= 0:
                 # We have enough data to set the footer
-                self._footer = Footer.from_serialized(self._buffer[: Footer.size])
-                self._buffer = b""
+                self._footer = RawFooter.unpack(memoryview(self._buffer)[: RawFooter.size])
+                self._buffer_len = 0
+
+        return ct
+
+    # Public methods
+    def update(self, data: Buffer):
+        """
+        Updates the decryptor with the given ciphertext data.
+
+        :param data: The ciphertext data as bytes
+        """
+
+        plaintext = self.decrypt_chunk(data)
+        if plaintext:
+            self._pending.append(plaintext)
+
+    def update_into(self, data: Buffer, output: WritableBuffer) -> int:
+        """
+        Updates the decryptor with the given ciphertext data, writing any plaintext directly into a
+        caller-supplied buffer.
+
+        :param data: The ciphertext data as bytes
+        :param output: The buffer to write the plaintext to. Being as long as `data` is always
+            sufficient.
+        :raises ValueError: If the output buffer is too small.
+        :return: The number of plaintext bytes written to the output buffer.
+        """
+
+        ct = self._process(data)
+        if ct is None or len(ct) == 0:
+            return 0
+
+        length = len(ct)
+        if len(output) < length:
+            raise ValueError(f"output buffer must be at least {length} bytes")
+
+        self.cipher.decrypt(ct, output=memoryview(output)[:length])
+        return length
 
     def get(self) -> bytes:
         """
@@ -234,10 +480,60 @@ class Decryptor:
         :return: The next piece of data.
         """
 
-        try:
-            return self._queue.get(block=False)
-        except Empty:
+        if self._pending:
+            return self._pending.popleft()
+        return b""
+
+    def decrypt_chunk(self, data: Buffer) -> bytes:
+        """
+        Decrypts the next chunk of the message.
+
+        Header and footer bytes are consumed silently. Note that the plaintext is *not* authenticated
+        until `verify()` succeeds.
+
+        :param data: The ciphertext data as bytes
+        :return: The plaintext in this chunk, which may be empty
+        """
+
+        ct = self._process(data)
+        if ct is None or len(ct) == 0:
             return b""
+        return self.cipher.decrypt(ct)
+
+    def iter_decrypt(self, chunks: Iterable[Buffer]) -> Iterator[bytes]:
+        """
+        Decrypts the given ExEF message chunks, yielding the plaintext as it becomes available.
+
+        The tag is verified once the last chunk has been consumed, so callers must not act on the
+        yielded plaintext until the iterator is exhausted without raising.
+
+        :param chunks: The chunks of the ExEF message.
+        :raises ValueError: If the header or footer have not been set
+        :raises ValueError: If the footer is not valid (e.g., wrong tag)
+        :return: An iterator over the plaintext chunks.
+        """
+
+        for chunk in chunks:
+            plaintext = self.decrypt_chunk(chunk)
+            if plaintext:
+                yield plaintext
+        self.verify()
+
+    async def aiter_decrypt(self, chunks: AsyncIterable[Buffer]) -> AsyncIterator[bytes]:
+        """
+        Asynchronous version of `iter_decrypt()`.
+
+        :param chunks: The chunks of the ExEF message.
+        :raises ValueError: If the header or footer have not been set
+        :raises ValueError: If the footer is not valid (e.g., wrong tag)
+        :return: An asynchronous iterator over the plaintext chunks.
+        """
+
+        async for chunk in chunks:
+            plaintext = self.decrypt_chunk(chunk)
+            if plaintext:
+                yield plaintext
+        self.verify()
 
     def verify(self):
         """
@@ -252,7 +548,7 @@ class Decryptor:
 
         self.cipher.verify(self._footer.tag)
 
-    def decrypt(self, exef_data: bytes) -> bytes:
+    def decrypt(self, exef_data: Buffer) -> bytes:
         """
         Decrypts the given ExEF data.
 
@@ -262,7 +558,6 @@ class Decryptor:
         :raises ValueError: If the footer is not valid (e.g., wrong tag)
         """
 
-        self.update(exef_data)
-        output = self.get()
+        output = self.decrypt_chunk(exef_data)
         self.verify()
         return output
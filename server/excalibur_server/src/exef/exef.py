@@ -1,10 +1,32 @@
+from concurrent.futures import Executor
 from typing import ClassVar, Literal
 
 from Crypto.Random import get_random_bytes
-from pydantic import BaseModel, ConfigDict, computed_field, field_validator
+from pydantic import BaseModel, ConfigDict, computed_field, field_validator, model_validator
 
+from .algorithms import Algorithm
 from .crypto import Decryptor, Encryptor
-from .structures import EXEF_VERSION, Footer, Header
+from .framed import FramedDecryptor, FramedEncryptor
+from .segmented import DEFAULT_SEGMENT_SIZE, SegmentedDecryptor, SegmentedEncryptor
+from .structures import EXEF_VERSION, KEYSIZES, Footer, Header
+
+
+def _resolve_algorithm(key: bytes, algorithm: Algorithm | None) -> Algorithm:
+    """
+    Gets the algorithm that will be used to encrypt with the given key.
+
+    :param key: The encryption key
+    :param algorithm: The explicitly requested algorithm, if any
+    :raises ValueError: If the key is not of the right size for the algorithm
+    :return: The algorithm
+    """
+
+    if algorithm is None:
+        return Algorithm.aes_gcm(len(key) * 8)
+
+    if len(key) * 8 != algorithm.keysize:
+        raise ValueError(f"{algorithm.label} requires a {algorithm.keysize}-bit key")
+    return algorithm
 
 
 class ExEF(BaseModel):
@@ -27,25 +49,35 @@ class ExEF(BaseModel):
     """Encryption key"""
     nonce: bytes
     """12-byte nonce used for encryption"""
+    algorithm: Algorithm | None = None
+    """Algorithm to encrypt with. If not set, AES-GCM is used with a version 2 header"""
 
     encryptor: Encryptor
     """Encryptor object"""
     decryptor: Decryptor
     """Decryptor object"""
 
-    def __init__(self, key: bytes, nonce: bytes | None = None):
+    def __init__(self, key: bytes, nonce: bytes | None = None, algorithm: Algorithm | None = None):
         """
         Initializes an ExEF object.
 
         :param key: The key to use for encryption and decryption.
         :param nonce: The 12-byte nonce to use for encryption. If not provided, a random nonce is
             generated.
+        :param algorithm: The algorithm to encrypt with. If not provided, AES-GCM is used with a
+            version 2 header. Decryption always uses the algorithm given in the message's header.
         """
 
         if nonce is None:
             nonce = get_random_bytes(12)
 
-        super().__init__(key=key, nonce=nonce, encryptor=Encryptor(key, nonce), decryptor=Decryptor(key))
+        super().__init__(
+            key=key,
+            nonce=nonce,
+            algorithm=algorithm,
+            encryptor=Encryptor(key, nonce, algorithm),
+            decryptor=Decryptor(key),
+        )
 
     # Properties
     @computed_field
@@ -58,16 +90,16 @@ class ExEF(BaseModel):
         return len(self.key) * 8
 
     @property
-    def alg(self) -> Literal["aes-128-gcm", "aes-192-gcm", "aes-256-gcm"]:
+    def alg(self) -> Literal["aes-128-gcm", "aes-192-gcm", "aes-256-gcm", "chacha20-poly1305"]:
         """
-        The encryption algorithm used in the ExEF format based on the key size.
+        The encryption algorithm used in the ExEF format.
         """
-        return f"aes-{self.keysize}-gcm"
+        return _resolve_algorithm(self.key, self.algorithm).label
 
     # Validators
     @field_validator("key")
     def validate_key(cls, value: bytes) -> int:
-        if len(value) * 8 not in {128, 192, 256}:
+        if len(value) * 8 not in KEYSIZES:
             raise ValueError("keysize must be 128, 192, or 256")
         return value
 
@@ -77,6 +109,11 @@ class ExEF(BaseModel):
             raise ValueError("nonce must be 12 bytes")
         return value
 
+    @model_validator(mode="after")
+    def validate_algorithm(self) -> "ExEF":
+        _resolve_algorithm(self.key, self.algorithm)
+        return self
+
     # Convenience methods
     def encrypt(self, data: bytes) -> bytes:
         """
@@ -100,6 +137,63 @@ class ExEF(BaseModel):
 
         return self.decryptor.decrypt(data)
 
+    def encrypt_segmented(
+        self, data: bytes, segment_size: int = DEFAULT_SEGMENT_SIZE, executor: Executor | None = None
+    ) -> bytes:
+        """
+        Encrypts the given data using the segmented ExEF format.
+
+        Each message gets a fresh random nonce, as the segment nonces are derived from it; the
+        object's nonce is kept for `encrypt()`.
+
+        :param data: The data to encrypt
+        :param segment_size: The size of each plaintext segment
+        :param executor: The thread or process pool to spread the segments across
+        :return: The encrypted data
+        """
+
+        encryptor = SegmentedEncryptor(self.key, get_random_bytes(12), len(data), segment_size)
+        return encryptor.encrypt(data, executor=executor)
+
+    def decrypt_segmented(self, data: bytes, executor: Executor | None = None) -> bytes:
+        """
+        Decrypts the given segmented ExEF data.
+
+        :param data: The encrypted data
+        :param executor: The thread or process pool to spread the segments across
+        :return: The decrypted data
+        :raises ValueError: If the header is invalid or the data is truncated
+        :raises ValueError: If a segment is not valid (e.g., wrong tag)
+        """
+
+        return SegmentedDecryptor.from_serialized_header(self.key, data).decrypt(data, executor=executor)
+
+    def encrypt_framed(self, data: bytes, record_size: int = 65536) -> bytes:
+        """
+        Encrypts the given data as a framed ExEF stream.
+
+        Each stream gets a fresh random nonce, as the record key is derived from it; the object's
+        nonce is kept for `encrypt()`.
+
+        :param data: The data to encrypt
+        :param record_size: The size of each record's plaintext
+        :return: The encrypted data
+        """
+
+        return FramedEncryptor(self.key, get_random_bytes(12), self.algorithm).encrypt(data, record_size)
+
+    def decrypt_framed(self, data: bytes) -> bytes:
+        """
+        Decrypts the given framed ExEF stream.
+
+        :param data: The encrypted data
+        :return: The decrypted data
+        :raises ValueError: If the header is invalid or the stream was truncated
+        :raises ValueError: If a record is not valid (e.g., wrong tag)
+        """
+
+        return FramedDecryptor(self.key).decrypt(data)
+
     # Other methods
     @classmethod
     def validate(cls, data: bytes) -> bool:
@@ -116,3 +210,132 @@ class ExEF(BaseModel):
             return True
         except ValueError:
             return False
+
+
+class ExEFSession:
+    """
+    Lightweight, non-pydantic counterpart to `ExEF`, for use on hot paths (e.g., the middleware).
+
+    The encryptor and decryptor are only created when first used.
+    """
+
+    __slots__ = ("key", "algorithm", "_nonce", "_encryptor", "_decryptor", "_framed_encryptor")
+
+    header_size = Header.size
+    """Size of the ExEF header, in bytes"""
+    footer_size = Footer.size
+    """Size of the ExEF footer, in bytes"""
+    additional_size = header_size + footer_size
+    """Size of the ExEF additional data, in bytes"""
+    version = EXEF_VERSION
+    """ExEF version number"""
+
+    def __init__(self, key: bytes, nonce: bytes | None = None, algorithm: Algorithm | None = None):
+        """
+        Initializes an ExEF session.
+
+        :param key: The key to use for encryption and decryption.
+        :param nonce: The 12-byte nonce to use for encryption. If not provided, a random nonce is
+            generated.
+        :param algorithm: The algorithm to encrypt with. If not provided, AES-GCM is used with a
+            version 2 header.
+        :raises ValueError: If the key or nonce are of the wrong size
+        """
+
+        if len(key) * 8 not in KEYSIZES:
+            raise ValueError("keysize must be 128, 192, or 256")
+        _resolve_algorithm(key, algorithm)
+
+        if nonce is not None and len(nonce) != 12:
+            raise ValueError("nonce must be 12 bytes")
+
+        self.key = key
+        self.algorithm = algorithm
+
+        self._nonce = nonce
+
+        self._encryptor: Encryptor | None = None
+        self._decryptor: Decryptor | None = None
+        self._framed_encryptor: FramedEncryptor | None = None
+
+    # Properties
+    @property
+    def nonce(self) -> bytes:
+        """
+        The nonce used for encryption.
+        """
+
+        if self._nonce is None:
+            self._nonce = get_random_bytes(12)
+        return self._nonce
+
+    @property
+    def encryptor(self) -> Encryptor:
+        """
+        Encryptor object.
+        """
+
+        if self._encryptor is None:
+            self._encryptor = Encryptor(self.key, self.nonce, self.algorithm)
+        return self._encryptor
+
+    @property
+    def decryptor(self) -> Decryptor:
+        """
+        Decryptor object.
+        """
+
+        if self._decryptor is None:
+            self._decryptor = Decryptor(self.key)
+        return self._decryptor
+
+    @property
+    def framed_encryptor(self) -> FramedEncryptor:
+        """
+        Encryptor object for framed streams, used when the length of the message is not known.
+
+        Only one of `encryptor` and `framed_encryptor` should be used, since both use the same nonce.
+        """
+
+        if self._framed_encryptor is None:
+            self._framed_encryptor = FramedEncryptor(self.key, self.nonce, self.algorithm)
+        return self._framed_encryptor
+
+    @property
+    def keysize(self) -> int:
+        """
+        Size of the key in bits.
+        """
+
+        return len(self.key) * 8
+
+    @property
+    def alg(self) -> str:
+        """
+        The encryption algorithm used in the ExEF format.
+        """
+
+        return _resolve_algorithm(self.key, self.algorithm).label
+
+    # Convenience methods
+    def encrypt(self, data: bytes) -> bytes:
+        """
+        Encrypts the given data.
+
+        :param data: The data to encrypt
+        :return: The encrypted data
+        """
+
+        return self.encryptor.encrypt(data)
+
+    def decrypt(self, data: bytes) -> bytes:
+        """
+        Decrypts the given data.
+
+        :param data: The encrypted data
+        :return: The decrypted data
+        :raises ValueError: If the header or footer have not been set
+        :raises ValueError: If the footer is not valid (e.g., wrong tag)
+        """
+
+        return self.decryptor.decrypt(data)
@@ -0,0 +1,311 @@
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
+
+from .algorithms import Algorithm
+from .crypto import Buffer
+from .structures import FramedHeader
+
+DEFAULT_MAX_RECORD_SIZE = 16_777_216  # 16 MiB
+
+
+# Helper functions
+def derive_record_key(key: bytes, header: FramedHeader) -> bytes:
+    """
+    Derives the key used to encrypt the records of a stream.
+
+    Each stream gets its own key, so the records can simply be numbered from zero without their
+    nonces ever colliding with those of other messages encrypted under the same session key.
+
+    :param key: The session key
+    :param header: The header of the stream
+    :return: The record key, of the same size as the session key
+    """
+
+    return HKDF(key, len(key), header.nonce, SHA256, context=b"ExEF framed stream" + header.pack())
+
+
+def _record_nonce(index: int) -> bytes:
+    """
+    Gets the nonce of a record.
+
+    :param index: The index of the record
+    :return: The 12-byte nonce
+    """
+
+    return index.to_bytes(12, "big")
+
+
+# Classes
+class FramedEncryptor:
+    """
+    Class that handles the encryption of framed ExEF streams, whose length need not be known up front.
+    """
+
+    def __init__(self, key: bytes, nonce: bytes, alg: Algorithm | None = None):
+        """
+        Initializes the framed encryptor.
+
+        :param key: The encryption key as bytes.
+        :param nonce: The 12-byte nonce of the stream.
+        :param alg: The algorithm to encrypt with. If not provided, AES-GCM is used.
+        """
+
+        self.header = FramedHeader(alg or Algorithm.aes_gcm(len(key) * 8), nonce)
+        self._header_bytes = self.header.pack()
+        self._record_key = derive_record_key(key, self.header)
+
+        self._index = 0
+        self._header_sent = False
+        self._finished = False
+
+    # Properties
+    @property
+    def finished(self) -> bool:
+        """
+        Whether the final record has been produced.
+        """
+
+        return self._finished
+
+    # Public methods
+    def encrypt_record(self, data: Buffer, final: bool = False) -> bytes:
+        """
+        Encrypts a single record.
+
+        :param data: The plaintext of the record
+        :param final: Whether this is the final record of the stream
+        :raises ValueError: If the stream has already been finished or the record is too large
+        :return: The record prefix, ciphertext and tag
+        """
+
+        if self._finished:
+            raise ValueError("stream has already been finished")
+        if len(data) > FramedHeader.max_record_size:
+            raise ValueError(f"record must be at most {FramedHeader.max_record_size} bytes")
+
+        prefix = FramedHeader.pack_prefix(len(data), final)
+        cipher = self.header.alg.new(self._record_key, _record_nonce(self._index))
+        cipher.update(self._header_bytes + prefix)
+        ct, tag = cipher.encrypt_and_digest(data)
+
+        self._index += 1
+        self._finished = final
+        return prefix + ct + tag
+
+    def encrypt_chunk(self, data: Buffer, final: bool = False, record_size: int = DEFAULT_MAX_RECORD_SIZE) -> bytes:
+        """
+        Encrypts a chunk of the stream, prefixing the header on the first call.
+
+        The chunk is usually one record, but larger chunks are split so that no record is larger
+        than a decryptor accepts by default; only the last record of the final chunk is final.
+
+        :param data: The plaintext chunk
+        :param final: Whether this is the last chunk of the stream
+        :param record_size: The most plaintext to put in one record
+        :return: The encrypted bytes to send
+        """
+
+        view = memoryview(data)
+        pieces = [] if self._header_sent else [self._header_bytes]
+        self._header_sent = True
+
+        for start in range(0, max(len(view), 1), record_size):
+            end = start + record_size
+            pieces.append(self.encrypt_record(view[start:end], final and end >= len(view)))
+
+        return pieces[0] if len(pieces) == 1 else b"".join(pieces)
+
+    def iter_encrypt(self, chunks: Iterable[Buffer]) -> Iterator[bytes]:
+        """
+        Encrypts a stream of plaintext chunks, one record per non-empty chunk.
+
+        :param chunks: The plaintext chunks
+        :return: An iterator over the encrypted stream, ending with an empty final record
+        """
+
+        for chunk in chunks:
+            if len(chunk) > 0:
+                yield self.encrypt_chunk(chunk)
+        yield self.encrypt_chunk(b"", final=True)
+
+    async def aiter_encrypt(self, chunks: AsyncIterable[Buffer]) -> AsyncIterator[bytes]:
+        """
+        Encrypts an asynchronous stream of plaintext chunks, one record per non-empty chunk.
+
+        :param chunks: The plaintext chunks
+        :return: An asynchronous iterator over the encrypted stream, ending with an empty final record
+        """
+
+        async for chunk in chunks:
+            if len(chunk) > 0:
+                yield self.encrypt_chunk(chunk)
+        yield self.encrypt_chunk(b"", final=True)
+
+    def encrypt(self, pt: Buffer, record_size: int = 65536) -> bytes:
+        """
+        Encrypts the given plaintext as a framed stream.
+
+        :param pt: The plaintext to be encrypted as bytes.
+        :param record_size: The size of each record's plaintext.
+        :return: The full framed ExEF stream as bytes.
+        """
+
+        view = memoryview(pt)
+        return b"".join(self.iter_encrypt(view[i : i + record_size] for i in range(0, len(view), record_size)))
+
+
+class FramedDecryptor:
+    """
+    Class that handles the decryption of framed ExEF streams.
+
+    Only whole records are ever released, after their tags have been verified. At most one record is
+    buffered at a time.
+    """
+
+    def __init__(self, key: bytes, max_record_size: int = DEFAULT_MAX_RECORD_SIZE):
+        """
+        Initializes the framed decryptor.
+
+        :param key: The encryption key as bytes.
+        :param max_record_size: The largest record that will be accepted, which bounds the memory
+            used for buffering.
+        """
+
+        self.key = key
+        self.max_record_size = max_record_size
+
+        self.header: FramedHeader | None = None
+        self._header_bytes = b""
+        self._record_key: bytes | None = None
+
+        self._buffer = bytearray()
+        self._index = 0
+        self._finished = False
+
+    # Properties
+    @property
+    def finished(self) -> bool:
+        """
+        Whether the final record has been decrypted.
+        """
+
+        return self._finished
+
+    # Helper methods
+    def _decrypt_record(self, length: int, final: bool) -> bytes:
+        """
+        Decrypts the record at the start of the buffer, removing it from the buffer.
+
+        :param length: The plaintext length of the record
+        :param final: Whether this is the final record
+        :raises ValueError: If the tag is not valid
+        :return: The plaintext of the record
+        """
+
+        prefix_size, tag_size = FramedHeader.prefix_size, FramedHeader.tag_size
+        prefix = bytes(self._buffer[:prefix_size])
+        tag = bytes(self._buffer[prefix_size + length : prefix_size + length + tag_size])
+
+        cipher = self.header.alg.new(self._record_key, _record_nonce(self._index))
+        cipher.update(self._header_bytes + prefix)
+        with memoryview(self._buffer) as view, view[prefix_size : prefix_size + length] as ct:
+            pt = cipher.decrypt_and_verify(ct, tag)  # Zero-copy view, released before the buffer is resized
+
+        del self._buffer[: prefix_size + length + tag_size]
+        self._index += 1
+        self._finished = final
+        return pt
+
+    # Public methods
+    def decrypt_chunk(self, data: Buffer) -> bytes:
+        """
+        Processes a chunk of the stream.
+
+        :param data: The next chunk of the stream
+        :raises ValueError: If the stream is not valid (e.g., wrong tag or data after the final
+            record)
+        :return: The plaintext of all records completed by this chunk
+        """
+
+        if self._finished and len(data) > 0:
+            raise ValueError("unexpected data after the final record")
+
+        self._buffer += data
+
+        if self.header is None:
+            if len(self._buffer) < FramedHeader.size:
+                return b""
+
+            self._header_bytes = bytes(self._buffer[: FramedHeader.size])
+            self.header = FramedHeader.unpack(self._header_bytes)
+            self._record_key = derive_record_key(self.key, self.header)
+            del self._buffer[: FramedHeader.size]
+
+        output = []
+        while not self._finished and len(self._buffer) >= FramedHeader.prefix_size:
+            length, final = FramedHeader.unpack_prefix(self._buffer[: FramedHeader.prefix_size])
+            if length > self.max_record_size:
+                raise ValueError(f"record of {length} bytes exceeds the maximum of {self.max_record_size} bytes")
+            if len(self._buffer) < FramedHeader.prefix_size + length + FramedHeader.tag_size:
+                break
+            output.append(self._decrypt_record(length, final))
+
+        if self._finished and len(self._buffer) > 0:
+            raise ValueError("unexpected data after the final record")
+
+        return b"".join(output)
+
+    def verify(self):
+        """
+        Checks that the stream was not truncated.
+
+        :raises ValueError: If the final record has not been received
+        """
+
+        if not self._finished:
+            raise ValueError("stream ended before the final record")
+
+    def iter_decrypt(self, chunks: Iterable[Buffer]) -> Iterator[bytes]:
+        """
+        Decrypts a stream of encrypted chunks.
+
+        :param chunks: The encrypted chunks
+        :raises ValueError: If the stream is not valid or was truncated
+        :return: An iterator over the verified plaintext
+        """
+
+        for chunk in chunks:
+            pt = self.decrypt_chunk(chunk)
+            if pt:
+                yield pt
+        self.verify()
+
+    async def aiter_decrypt(self, chunks: AsyncIterable[Buffer]) -> AsyncIterator[bytes]:
+        """
+        Decrypts an asynchronous stream of encrypted chunks.
+
+        :param chunks: The encrypted chunks
+        :raises ValueError: If the stream is not valid or was truncated
+        :return: An asynchronous iterator over the verified plaintext
+        """
+
+        async for chunk in chunks:
+            pt = self.decrypt_chunk(chunk)
+            if pt:
+                yield pt
+        self.verify()
+
+    def decrypt(self, data: Buffer) -> bytes:
+        """
+        Decrypts the given framed ExEF stream.
+
+        :param data: The full framed ExEF stream
+        :raises ValueError: If the stream is not valid or was truncated
+        :return: The decrypted data as bytes
+        """
+
+        pt = self.decrypt_chunk(data)
+        self.verify()
+        return pt
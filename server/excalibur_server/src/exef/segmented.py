@@ -0,0 +1,320 @@
+from concurrent.futures import Executor
+from itertools import count, repeat
+from typing import Iterable, Iterator
+
+from Crypto.Cipher import AES
+
+from .structures import SegmentedHeader
+
+DEFAULT_SEGMENT_SIZE = 65536  # 64 KiB
+
+
+# Helper functions
+def derive_segment_nonce(nonce: bytes, index: int) -> bytes:
+    """
+    Derives the nonce of a segment from the base nonce.
+
+    The segment index is XOR-ed into the (big-endian) base nonce, so each segment of a message gets
+    a distinct nonce.
+
+    :param nonce: The 12-byte base nonce
+    :param index: The index of the segment
+    :return: The 12-byte nonce for the segment
+    """
+
+    return (int.from_bytes(nonce, "big") ^ index).to_bytes(12, "big")
+
+
+def split_segments(data: bytes, segment_size: int) -> list[memoryview]:
+    """
+    Splits the given data into segments.
+
+    :param data: The data to split
+    :param segment_size: The size of each segment
+    :return: A list of (zero-copy) views into the data, one per segment
+    """
+
+    view = memoryview(data)
+    if len(view) == 0:
+        return [view]
+    return [view[i : i + segment_size] for i in range(0, len(view), segment_size)]
+
+
+def _encrypt_segment(key: bytes, nonce: bytes, aad: bytes, index: int, pt: bytes) -> bytes:
+    """
+    Encrypts a single segment.
+
+    Defined at the module level so that it can be sent to a process pool.
+
+    :param key: The encryption key
+    :param nonce: The base nonce
+    :param aad: The additional authenticated data (i.e., the serialized header)
+    :param index: The index of the segment
+    :param pt: The plaintext of the segment
+    :return: The ciphertext of the segment, followed by its tag
+    """
+
+    cipher = AES.new(key, AES.MODE_GCM, nonce=derive_segment_nonce(nonce, index))
+    cipher.update(aad)
+    ct, tag = cipher.encrypt_and_digest(pt)
+    return ct + tag
+
+
+def _decrypt_segment(key: bytes, nonce: bytes, aad: bytes, index: int, data: bytes) -> bytes:
+    """
+    Decrypts and verifies a single segment.
+
+    Defined at the module level so that it can be sent to a process pool.
+
+    :param key: The encryption key
+    :param nonce: The base nonce
+    :param aad: The additional authenticated data (i.e., the serialized header)
+    :param index: The index of the segment
+    :param data: The ciphertext of the segment, followed by its tag
+    :raises ValueError: If the segment is not valid (e.g., wrong tag)
+    :return: The plaintext of the segment
+    """
+
+    if len(data) < SegmentedHeader.tag_size:
+        raise ValueError(f"segment {index} is too short")
+
+    cipher = AES.new(key, AES.MODE_GCM, nonce=derive_segment_nonce(nonce, index))
+    cipher.update(aad)
+    return cipher.decrypt_and_verify(data[: -SegmentedHeader.tag_size], data[-SegmentedHeader.tag_size :])
+
+
+# Classes
+class _SegmentedBase:
+    """
+    Shared logic between the segmented encryptor and decryptor.
+    """
+
+    def __init__(self, key: bytes, header: SegmentedHeader):
+        """
+        Initializes the object.
+
+        :param key: The encryption key as bytes.
+        :param header: The segmented ExEF header.
+        """
+
+        self.key = key
+        self.header = header
+        self._aad = header.serialize_as_bytes()
+
+    # Properties
+    @property
+    def num_segments(self) -> int:
+        """
+        Number of segments in the message.
+        """
+
+        return self.header.num_segments
+
+    # Public methods
+    def segment_length(self, index: int) -> int:
+        """
+        Gets the plaintext length of a segment.
+
+        :param index: The index of the segment
+        :raises IndexError: If the index is out of range
+        :return: The length of the segment's plaintext, in bytes
+        """
+
+        if not 0 <= index < self.num_segments:
+            raise IndexError(f"segment index {index} out of range")
+
+        return min(self.header.segment_size, self.header.ct_len - index * self.header.segment_size)
+
+    def segment_offset(self, index: int) -> int:
+        """
+        Gets the offset of a segment within the serialized message.
+
+        :param index: The index of the segment
+        :raises IndexError: If the index is out of range
+        :return: The offset of the segment (including the header), in bytes
+        """
+
+        if not 0 <= index < self.num_segments:
+            raise IndexError(f"segment index {index} out of range")
+
+        return SegmentedHeader.size + index * (self.header.segment_size + SegmentedHeader.tag_size)
+
+    def segments_for_range(self, start: int, stop: int) -> range:
+        """
+        Gets the indices of the segments that cover a range of the plaintext.
+
+        :param start: The start of the plaintext range (inclusive)
+        :param stop: The end of the plaintext range (exclusive)
+        :return: The range of segment indices
+        """
+
+        start = max(0, start)
+        stop = min(self.header.ct_len, stop)
+        if stop <= start:
+            return range(0)
+
+        return range(start // self.header.segment_size, (stop - 1) // self.header.segment_size + 1)
+
+    def _map(self, fn, segments: Iterable[bytes], start: int, executor: Executor | None) -> Iterator[bytes]:
+        """
+        Applies the segment function to each segment, optionally using an executor.
+
+        :param fn: The module-level segment function
+        :param segments: The segments to process
+        :param start: The index of the first segment
+        :param executor: The executor to spread the work across. If not provided, segments are
+            processed in the current thread
+        :return: An iterator over the processed segments, in order
+        """
+
+        args = (repeat(self.key), repeat(self.header.nonce), repeat(self._aad), count(start), segments)
+        if executor is None:
+            return map(fn, *args)
+        return executor.map(fn, *args)
+
+
+class SegmentedEncryptor(_SegmentedBase):
+    """
+    Class that handles the encryption of segmented ExEF messages.
+    """
+
+    def __init__(self, key: bytes, nonce: bytes, length: int, segment_size: int = DEFAULT_SEGMENT_SIZE):
+        """
+        Initializes the segmented encryptor.
+
+        :param key: The encryption key as bytes.
+        :param nonce: The 12-byte base nonce.
+        :param length: The length of the plaintext to be encrypted.
+        :param segment_size: The size of each plaintext segment.
+        """
+
+        if segment_size <= 0:
+            raise ValueError("segment size must be positive")
+
+        super().__init__(
+            key,
+            SegmentedHeader(keysize=len(key) * 8, nonce=nonce, ct_len=length, segment_size=segment_size),
+        )
+
+    # Public methods
+    def encrypt_segment(self, index: int, pt: bytes) -> bytes:
+        """
+        Encrypts a single segment.
+
+        :param index: The index of the segment
+        :param pt: The plaintext of the segment
+        :raises IndexError: If the index is out of range
+        :raises ValueError: If the plaintext is not of the expected length
+        :return: The ciphertext of the segment, followed by its tag
+        """
+
+        if len(pt) != self.segment_length(index):
+            raise ValueError(f"segment {index} must be {self.segment_length(index)} bytes")
+
+        return _encrypt_segment(self.key, self.header.nonce, self._aad, index, pt)
+
+    def encrypt_segments(
+        self, segments: Iterable[bytes], start: int = 0, executor: Executor | None = None
+    ) -> Iterator[bytes]:
+        """
+        Encrypts a run of consecutive segments.
+
+        :param segments: The plaintexts of the segments
+        :param start: The index of the first segment
+        :param executor: The thread or process pool to spread the segments across
+        :return: An iterator over the encrypted segments, in order
+        """
+
+        return self._map(_encrypt_segment, segments, start, executor)
+
+    def encrypt(self, pt: bytes, executor: Executor | None = None) -> bytes:
+        """
+        Encrypts the given plaintext.
+
+        :param pt: The plaintext to be encrypted as bytes.
+        :param executor: The thread or process pool to spread the segments across
+        :raises ValueError: If the plaintext is not of the expected length
+        :return: The full segmented ExEF message as bytes.
+        """
+
+        if len(pt) != self.header.ct_len:
+            raise ValueError(f"plaintext must be {self.header.ct_len} bytes")
+
+        segments = split_segments(pt, self.header.segment_size)
+        if executor is not None:
+            segments = [bytes(segment) for segment in segments]  # Memory views cannot be pickled
+        return self._aad + b"".join(self.encrypt_segments(segments, executor=executor))
+
+
+class SegmentedDecryptor(_SegmentedBase):
+    """
+    Class that handles the decryption of segmented ExEF messages.
+    """
+
+    @classmethod
+    def from_serialized_header(cls, key: bytes, data: bytes) -> "SegmentedDecryptor":
+        """
+        Creates a segmented decryptor from a serialized header.
+
+        :param key: The encryption key as bytes.
+        :param data: The serialized header
+        :return: The segmented decryptor
+        """
+
+        return cls(key, SegmentedHeader.from_serialized(data[: SegmentedHeader.size]))
+
+    # Public methods
+    def decrypt_segment(self, index: int, data: bytes) -> bytes:
+        """
+        Decrypts and verifies a single segment.
+
+        :param index: The index of the segment
+        :param data: The ciphertext of the segment, followed by its tag
+        :raises IndexError: If the index is out of range
+        :raises ValueError: If the segment is not valid (e.g., wrong tag)
+        :return: The plaintext of the segment
+        """
+
+        if len(data) != self.segment_length(index) + SegmentedHeader.tag_size:
+            raise ValueError(f"segment {index} must be {self.segment_length(index) + SegmentedHeader.tag_size} bytes")
+
+        return _decrypt_segment(self.key, self.header.nonce, self._aad, index, data)
+
+    def decrypt_segments(
+        self, segments: Iterable[bytes], start: int = 0, executor: Executor | None = None
+    ) -> Iterator[bytes]:
+        """
+        Decrypts and verifies a run of consecutive segments.
+
+        :param segments: The encrypted segments, each followed by its tag
+        :param start: The index of the first segment
+        :param executor: The thread or process pool to spread the segments across
+        :raises ValueError: If a segment is not valid (e.g., wrong tag)
+        :return: An iterator over the decrypted segments, in order
+        """
+
+        return self._map(_decrypt_segment, segments, start, executor)
+
+    def decrypt(self, exef_data: bytes, executor: Executor | None = None) -> bytes:
+        """
+        Decrypts the given segmented ExEF data.
+
+        :param exef_data: The full segmented ExEF message as bytes
+        :param executor: The thread or process pool to spread the segments across
+        :raises ValueError: If the data is not of the expected length
+        :raises ValueError: If a segment is not valid (e.g., wrong tag)
+        :return: The decrypted data as bytes
+        """
+
+        expected_size = SegmentedHeader.size + self.header.ct_len + self.num_segments * SegmentedHeader.tag_size
+        if len(exef_data) != expected_size:
+            raise ValueError(f"data must be {expected_size} bytes")
+
+        view = memoryview(exef_data)
+        segments = [
+            view[self.segment_offset(i) : self.segment_offset(i) + self.segment_length(i) + SegmentedHeader.tag_size]
+            for i in range(self.num_segments)
+        ]
+        if executor is not None:
+            segments = [bytes(segment) for segment in segments]  # Memory views cannot be pickled
+        return b"".join(self.decrypt_segments(segments, executor=executor))
@@ -1,8 +1,221 @@
-from typing import ClassVar, Literal
+import struct
+from typing import ClassVar, Literal, NamedTuple
 
 from pydantic import BaseModel, model_serializer
 
+from .algorithms import Algorithm
+
 EXEF_VERSION = 2
+SEGMENTED_EXEF_VERSION = 3
+ALGORITHM_EXEF_VERSION = 4
+FRAMED_EXEF_VERSION = 5
+
+KEYSIZES = (128, 192, 256)
+
+_HEADER_STRUCT = struct.Struct(">4sHH12sQ")  # Magic, version, keysize/algorithm ID, nonce, ciphertext length
+_FRAMED_HEADER_STRUCT = struct.Struct(">4sHH12s")  # Magic, version, algorithm ID, nonce
+_RECORD_PREFIX_STRUCT = struct.Struct(">I")  # Final flag (top bit) and plaintext length
+
+
+# Lightweight structures
+class RawHeader(NamedTuple):
+    """
+    Lightweight ExEF header, for use on hot paths where the cost of a pydantic model matters.
+
+    If no algorithm is given, a version 2 header (which implies AES-GCM) is produced. Otherwise, a
+    version 4 header that stores the algorithm identifier in place of the key size is produced.
+    """
+
+    keysize: int
+    """Size of the key, in bits"""
+    nonce: bytes
+    """12-byte nonce used for encryption"""
+    ct_len: int
+    """Length of the ciphertext, in bytes"""
+    alg: Algorithm | None = None
+    """Algorithm used for encryption, if explicitly specified"""
+
+    size = _HEADER_STRUCT.size
+
+    @property
+    def algorithm(self) -> Algorithm:
+        """
+        Algorithm used for encryption.
+        """
+
+        if self.alg is None:
+            return Algorithm.aes_gcm(self.keysize)
+        return self.alg
+
+    def _version_and_slot(self) -> tuple[int, int]:
+        """
+        Gets the version and the value of the keysize/algorithm slot.
+        """
+
+        if self.alg is None:
+            return EXEF_VERSION, self.keysize
+        return ALGORITHM_EXEF_VERSION, self.alg
+
+    def pack(self) -> bytes:
+        """
+        Generates the ExEF header.
+        """
+
+        return _HEADER_STRUCT.pack(b"ExEF", *self._version_and_slot(), self.nonce, self.ct_len)
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int = 0):
+        """
+        Writes the ExEF header into the given buffer.
+
+        :param buffer: The buffer to write into
+        :param offset: The offset in the buffer to start writing at
+        """
+
+        _HEADER_STRUCT.pack_into(buffer, offset, b"ExEF", *self._version_and_slot(), self.nonce, self.ct_len)
+
+    @classmethod
+    def unpack(cls, data: bytes | bytearray | memoryview) -> "RawHeader":
+        """
+        Parses the ExEF header.
+
+        :param data: The data to parse. Must be exactly the size of the header
+        :raises ValueError: If the header is not valid
+        :return: The parsed header
+        """
+
+        if len(data) != cls.size:
+            raise ValueError(f"header must be {cls.size} bytes")
+
+        magic, version, slot, nonce, ct_len = _HEADER_STRUCT.unpack(data)
+        if magic != b"ExEF":
+            raise ValueError("data must start with ExEF")
+
+        if version == EXEF_VERSION:
+            if slot not in KEYSIZES:
+                raise ValueError("keysize must be 128, 192, or 256")
+            return cls(slot, nonce, ct_len)
+
+        if version == ALGORITHM_EXEF_VERSION:
+            try:
+                alg = Algorithm(slot)
+            except ValueError:
+                raise ValueError(f"unknown algorithm ID {slot}")
+            return cls(alg.keysize, nonce, ct_len, alg)
+
+        raise ValueError(f"version must be {EXEF_VERSION} or {ALGORITHM_EXEF_VERSION}")
+
+
+class RawFooter(NamedTuple):
+    """
+    Lightweight ExEF footer, for use on hot paths where the cost of a pydantic model matters.
+    """
+
+    tag: bytes
+    """16-byte tag used for authentication"""
+
+    size = 16
+
+    def pack(self) -> bytes:
+        """
+        Generates the ExEF footer.
+        """
+
+        return self.tag  # Fixed at 16 bytes
+
+    @classmethod
+    def unpack(cls, data: bytes | bytearray | memoryview) -> "RawFooter":
+        """
+        Parses the ExEF footer.
+
+        :param data: The data to parse. Must be exactly the size of the footer
+        :raises ValueError: If the footer is not valid
+        :return: The parsed footer
+        """
+
+        if len(data) != cls.size:
+            raise ValueError(f"footer must be {cls.size} bytes")
+
+        return cls(bytes(data))
+
+
+class FramedHeader(NamedTuple):
+    """
+    Header of a framed ExEF stream.
+
+    Unlike the other formats, the total length is not known up front. The header is followed by a
+    sequence of records, each made up of a 4-byte prefix (whose top bit marks the final record and
+    whose other bits give the plaintext length), the ciphertext, and a 16-byte tag.
+    """
+
+    alg: Algorithm
+    """Algorithm used for encryption"""
+    nonce: bytes
+    """12-byte nonce of the stream, from which the record key is derived"""
+
+    size = _FRAMED_HEADER_STRUCT.size
+    prefix_size = _RECORD_PREFIX_STRUCT.size
+    tag_size = 16
+    max_record_size = 2**31 - 1
+
+    def pack(self) -> bytes:
+        """
+        Generates the framed ExEF header.
+        """
+
+        return _FRAMED_HEADER_STRUCT.pack(b"ExEF", FRAMED_EXEF_VERSION, self.alg, self.nonce)
+
+    @classmethod
+    def unpack(cls, data: bytes | bytearray | memoryview) -> "FramedHeader":
+        """
+        Parses the framed ExEF header.
+
+        :param data: The data to parse. Must be exactly the size of the header
+        :raises ValueError: If the header is not valid
+        :return: The parsed header
+        """
+
+        if len(data) != cls.size:
+            raise ValueError(f"header must be {cls.size} bytes")
+
+        magic, version, alg_id, nonce = _FRAMED_HEADER_STRUCT.unpack(data)
+        if magic != b"ExEF":
+            raise ValueError("data must start with ExEF")
+        if version != FRAMED_EXEF_VERSION:
+            raise ValueError(f"version must be {FRAMED_EXEF_VERSION}")
+
+        try:
+            alg = Algorithm(alg_id)
+        except ValueError:
+            raise ValueError(f"unknown algorithm ID {alg_id}")
+
+        return cls(alg, nonce)
+
+    @staticmethod
+    def pack_prefix(length: int, final: bool) -> bytes:
+        """
+        Generates the prefix of a record.
+
+        :param length: The plaintext length of the record
+        :param final: Whether this is the final record of the stream
+        :return: The 4-byte prefix
+        """
+
+        return _RECORD_PREFIX_STRUCT.pack(length | (0x80000000 if final else 0))
+
+    @staticmethod
+    def unpack_prefix(data: bytes | bytearray | memoryview) -> tuple[int, bool]:
+        """
+        Parses the prefix of a record.
+
+        :param data: The 4-byte prefix
+        :return: The plaintext length of the record, and whether it is the final record
+        """
+
+        (value,) = _RECORD_PREFIX_STRUCT.unpack(data)
+        return value & 0x7FFFFFFF, bool(value & 0x80000000)
+
+
+# Models
 
 
 class Header(BaseModel):
@@ -14,11 +227,13 @@ class Header(BaseModel):
     """Size of the ExEF header, in bytes"""
 
     keysize: Literal[128, 192, 256]
-    """Size of the AES key, in bits"""
+    """Size of the key, in bits"""
     nonce: bytes
     """12-byte nonce used for encryption"""
     ct_len: int
     """Length of the ciphertext, in bytes"""
+    alg: Algorithm | None = None
+    """Algorithm used for encryption, if explicitly specified (version 4 headers only)"""
 
     @model_serializer
     def serialize_as_bytes(self) -> bytes:
@@ -26,12 +241,14 @@ class Header(BaseModel):
         Generates the ExEF header.
         """
 
-        output = b"ExEF"
-        output += EXEF_VERSION.to_bytes(2, "big")
-        output += self.keysize.to_bytes(2, "big")
-        output += self.nonce  # Fixed at 12 bytes
-        output += self.ct_len.to_bytes(8, "big")
-        return output
+        return self.to_raw().pack()
+
+    def to_raw(self) -> RawHeader:
+        """
+        Converts the header into its lightweight form.
+        """
+
+        return RawHeader(self.keysize, self.nonce, self.ct_len, self.alg)
 
     @classmethod
     def from_serialized(cls, data: bytes) -> "Header":
@@ -39,26 +256,7 @@ class Header(BaseModel):
         Parses the ExEF header.
         """
 
-        if len(data) != cls.size:
-            raise ValueError(f"header must be {cls.size} bytes")
-
-        if data[:4] != b"ExEF":
-            raise ValueError("data must start with ExEF")
-
-        version = int.from_bytes(data[4:6], "big")
-        if version != EXEF_VERSION:
-            raise ValueError(f"version must be {EXEF_VERSION}")
-
-        keysize = int.from_bytes(data[6:8], "big")
-
-        nonce = data[8:20]
-        ct_len = int.from_bytes(data[20:28], "big")
-
-        return cls(
-            keysize=keysize,
-            nonce=nonce,
-            ct_len=ct_len,
-        )
+        return cls.model_construct(**RawHeader.unpack(data)._asdict())  # Already validated
 
 
 class Footer(BaseModel):
@@ -86,7 +284,82 @@ class Footer(BaseModel):
         Parses the ExEF footer.
         """
 
-        if len(data) != 16:
-            raise ValueError("footer must be 16 bytes")
+        return cls.model_construct(tag=RawFooter.unpack(data).tag)  # Already validated
+
 
-        return cls(tag=data)
+class SegmentedHeader(BaseModel):
+    """
+    Segmented ExEF header.
+
+    The payload that follows the header is split into fixed-size segments, each of which is
+    immediately followed by its own 16-byte tag.
+    """
+
+    size: ClassVar[int] = 32
+    """Size of the segmented ExEF header, in bytes"""
+    tag_size: ClassVar[int] = 16
+    """Size of each segment's tag, in bytes"""
+
+    keysize: Literal[128, 192, 256]
+    """Size of the AES key, in bits"""
+    nonce: bytes
+    """12-byte base nonce, from which each segment's nonce is derived"""
+    ct_len: int
+    """Total length of the ciphertext (excluding tags), in bytes"""
+    segment_size: int
+    """Length of the plaintext in each segment (except possibly the last), in bytes"""
+
+    @property
+    def num_segments(self) -> int:
+        """
+        Number of segments in the payload.
+
+        An empty payload still has one (empty) segment so that it remains authenticated.
+        """
+
+        return max(1, -(-self.ct_len // self.segment_size))
+
+    @model_serializer
+    def serialize_as_bytes(self) -> bytes:
+        """
+        Generates the segmented ExEF header.
+        """
+
+        output = b"ExEF"
+        output += SEGMENTED_EXEF_VERSION.to_bytes(2, "big")
+        output += self.keysize.to_bytes(2, "big")
+        output += self.nonce  # Fixed at 12 bytes
+        output += self.ct_len.to_bytes(8, "big")
+        output += self.segment_size.to_bytes(4, "big")
+        return output
+
+    @classmethod
+    def from_serialized(cls, data: bytes) -> "SegmentedHeader":
+        """
+        Parses the segmented ExEF header.
+        """
+
+        if len(data) != cls.size:
+            raise ValueError(f"header must be {cls.size} bytes")
+
+        if data[:4] != b"ExEF":
+            raise ValueError("data must start with ExEF")
+
+        version = int.from_bytes(data[4:6], "big")
+        if version != SEGMENTED_EXEF_VERSION:
+            raise ValueError(f"version must be {SEGMENTED_EXEF_VERSION}")
+
+        keysize = int.from_bytes(data[6:8], "big")
+
+        nonce = data[8:20]
+        ct_len = int.from_bytes(data[20:28], "big")
+        segment_size = int.from_bytes(data[28:32], "big")
+        if segment_size == 0:
+            raise ValueError("segment size must be positive")
+
+        return cls(
+            keysize=keysize,
+            nonce=nonce,
+            ct_len=ct_len,
+            segment_size=segment_size,
+        )
@@ -0,0 +1,66 @@
+import pytest
+
+from .algorithms import Algorithm
+from .exef import ExEF, ExEFSession
+from .structures import ALGORITHM_EXEF_VERSION, Header
+
+KEY = b"1" * 32
+NONCE = b"\xab" * 12
+
+
+class TestAlgorithm:
+    def test_labels(self):
+        assert Algorithm.AES_128_GCM.label == "aes-128-gcm"
+        assert Algorithm.CHACHA20_POLY1305.label == "chacha20-poly1305"
+        assert Algorithm.from_label("ChaCha20-Poly1305") == Algorithm.CHACHA20_POLY1305
+
+        with pytest.raises(ValueError, match="Unsupported algorithm"):
+            Algorithm.from_label("des")
+
+    def test_keysizes(self):
+        assert Algorithm.AES_192_GCM.keysize == 192
+        assert Algorithm.CHACHA20_POLY1305.keysize == 256
+        assert Algorithm.aes_gcm(256) == Algorithm.AES_256_GCM
+
+        with pytest.raises(ValueError, match="keysize must be 128, 192, or 256"):
+            Algorithm.aes_gcm(512)
+
+    def test_wrong_key(self):
+        with pytest.raises(ValueError, match="requires a 256-bit key"):
+            Algorithm.CHACHA20_POLY1305.new(b"1" * 16, NONCE)
+
+
+class TestAlgorithmExEF:
+    @pytest.mark.parametrize("algorithm", [Algorithm.AES_256_GCM, Algorithm.CHACHA20_POLY1305])
+    def test_round_trip(self, algorithm: Algorithm):
+        encrypted = ExEF(KEY, nonce=NONCE, algorithm=algorithm).encrypt(b"HELLO")
+
+        header = Header.from_serialized(encrypted[: Header.size])
+        assert encrypted[4:6] == ALGORITHM_EXEF_VERSION.to_bytes(2, "big")
+        assert header.alg == algorithm
+        assert header.serialize_as_bytes() == encrypted[: Header.size]
+
+        # The decryptor picks the algorithm up from the header
+        assert ExEF(KEY).decrypt(encrypted) == b"HELLO"
+        assert ExEFSession(KEY).decrypt(encrypted) == b"HELLO"
+
+    def test_chacha_stream(self):
+        encryptor = ExEFSession(KEY, nonce=NONCE, algorithm=Algorithm.CHACHA20_POLY1305).encryptor
+        encrypted = b"".join(encryptor.iter_encrypt([b"HEL", b"LO"], length=5))
+        assert b"".join(ExEFSession(KEY).decryptor.iter_decrypt([encrypted[:30], encrypted[30:]])) == b"HELLO"
+
+    def test_alg(self):
+        assert ExEF(KEY).alg == "aes-256-gcm"
+        assert ExEF(KEY, algorithm=Algorithm.CHACHA20_POLY1305).alg == "chacha20-poly1305"
+        assert ExEFSession(KEY, algorithm=Algorithm.CHACHA20_POLY1305).alg == "chacha20-poly1305"
+
+    def test_mismatched_key(self):
+        with pytest.raises(ValueError, match="requires a 256-bit key"):
+            ExEF(b"1" * 16, algorithm=Algorithm.CHACHA20_POLY1305)
+        with pytest.raises(ValueError, match="requires a 256-bit key"):
+            ExEFSession(b"1" * 16, algorithm=Algorithm.CHACHA20_POLY1305)
+
+    def test_unknown_algorithm(self):
+        encrypted = ExEF(KEY, nonce=NONCE, algorithm=Algorithm.AES_256_GCM).encrypt(b"HELLO")
+        with pytest.raises(ValueError, match="unknown algorithm ID 99"):
+            ExEF(KEY).decrypt(encrypted[:6] + b"\x00\x63" + encrypted[8:])
@@ -1,7 +1,9 @@
+import asyncio
+
 import pytest
 
-from .exef import ExEF
-from .structures import Footer, Header
+from .exef import ExEF, ExEFSession
+from .structures import Footer, Header, RawFooter, RawHeader
 
 KEY = b"1" * 24
 NONCE = b"\xab" * 12
@@ -48,9 +50,36 @@ class TestValidExEF:
         assert footer.tag == FOOTER
         assert footer.serialize_as_bytes() == FOOTER
 
+    def test_raw_parsing(self):
+        header = RawHeader.unpack(memoryview(SAMPLE_EXEF)[: RawHeader.size])
+        assert header == (192, NONCE, 5, None)
+        assert header.pack() == HEADER
+        assert Header.from_serialized(HEADER).to_raw() == header
+
+        buffer = bytearray(RawHeader.size + 2)
+        header.pack_into(buffer, 2)
+        assert buffer[2:] == HEADER
+
+        footer = RawFooter.unpack(SAMPLE_EXEF[-RawFooter.size :])
+        assert footer.tag == FOOTER
+        assert footer.pack() == FOOTER
+
     def test_validation(self):
         assert ExEF.validate(SAMPLE_EXEF)
 
+    def test_session(self):
+        session = ExEFSession(KEY, nonce=NONCE)
+        assert session.alg == "aes-192-gcm"
+        assert session.additional_size == ExEF.additional_size
+        assert session.encrypt(b"HELLO") == SAMPLE_EXEF
+        assert ExEFSession(KEY).decrypt(SAMPLE_EXEF) == b"HELLO"
+
+        # A random nonce is only drawn for encryption, and kept for the session
+        session = ExEFSession(KEY)
+        assert session._nonce is None
+        assert len(session.nonce) == 12
+        assert session.nonce == session.encryptor._nonce
+
     def test_encrypt(self):
         ct_test = ExEF(KEY, nonce=NONCE).encrypt(b"HELLO")
         assert ct_test == SAMPLE_EXEF
@@ -83,6 +112,56 @@ class TestValidExEF:
 
         assert output == SAMPLE_EXEF
 
+    def test_encrypt_into(self):
+        output = bytearray(len(SAMPLE_EXEF) + 10)
+        written = ExEF(KEY, nonce=NONCE).encryptor.encrypt_into(b"HELLO", output)
+        assert written == len(SAMPLE_EXEF)
+        assert output[:written] == SAMPLE_EXEF
+
+    def test_encrypt_stream_into(self):
+        encryptor = ExEF(KEY, nonce=NONCE).encryptor
+        encryptor.set_params(length=5)
+
+        output = bytearray(len(SAMPLE_EXEF))
+        view = memoryview(output)
+        offset = encryptor.header_into(view)
+        for chunk in [b"HE", b"L", b"LO"]:
+            offset += encryptor.update_into(chunk, view[offset:])
+        offset += encryptor.footer_into(view[offset:])
+
+        assert offset == len(SAMPLE_EXEF)
+        assert output == SAMPLE_EXEF
+
+    def test_iter_encrypt(self):
+        encryptor = ExEF(KEY, nonce=NONCE).encryptor
+        output = b"".join(encryptor.iter_encrypt([b"HE", b"L", b"LO"], length=5))
+        assert output == SAMPLE_EXEF
+
+    def test_aiter_encrypt(self):
+        async def chunks():
+            for chunk in [b"HE", b"L", b"LO"]:
+                yield chunk
+
+        async def run():
+            encryptor = ExEF(KEY, nonce=NONCE).encryptor
+            return b"".join([piece async for piece in encryptor.aiter_encrypt(chunks(), length=5)])
+
+        assert asyncio.run(run()) == SAMPLE_EXEF
+
+    def test_encrypt_chunk(self):
+        encryptor = ExEF(KEY, nonce=NONCE).encryptor
+        encryptor.set_params(length=5)
+
+        first = encryptor.encrypt_chunk(b"HE")
+        assert first[: Header.size] == HEADER
+        middle = encryptor.encrypt_chunk(b"L")
+        last = encryptor.encrypt_chunk(b"LO")
+        assert last[-Footer.size :] == FOOTER
+        assert first + middle + last == SAMPLE_EXEF
+
+        # ASGI servers only accept bytes as response bodies
+        assert all(type(piece) is bytes for piece in (first, middle, last))
+
     def test_decrypt(self):
         pt_test = ExEF(KEY).decrypt(SAMPLE_EXEF)
         assert pt_test == b"HELLO"
@@ -111,6 +190,30 @@ class TestValidExEF:
         decryptor.verify()
         assert output == b"HELLO"
 
+    def test_iter_decrypt(self):
+        chunks = [SAMPLE_EXEF[i : i + 3] for i in range(0, len(SAMPLE_EXEF), 3)]
+        assert b"".join(ExEF(KEY).decryptor.iter_decrypt(chunks)) == b"HELLO"
+
+    def test_aiter_decrypt(self):
+        async def chunks():
+            for i in range(0, len(SAMPLE_EXEF), 3):
+                yield SAMPLE_EXEF[i : i + 3]
+
+        async def run():
+            return b"".join([piece async for piece in ExEF(KEY).decryptor.aiter_decrypt(chunks())])
+
+        assert asyncio.run(run()) == b"HELLO"
+
+    def test_decrypt_stream_into(self):
+        decryptor = ExEF(KEY).decryptor
+        output = bytearray(5)
+        offset = 0
+        for i in range(0, len(SAMPLE_EXEF), 3):
+            offset += decryptor.update_into(memoryview(SAMPLE_EXEF)[i : i + 3], memoryview(output)[offset:])
+
+        decryptor.verify()
+        assert output == b"HELLO"
+
 
 class TestInvalidExEF:
     @pytest.fixture
@@ -125,6 +228,16 @@ class TestInvalidExEF:
         with pytest.raises(ValueError, match="nonce must be 12 bytes"):
             ExEF(key=KEY, nonce=b"123")
 
+    def test_invalid_session(self):
+        with pytest.raises(ValueError, match="keysize must be 128, 192, or 256"):
+            ExEFSession(b"123")
+        with pytest.raises(ValueError, match="nonce must be 12 bytes"):
+            ExEFSession(KEY, nonce=b"123")
+
+    def test_invalid_raw_keysize(self):
+        with pytest.raises(ValueError, match="keysize must be 128, 192, or 256"):
+            RawHeader.unpack(HEADER[:6] + b"\x00\x01" + HEADER[8:])
+
     def test_magic(self, exef: ExEF):
         invalid_magic = _generate_invalid_magic()
         assert not ExEF.validate(invalid_magic)
@@ -143,6 +256,21 @@ class TestInvalidExEF:
         with pytest.raises(ValueError, match="header and footer must be set"):
             exef.decrypt(invalid_footer)
 
+    def test_iter_encrypt_wrong_length(self, exef: ExEF):
+        with pytest.raises(ValueError, match="expected 5 bytes but only got 4 bytes"):
+            b"".join(exef.encryptor.iter_encrypt([b"HELL"], length=5))
+
+        with pytest.raises(ValueError, match="only 5 bytes remain"):
+            b"".join(ExEF(KEY, nonce=NONCE).encryptor.iter_encrypt([b"HELLO!"], length=5))
+
+    def test_iter_decrypt_tag(self, exef: ExEF):
+        with pytest.raises(ValueError, match="MAC check failed"):
+            b"".join(exef.decryptor.iter_decrypt([_generate_invalid_tag()]))
+
+    def test_output_too_small(self, exef: ExEF):
+        with pytest.raises(ValueError, match="output buffer must be at least"):
+            exef.encryptor.encrypt_into(b"HELLO", bytearray(10))
+
     def test_tag(self, exef: ExEF):
         invalid_tag = _generate_invalid_tag()
         assert ExEF.validate(invalid_tag)  # Technically, this is valid ExEF data
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from .algorithms import Algorithm
+from .exef import ExEF
+from .framed import FramedDecryptor, FramedEncryptor
+from .structures import FRAMED_EXEF_VERSION, FramedHeader
+
+KEY = b"1" * 32
+NONCE = b"\xab" * 12
+DATA = bytes(range(256)) * 40  # 10240 bytes
+
+
+def _split(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.fixture
+def encrypted():
+    return FramedEncryptor(KEY, NONCE).encrypt(DATA, record_size=1000)
+
+
+class TestValidFramedExEF:
+    def test_header(self, encrypted: bytes):
+        header = FramedHeader.unpack(encrypted[: FramedHeader.size])
+        assert header.alg == Algorithm.AES_256_GCM
+        assert header.nonce == NONCE
+        assert encrypted[4:6] == FRAMED_EXEF_VERSION.to_bytes(2, "big")
+
+    def test_size(self, encrypted: bytes):
+        # 11 data records plus the empty final record
+        assert len(encrypted) == FramedHeader.size + len(DATA) + 12 * (FramedHeader.prefix_size + FramedHeader.tag_size)
+
+    def test_round_trip(self, encrypted: bytes):
+        assert ExEF(KEY).decrypt_framed(encrypted) == DATA
+
+    def test_fresh_nonce_per_stream(self):
+        # The record key is derived from the stream nonce, so it must never be reused under the key
+        exef = ExEF(KEY, nonce=NONCE)
+        first = exef.encrypt_framed(DATA, record_size=1000)
+        second = exef.encrypt_framed(DATA, record_size=1000)
+        assert first[: FramedHeader.size] != second[: FramedHeader.size]
+        assert first[FramedHeader.size :] != second[FramedHeader.size :]
+        assert exef.decrypt_framed(first) == exef.decrypt_framed(second) == DATA
+
+    def test_empty(self):
+        encrypted = ExEF(KEY, nonce=NONCE).encrypt_framed(b"")
+        assert ExEF(KEY).decrypt_framed(encrypted) == b""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 1024, 100_000])
+    def test_chunked_decrypt(self, encrypted: bytes, chunk_size: int):
+        decryptor = FramedDecryptor(KEY)
+        assert b"".join(decryptor.iter_decrypt(_split(encrypted, chunk_size))) == DATA
+        assert decryptor.finished
+
+    def test_chacha(self):
+        encryptor = FramedEncryptor(KEY, NONCE, Algorithm.CHACHA20_POLY1305)
+        encrypted = b"".join(encryptor.iter_encrypt([b"HEL", b"", b"LO"]))
+        assert FramedDecryptor(KEY).decrypt(encrypted) == b"HELLO"
+
+    def test_async(self):
+        async def chunks(data: bytes, size: int):
+            for chunk in _split(data, size):
+                yield chunk
+
+        async def run():
+            encrypted = b"".join([c async for c in FramedEncryptor(KEY, NONCE).aiter_encrypt(chunks(DATA, 3000))])
+            return b"".join([c async for c in FramedDecryptor(KEY).aiter_decrypt(chunks(encrypted, 500))])
+
+        assert asyncio.run(run()) == DATA
+
+    def test_large_chunk_split(self):
+        # A chunk larger than a decryptor accepts is sent as several records, the last one final
+        encryptor = FramedEncryptor(KEY, NONCE)
+        encrypted = encryptor.encrypt_chunk(DATA[:2500], record_size=1000)
+        encrypted += encryptor.encrypt_chunk(DATA[2500:], final=True, record_size=1000)
+        assert encryptor.finished
+
+        # 3 records for the first chunk and 8 for the second, with no empty final record
+        assert len(encrypted) == FramedHeader.size + len(DATA) + 11 * (FramedHeader.prefix_size + FramedHeader.tag_size)
+        assert FramedDecryptor(KEY, max_record_size=1000).decrypt(encrypted) == DATA
+
+    def test_final_flag_on_data(self):
+        encryptor = FramedEncryptor(KEY, NONCE)
+        encrypted = encryptor.encrypt_chunk(b"HEL") + encryptor.encrypt_chunk(b"LO", final=True)
+        assert encryptor.finished
+        assert FramedDecryptor(KEY).decrypt(encrypted) == b"HELLO"
+
+
+class TestInvalidFramedExEF:
+    def test_truncated(self, encrypted: bytes):
+        # Dropping the final record must be detected
+        with pytest.raises(ValueError, match="stream ended before the final record"):
+            ExEF(KEY).decrypt_framed(encrypted[: -(FramedHeader.prefix_size + FramedHeader.tag_size)])
+
+    def test_reordered(self):
+        encryptor = FramedEncryptor(KEY, NONCE)
+        header = encryptor.encrypt_chunk(b"")[: FramedHeader.size]
+        first = encryptor.encrypt_record(b"AAAA")
+        second = encryptor.encrypt_record(b"BBBB")
+        final = encryptor.encrypt_record(b"", final=True)
+
+        with pytest.raises(ValueError, match="MAC check failed"):
+            FramedDecryptor(KEY).decrypt(header + second + first + final)
+
+    def test_final_flag_tampered(self, encrypted: bytes):
+        # Marking the first record as final must invalidate it
+        offset = FramedHeader.size
+        tampered = bytearray(encrypted)
+        tampered[offset] |= 0x80
+        with pytest.raises(ValueError, match="MAC check failed"):
+            ExEF(KEY).decrypt_framed(bytes(tampered))
+
+    def test_trailing_data(self, encrypted: bytes):
+        with pytest.raises(ValueError, match="unexpected data after the final record"):
+            ExEF(KEY).decrypt_framed(encrypted + b"\x00")
+
+    def test_record_too_large(self, encrypted: bytes):
+        with pytest.raises(ValueError, match="exceeds the maximum"):
+            FramedDecryptor(KEY, max_record_size=100).decrypt(encrypted)
+
+    def test_wrong_version(self):
+        encrypted = ExEF(KEY, nonce=NONCE).encrypt(b"HELLO")
+        with pytest.raises(ValueError, match="version must be"):
+            FramedDecryptor(KEY).decrypt(encrypted)
+
+    def test_finished(self):
+        encryptor = FramedEncryptor(KEY, NONCE)
+        encryptor.encrypt_chunk(b"", final=True)
+        with pytest.raises(ValueError, match="stream has already been finished"):
+            encryptor.encrypt_chunk(b"more")
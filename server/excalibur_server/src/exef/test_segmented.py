@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from .exef import ExEF
+from .segmented import SegmentedDecryptor, SegmentedEncryptor, derive_segment_nonce
+from .structures import SegmentedHeader
+
+KEY = b"1" * 24
+NONCE = b"\xab" * 12
+DATA = bytes(range(256)) * 40  # 10240 bytes
+SEGMENT_SIZE = 1000
+
+
+@pytest.fixture
+def encrypted():
+    return SegmentedEncryptor(KEY, NONCE, len(DATA), segment_size=SEGMENT_SIZE).encrypt(DATA)
+
+
+class TestValidSegmentedExEF:
+    def test_header(self, encrypted: bytes):
+        header = SegmentedHeader.from_serialized(encrypted[: SegmentedHeader.size])
+        assert header.keysize == 192
+        assert header.nonce == NONCE
+        assert header.ct_len == len(DATA)
+        assert header.segment_size == SEGMENT_SIZE
+        assert header.num_segments == 11
+        assert header.serialize_as_bytes() == encrypted[: SegmentedHeader.size]
+
+    def test_size(self, encrypted: bytes):
+        assert len(encrypted) == SegmentedHeader.size + len(DATA) + 11 * SegmentedHeader.tag_size
+
+    def test_round_trip(self, encrypted: bytes):
+        assert ExEF(KEY).decrypt_segmented(encrypted) == DATA
+
+    def test_empty(self):
+        encrypted = ExEF(KEY, nonce=NONCE).encrypt_segmented(b"")
+        assert len(encrypted) == SegmentedHeader.size + SegmentedHeader.tag_size
+        assert ExEF(KEY).decrypt_segmented(encrypted) == b""
+
+    def test_fresh_nonce_per_message(self):
+        # The segment nonces start from the message nonce, so it must never be reused under the key
+        exef = ExEF(KEY, nonce=NONCE)
+        first = exef.encrypt_segmented(DATA, segment_size=SEGMENT_SIZE)
+        second = exef.encrypt_segmented(DATA, segment_size=SEGMENT_SIZE)
+        assert first[: SegmentedHeader.size] != second[: SegmentedHeader.size]
+        assert first[SegmentedHeader.size :] != second[SegmentedHeader.size :]
+        assert SegmentedHeader.from_serialized(first[: SegmentedHeader.size]).nonce != NONCE
+        assert exef.decrypt_segmented(first) == exef.decrypt_segmented(second) == DATA
+
+    def test_segment_nonces_are_distinct(self):
+        nonces = {derive_segment_nonce(NONCE, i) for i in range(1000)}
+        assert len(nonces) == 1000
+        assert derive_segment_nonce(NONCE, 0) == NONCE
+
+    def test_random_access(self, encrypted: bytes):
+        decryptor = SegmentedDecryptor.from_serialized_header(KEY, encrypted)
+
+        # Decrypt only the segments covering bytes 2500 to 4200
+        segments = decryptor.segments_for_range(2500, 4200)
+        assert segments == range(2, 5)
+
+        output = b""
+        for i in segments:
+            offset = decryptor.segment_offset(i)
+            output += decryptor.decrypt_segment(
+                i, encrypted[offset : offset + decryptor.segment_length(i) + SegmentedHeader.tag_size]
+            )
+        assert output == DATA[2000:5000]
+
+    def test_independent_encryption(self, encrypted: bytes):
+        encryptor = SegmentedEncryptor(KEY, NONCE, len(DATA), segment_size=SEGMENT_SIZE)
+
+        # Encrypt the last segment on its own
+        last = encryptor.num_segments - 1
+        ct = encryptor.encrypt_segment(last, DATA[last * SEGMENT_SIZE :])
+        assert ct == encrypted[encryptor.segment_offset(last) :]
+
+    def test_thread_pool(self, encrypted: bytes):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            encryptor = SegmentedEncryptor(KEY, NONCE, len(DATA), segment_size=SEGMENT_SIZE)
+            assert encryptor.encrypt(DATA, executor=executor) == encrypted
+            assert ExEF(KEY).decrypt_segmented(ExEF(KEY).encrypt_segmented(DATA, executor=executor)) == DATA
+            assert ExEF(KEY).decrypt_segmented(encrypted, executor=executor) == DATA
+
+
+class TestInvalidSegmentedExEF:
+    def test_version(self, encrypted: bytes):
+        with pytest.raises(ValueError, match="version must be"):
+            ExEF(KEY).decrypt_segmented(encrypted[:4] + b"\x00\x02" + encrypted[6:])
+
+    def test_truncated(self, encrypted: bytes):
+        with pytest.raises(ValueError, match="data must be"):
+            ExEF(KEY).decrypt_segmented(encrypted[: -SegmentedHeader.tag_size - 1])
+
+    def test_swapped_segments(self, encrypted: bytes):
+        decryptor = SegmentedDecryptor.from_serialized_header(KEY, encrypted)
+        first = encrypted[decryptor.segment_offset(0) : decryptor.segment_offset(1)]
+        with pytest.raises(ValueError, match="MAC check failed"):
+            decryptor.decrypt_segment(1, first)
+
+    def test_tampered_header(self, encrypted: bytes):
+        # Changing the segment size in the header must invalidate every segment
+        tampered = encrypted[: SegmentedHeader.size - 1] + b"\x00" + encrypted[SegmentedHeader.size :]
+        decryptor = SegmentedDecryptor.from_serialized_header(KEY, tampered)
+        with pytest.raises(ValueError):
+            decryptor.decrypt(tampered)
+
+    def test_wrong_length(self):
+        encryptor = SegmentedEncryptor(KEY, NONCE, len(DATA), segment_size=SEGMENT_SIZE)
+        with pytest.raises(ValueError, match="segment 0 must be"):
+            encryptor.encrypt_segment(0, b"short")
+        with pytest.raises(IndexError):
+            encryptor.encrypt_segment(11, b"")
@@ -1,3 +1,4 @@
+from .busy import ServerBusyMiddleware
 from .size_limit import LimitUploadSizeMiddleware
 
-__all__ = ["LimitUploadSizeMiddleware"]
+__all__ = ["LimitUploadSizeMiddleware", "ServerBusyMiddleware"]
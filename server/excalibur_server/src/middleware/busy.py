@@ -0,0 +1,31 @@
+from starlette import status
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+SERVER_BUSY_MESSAGE = "Server busy; try again later"
+
+
+class ServerBusyMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware that turns a `TimeoutError` escaping a request (e.g., from a session store that is
+    locked by another worker) into a 503 response, so that the client knows to try again.
+    """
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        """
+        Handles the request
+
+        :param request: The request
+        :param call_next: The next function in the chain
+        :return: The response
+        """
+
+        try:
+            return await call_next(request)
+        except TimeoutError:
+            return JSONResponse(
+                {"detail": SERVER_BUSY_MESSAGE},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
@@ -1,3 +1,4 @@
 from .middleware import RouteEncryptionMiddleware
+from .routing import encrypted_route
 
-__all__ = ["RouteEncryptionMiddleware"]
+__all__ = ["RouteEncryptionMiddleware", "encrypted_route"]
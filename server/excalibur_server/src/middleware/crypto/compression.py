@@ -0,0 +1,95 @@
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+"""Content types that are worth compressing before encryption"""
+
+SUPPORTED_ENCODINGS: tuple[str, ...] = ("zstd", "deflate") if zstandard is not None else ("deflate",)
+"""Supported encodings, in order of preference"""
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Picks the encoding to compress the response with.
+
+    The header follows the syntax of `Accept-Encoding`, including quality values (e.g.,
+    `zstd;q=1.0, deflate;q=0.5`). Ties are broken using the server's order of preference.
+
+    :param accept_encoding: The value of the header listing the encodings accepted by the client
+    :return: The chosen encoding, or None if no supported encoding was accepted
+    """
+
+    if not accept_encoding:
+        return None
+
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        encoding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[encoding.lower()] = quality
+
+    candidates = [
+        encoding
+        for encoding in SUPPORTED_ENCODINGS
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0  # A `q` of 0 means "not acceptable"
+    ]
+    if not candidates:
+        return None
+
+    return max(candidates, key=lambda encoding: accepted.get(encoding, accepted.get("*", 0.0)))
+
+
+def is_compressible(content_type: str | None) -> bool:
+    """
+    Checks if a response with the given content type is worth compressing.
+
+    :param content_type: The content type of the response
+    :return: Whether the response should be compressed
+    """
+
+    return content_type is not None and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(data: bytes, encoding: str, level: int = 6) -> bytes:
+    """
+    Compresses the data.
+
+    :param data: The data to compress
+    :param encoding: The encoding to use
+    :param level: The compression level
+    :raises ValueError: If the encoding is not supported
+    :return: The compressed data
+    """
+
+    if encoding == "deflate":
+        return zlib.compress(data, level)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Unsupported encoding '{encoding}'")
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    """
+    Decompresses the data.
+
+    :param data: The data to decompress
+    :param encoding: The encoding that was used
+    :raises ValueError: If the encoding is not supported
+    :return: The decompressed data
+    """
+
+    if encoding == "deflate":
+        return zlib.decompress(data)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unsupported encoding '{encoding}'")
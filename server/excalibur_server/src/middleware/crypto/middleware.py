@@ -1,33 +1,57 @@
-from typing import Awaitable, Callable
+from typing import Awaitable, Callable, Iterable
 
-from starlette.datastructures import MutableHeaders
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.responses import JSONResponse
+from starlette.routing import BaseRoute
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from excalibur_server.api.cache import MASTER_KEYS_CACHE
 from excalibur_server.api.logging import logger
-from excalibur_server.src.auth.consts import KEY
-from excalibur_server.src.auth.credentials import CREDENTIALS_EXCEPTION, decode_token
-from excalibur_server.src.exef import ExEF
-from excalibur_server.src.middleware.crypto.routing import ROUTING_TREE
+from excalibur_server.src.auth.context import get_auth_context
+from excalibur_server.src.auth.credentials import CREDENTIALS_EXCEPTION
+from excalibur_server.src.config import CONFIG
+from excalibur_server.src.config.security import SESSION_ALGORITHMS
+from excalibur_server.src.exef import Algorithm, ExEFSession
+from excalibur_server.src.middleware.crypto.compression import compress, is_compressible, negotiate_encoding
+from excalibur_server.src.middleware.crypto.offload import CRYPTO_OFFLOADER, CryptoOffloader
+from excalibur_server.src.middleware.crypto.routing import compile_routes
 from excalibur_server.src.middleware.crypto.structures import EncryptedRoute
 
+INVALID_BODY_EXCEPTION = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Middleware processing: Invalid encrypted body",
+)
+
 
 class RouteEncryptionMiddleware:
     """
     Middleware that encrypts the traffic of encrypted routes.
     """
 
-    def __init__(self, app: ASGIApp, encrypt_response: bool = True) -> None:
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: Iterable[BaseRoute] = (),
+        encrypt_response: bool = True,
+        offloader: CryptoOffloader = CRYPTO_OFFLOADER,
+    ) -> None:
         """
         Constructor
 
+        The middleware is constructed when the app starts up, by which point all routes have been
+        included, so the encrypted routes are compiled once here.
+
         :param app: The ASGI app
+        :param routes: The routes of the app, of which those marked with `encrypted_route` are
+            encrypted
         :param encrypt_response: Whether to encrypt the response
+        :param offloader: The offloader that runs the encryption of large chunks
         """
 
         self.app = app
+        self.route_table = compile_routes(routes)
         self.encrypt_response = encrypt_response
+        self.offloader = offloader
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
@@ -44,16 +68,14 @@ class RouteEncryptionMiddleware:
             return
 
         # Check if the route should be encrypted
-        path = scope["path"]
-        method = scope["method"]
-        route_data = ROUTING_TREE.traverse(path).get(method)
+        route_data = self.route_table.lookup(scope["method"], scope["path"])
         if route_data is None:
             # Pass through
             await self.app(scope, receive, send)
             return
 
         # Handle using the actual handler
-        handler = EncryptionHandler(self.app, route_data, self.encrypt_response)
+        handler = EncryptionHandler(self.app, route_data, self.encrypt_response, self.offloader)
         await handler(scope, receive, send)
 
 
@@ -62,29 +84,42 @@ class EncryptionHandler:
     Handles the encryption of the request and response.
     """
 
-    def __init__(self, app: ASGIApp, route_data: EncryptedRoute, encrypt_response: bool) -> None:
+    def __init__(
+        self,
+        app: ASGIApp,
+        route_data: EncryptedRoute,
+        encrypt_response: bool,
+        offloader: CryptoOffloader = CRYPTO_OFFLOADER,
+    ) -> None:
         """
         Constructor
 
         :param app: The ASGI app
         :param route_data: The route data
         :param encrypt_response: Whether to encrypt the response
+        :param offloader: The offloader that runs the encryption of large chunks
         """
 
         self.app = app
         self.route_data = route_data
+        self.offloader = offloader
 
         self._scope: Scope | None = None
         self._receive: Receive | None = None
         self._send: Send | None = None
 
         self._e2ee_key: bytes | None = None
+        self._algorithm: Algorithm | None = None
 
         self._initial_message: Message | None = None
-        self._started_response: bool = False
+
+        self._encoding: str | None = None
+        self._uncompressed_body: bytearray | None = None  # Set while collecting a body to compress
+        self._framed: bool = False  # Whether the response is being sent as a framed stream
 
         self._should_encrypt_response: bool = self.route_data.encrypted_response and encrypt_response
         self._to_raise_credentials_exception: bool = False
+        self._decrypt_body: bool = False
 
     # Magic methods
     async def __call__(self, scope: Scope, receive: Receive, send: Send):
@@ -99,12 +134,19 @@ class EncryptionHandler:
         self._scope = scope
         self._receive = receive
         self._send = send
-        self._exef: ExEF | None = None
+        self._exef: ExEFSession | None = None
 
         # Try to set the E2EE key using the scope headers
-        self._set_e2ee_key(MutableHeaders(scope=scope))
+        headers = Headers(scope=scope)
+        self._set_e2ee_key(headers)
+        self._set_algorithm(headers)
+        self._encoding = negotiate_encoding(headers.get("X-Encrypted-Accept-Encoding"))
 
-        await self.app(scope, self._receive_wrapper(scope), self._send_wrapper())
+        self._decrypt_body = self.route_data.encrypted_body and headers.get("X-Encrypted", "false") != "false"
+        if self._decrypt_body:
+            self._update_request_headers()
+
+        await self.app(scope, self._receive_wrapper(), self._send_wrapper())
 
     # Helper functions
     async def _raise_credentials_exception(self) -> None:
@@ -120,10 +162,13 @@ class EncryptionHandler:
         )
         await response(self._scope, self._receive, self._send)
 
-    def _set_e2ee_key(self, headers: MutableHeaders) -> None:
+    def _set_e2ee_key(self, headers: Headers) -> None:
         """
         Tries to set the E2EE key.
 
+        The verified token is kept in the request state, so that `get_credentials` does not need to
+        verify it again.
+
         :param headers: The headers
         """
 
@@ -138,46 +183,57 @@ class EncryptionHandler:
         if auth[0] != "Bearer" or len(auth) != 2:
             return
 
-        token = decode_token(auth[1], KEY)
-        if token is None:
+        context = get_auth_context(self._scope, auth[1])
+        if context is None:
             return
 
-        # Get master key
-        if "uuid" not in token:
+        self._e2ee_key = context.master_key
+
+    def _set_algorithm(self, headers: Headers) -> None:
+        """
+        Sets the algorithm requested by the client for encrypting the response.
+
+        Unknown algorithms are ignored, in which case the response is encrypted using AES-GCM with a
+        version 2 ExEF header.
+
+        :param headers: The headers
+        """
+
+        label = headers.get("X-Encryption-Algorithm")
+        if label is None:
             return
 
-        comm_uuid = token["uuid"]
-        if comm_uuid not in MASTER_KEYS_CACHE:
+        try:
+            algorithm = Algorithm.from_label(label)
+        except ValueError:
             return
 
-        self._e2ee_key = MASTER_KEYS_CACHE[comm_uuid]
+        if algorithm in SESSION_ALGORITHMS:
+            self._algorithm = algorithm
 
-    async def _decrypt_request(self, message: Message) -> Message:
+    def _create_exef(self) -> ExEFSession:
         """
-        Decrypts the request.
+        Creates the ExEF session for the request, using the requested algorithm if it fits the key.
 
-        :param message: The message to decrypt
-        :return: The decrypted message
+        :return: The ExEF session
         """
 
-        # Decrypt body
-        decrypted_body = b""
-        while decrypted_body == b"":
-            encrypted_body: bytes = message.get("body", b"")
-            self._exef.decryptor.update(encrypted_body)
-            decrypted_body = self._exef.decryptor.get()
-
-            if decrypted_body == b"":
-                message = await self._receive()
+        if self._algorithm is not None and len(self._e2ee_key) * 8 == self._algorithm.keysize:
+            return ExEFSession(self._e2ee_key, algorithm=self._algorithm)
+        return ExEFSession(self._e2ee_key)
 
-        if self._exef.decryptor.fully_processed:
-            self._exef.decryptor.verify()
+    def _update_request_headers(self) -> None:
+        """
+        Updates the request headers to describe the decrypted body.
 
-        message["body"] = decrypted_body
+        This is done once, before the app sees the request, so that the Content-Length seen by the
+        app is that of the whole plaintext rather than of any one chunk.
+        """
 
-        # Update headers
         headers = MutableHeaders(raw=self._scope["headers"])
-        headers["Content-Length"] = str(len(decrypted_body))
+        if "Content-Length" in headers:
+            plaintext_length = int(headers["Content-Length"]) - ExEFSession.additional_size
+            headers["Content-Length"] = str(max(plaintext_length, 0))
 
         # TODO: Determine if `X-Content-Type` needs to be deleted
         # if "X-Content-Type" in headers:
@@ -190,8 +246,40 @@ class EncryptionHandler:
 
         self._scope["headers"] = headers.raw
 
-        logger.debug(f"< {len(decrypted_body)} decrypted bytes")
-        return message
+    async def _decrypt_request(self, message: Message) -> Message:
+        """
+        Decrypts the next part of the request body.
+
+        Each incoming message is decrypted as it arrives, so only one chunk is held in memory at a
+        time. Messages that carry no plaintext (e.g., only the ExEF header) are skipped over. The tag
+        is verified before the final message (i.e., the one without `more_body`) is handed over.
+
+        :param message: The first message to decrypt
+        :raises HTTPException: If the body is not a valid ExEF message
+        :return: The decrypted message, or the first non-request message (e.g., a disconnect)
+        """
+
+        decryptor = self._exef.decryptor
+        while True:
+            more_body = message.get("more_body", False)
+            chunk = message.get("body", b"")
+            try:
+                body = await self.offloader.run(len(chunk), decryptor.decrypt_chunk, chunk)
+                if not more_body:
+                    decryptor.verify()
+            except ValueError as e:
+                logger.debug(f"Failed to decrypt request: {e}")
+                raise INVALID_BODY_EXCEPTION
+
+            if body or not more_body:
+                break
+
+            message = await self._receive()
+            if message["type"] != "http.request":
+                return message
+
+        logger.debug(f"< {len(body)} decrypted bytes")
+        return {"type": "http.request", "body": body, "more_body": more_body}
 
     async def _encrypt_response(self, message: Message):
         """
@@ -205,72 +293,143 @@ class EncryptionHandler:
         if message_type == "http.response.start":
             # Don't send the initial message until we've determined how to modify the outgoing headers correctly
             self._initial_message = message
-            self._started_response = False
 
             # Get content length of the new message
             headers = MutableHeaders(raw=message["headers"])
             content_length = headers.get("Content-Length")
             if content_length is None:
-                raise ValueError("Content-Length header not found")
+                # Streamed response, so encrypt it as a framed stream of records
+                await self._start_framed_response()
+                return
             content_length = int(content_length)
-            new_content_length = content_length + ExEF.additional_size
 
-            # Set headers
-            headers["Content-Type"] = "application/octet-stream"
-            headers["Content-Length"] = str(new_content_length)
-            headers["Access-Control-Expose-Headers"] = "X-Encrypted"
-            headers["X-Encrypted"] = "true"
-
-            self._initial_message["headers"] = headers.raw
-
-            # Set parameters
-            self._exef.encryptor.set_params(length=content_length)
+            if (
+                self._encoding is not None
+                and content_length >= CONFIG.security.e2ee.compression_threshold
+                and is_compressible(headers.get("Content-Type"))
+            ):
+                # The compressed length is only known once the whole body is in, so hold the start message back
+                self._uncompressed_body = bytearray()
+                return
 
-            # Now send the message
-            await self._send(self._initial_message)
+            await self._start_encrypted_response(content_length)
             return
 
         if message_type == "http.response.body":
+            if self._uncompressed_body is not None:
+                await self._collect_body_to_compress(message)
+                return
+
+            if self._framed:
+                await self._send_framed_body(message)
+                return
+
             if message.get("body", b"") == b"":
                 await self._send(message)
                 return
 
-            # Encrypt body
-            plaintext_body = message["body"]
-            self._exef.encryptor.update(plaintext_body)
-
-            # Determine what we need to send
-            to_send = None
-            if not self._started_response:
-                # Need to send both header and the initial body
-                header = self._exef.encryptor.get()
-                encrypted_body = self._exef.encryptor.get()
-                to_send = header + encrypted_body
-            else:
-                # Just need to send the body
-                encrypted_body = self._exef.encryptor.get()
-                to_send = encrypted_body
-
-            if self._exef.encryptor.fully_processed:
-                footer = self._exef.encryptor.get()
-                to_send += footer
-
+            # Encrypt body (the encryptor adds the header and footer where needed)
+            body = message["body"]
+            to_send = await self.offloader.run(len(body), self._exef.encryptor.encrypt_chunk, body)
             message["body"] = to_send
 
             # Update headers
             message["headers"] = self._initial_message["headers"]
 
             # Send message
-            if not self._started_response:
-                self._started_response = True
             await self._send(message)
             logger.debug(f"> {len(to_send)} encrypted bytes")
 
-    def _receive_wrapper(self, scope: Scope) -> Callable[[], Awaitable[Message]]:
+    async def _start_encrypted_response(self, content_length: int, encoding: str | None = None):
+        """
+        Updates the headers of the initial message for an encrypted body, and sends it.
+
+        :param content_length: The length of the plaintext body
+        :param encoding: The encoding that the plaintext was compressed with, if any
+        """
+
+        headers = MutableHeaders(raw=self._initial_message["headers"])
+        headers["Content-Type"] = "application/octet-stream"
+        headers["Content-Length"] = str(content_length + ExEFSession.additional_size)
+        headers["Access-Control-Expose-Headers"] = "X-Encrypted"
+        headers["X-Encrypted"] = "true"
+        if encoding is not None:
+            headers["Access-Control-Expose-Headers"] = "X-Encrypted, X-Encrypted-Encoding"
+            headers["X-Encrypted-Encoding"] = encoding
+
+        self._initial_message["headers"] = headers.raw
+
+        # Set parameters
+        self._exef.encryptor.set_params(length=content_length)
+
+        # Now send the message
+        await self._send(self._initial_message)
+
+    async def _start_framed_response(self):
+        """
+        Updates the headers of the initial message for a framed encrypted body, and sends it.
+        """
+
+        self._framed = True
+
+        headers = MutableHeaders(raw=self._initial_message["headers"])
+        headers["Content-Type"] = "application/octet-stream"
+        headers["Access-Control-Expose-Headers"] = "X-Encrypted"
+        headers["X-Encrypted"] = "true"
+
+        self._initial_message["headers"] = headers.raw
+        await self._send(self._initial_message)
+
+    async def _send_framed_body(self, message: Message):
+        """
+        Encrypts a body message of a streamed response as framed records, and sends it.
+
+        :param message: The body message
+        """
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if body == b"" and more_body:
+            return  # Nothing to send yet
+
+        to_send = await self.offloader.run(len(body), self._exef.framed_encryptor.encrypt_chunk, body, not more_body)
+        await self._send({"type": "http.response.body", "body": to_send, "more_body": more_body})
+        logger.debug(f"> {len(to_send)} encrypted bytes (framed)")
+
+    async def _collect_body_to_compress(self, message: Message):
+        """
+        Collects the body of a response that is to be compressed, then compresses, encrypts and
+        sends it once it is complete.
+
+        :param message: The body message
+        """
+
+        self._uncompressed_body += message.get("body", b"")
+        if message.get("more_body", False):
+            return
+
+        body = bytes(self._uncompressed_body)
+        self._uncompressed_body = None
+
+        encoding = self._encoding
+        compressed = await self.offloader.run(
+            len(body), compress, body, encoding, CONFIG.security.e2ee.compression_level
+        )
+        if len(compressed) < len(body):
+            body = compressed
+        else:
+            encoding = None  # Not worth it
+
+        await self._start_encrypted_response(len(body), encoding)
+
+        to_send = await self.offloader.run(len(body), self._exef.encryptor.encrypt_chunk, body)
+        await self._send({"type": "http.response.body", "body": to_send, "more_body": False})
+        logger.debug(f"> {len(to_send)} encrypted bytes ({encoding or 'uncompressed'})")
+
+    def _receive_wrapper(self) -> Callable[[], Awaitable[Message]]:
         """
         Wrapper for the receive function.
 
-        :param scope: The scope
         :return: The receive function, which decrypts the request if needed
         """
 
@@ -278,23 +437,16 @@ class EncryptionHandler:
             message = await self._receive()
 
             # Check if the incoming request needs to be decrypted
-            if not self.route_data.encrypted_body:
+            if not self._decrypt_body or message["type"] != "http.request":
                 return message
 
-            headers = MutableHeaders(scope=self._scope)
-            if headers.get("X-Encrypted", "false") == "false":
-                return message
-
-            # Try to set the E2EE key using the scope headers
             if self._e2ee_key is None:
-                self._set_e2ee_key(MutableHeaders(scope=scope))
-                if self._e2ee_key is None:
-                    # We wanted to decrypt but no key was found...
-                    self._to_raise_credentials_exception = True
-                    return message
+                # We wanted to decrypt but no key was found in the request headers...
+                self._to_raise_credentials_exception = True
+                return message
 
             if self._exef is None:
-                self._exef = ExEF(self._e2ee_key)
+                self._exef = self._create_exef()
 
             return await self._decrypt_request(message)
 
@@ -337,8 +489,8 @@ class EncryptionHandler:
                     # Wanted to encrypt but still no key found
                     return await self._raise_credentials_exception()
 
-            if self._exef is None and not self._started_response:
-                self._exef = ExEF(self._e2ee_key)
+            if self._exef is None:
+                self._exef = self._create_exef()
 
             await self._encrypt_response(message)
 
@@ -0,0 +1,81 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from excalibur_server.src.config import CONFIG
+
+T = TypeVar("T")
+
+
+class CryptoOffloader:
+    """
+    Runs cryptographic work on large chunks in a thread pool, so that it does not block the event
+    loop.
+
+    pycryptodome releases the GIL while encrypting and decrypting, so the work on large chunks can
+    overlap with the I/O of other connections. Small chunks are processed inline, since handing them
+    to a thread would cost more than the work itself.
+    """
+
+    def __init__(self, max_workers: int, threshold: int):
+        """
+        Initializes the offloader.
+
+        :param max_workers: The number of threads in the pool. If 0, all work is done inline
+        :param threshold: The size of the smallest chunk to offload, in bytes
+        """
+
+        self.max_workers = max_workers
+        self.threshold = threshold
+
+        self._executor: ThreadPoolExecutor | None = None
+
+    # Properties
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether any work is offloaded at all.
+        """
+
+        return self.max_workers > 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        The thread pool, which is created when first needed.
+        """
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="excalibur-crypto")
+        return self._executor
+
+    # Public methods
+    async def run(self, size: int, fn: Callable[..., T], *args) -> T:
+        """
+        Runs the function, in the thread pool if the chunk is large enough.
+
+        Callers await each call before starting the next, so chunks of a message are still
+        processed in order.
+
+        :param size: The size of the chunk being processed, in bytes
+        :param fn: The function to run
+        :param args: The arguments to the function
+        :return: The result of the function
+        """
+
+        if not self.enabled or size < self.threshold:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def shutdown(self):
+        """
+        Shuts the thread pool down, if it was created.
+        """
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+CRYPTO_OFFLOADER = CryptoOffloader(CONFIG.security.e2ee.offload_workers, CONFIG.security.e2ee.offload_threshold)
+"""Offloader used by the route encryption middleware"""
@@ -1,72 +1,79 @@
-from .structures import EncryptedRoute, RoutingTree
-
-AUTH_ROUTING_TREE = RoutingTree(
-    segment="auth",
-    subtrees={
-        "pop-demo": RoutingTree(
-            segment="pop-demo",
-            subtrees={
-                "encrypted": RoutingTree(
-                    segment="encrypted",
-                    encrypted_routes={
-                        "POST": EncryptedRoute(),
-                    },
-                )
-            },
-        )
-    },
-)
-FILES_ROUTING_TREE = RoutingTree(
-    segment="files",
-    subtrees={
-        "list": RoutingTree(
-            segment="list",
-            has_path_param=True,
-            encrypted_routes={
-                "GET": EncryptedRoute(),
-            },
-        ),
-        "upload": RoutingTree(
-            segment="upload",
-            has_path_param=True,
-            encrypted_routes={
-                "POST": EncryptedRoute(),
-            },
-        ),
-        "mkdir": RoutingTree(
-            segment="mkdir",
-            has_path_param=True,
-            encrypted_routes={
-                "POST": EncryptedRoute(),
-            },
-        ),
-        "download": RoutingTree(
-            segment="download",
-            has_path_param=True,
-            encrypted_routes={
-                "GET": EncryptedRoute(),
-            },
-        ),
-    },
-)
-USERS_ROUTING_TREE = RoutingTree(
-    segment="users",
-    subtrees={
-        "vault": RoutingTree(
-            segment="vault",
-            has_path_param=True,
-            encrypted_routes={
-                "GET": EncryptedRoute(),
-            },
-        ),
-    },
-)
-
-ROUTING_TREE = RoutingTree(
-    segment="api",
-    subtrees={
-        "auth": AUTH_ROUTING_TREE,
-        "files": FILES_ROUTING_TREE,
-        "users": USERS_ROUTING_TREE,
-    },
-)
+from typing import Callable, Iterable, TypeVar
+
+from fastapi import status
+from fastapi.routing import APIRoute
+from starlette.routing import BaseRoute
+
+from .structures import EncryptedRoute, EncryptedRouteTable
+
+try:
+    from fastapi.routing import iter_route_contexts
+except ImportError:  # Older FastAPI versions copy the routes of included routers into the app
+    iter_route_contexts = None
+
+F = TypeVar("F", bound=Callable)
+
+ENCRYPTED_ROUTE_ATTR = "__encrypted_route__"
+
+
+def encrypted_route(
+    encrypted_body: bool = True,
+    encrypted_response: bool = True,
+    excluded_statuses: Iterable[int] = (status.HTTP_401_UNAUTHORIZED,),
+) -> Callable[[F], F]:
+    """
+    Marks an endpoint as encrypted, so that the route encryption middleware handles its traffic.
+
+    Must be applied below the router decorator, e.g.
+
+    ```
+    @router.get("/some/path")
+    @encrypted_route(encrypted_body=False)
+    def some_endpoint(): ...
+    ```
+
+    :param encrypted_body: Whether the body of the request is encrypted
+    :param encrypted_response: Whether the response is encrypted
+    :param excluded_statuses: List of status codes for which the response should not be encrypted
+    :return: The decorator, which returns the endpoint unchanged apart from the marker
+    """
+
+    route = EncryptedRoute(
+        encrypted_body=encrypted_body,
+        encrypted_response=encrypted_response,
+        excluded_statuses=list(excluded_statuses),
+    )
+
+    def decorator(endpoint: F) -> F:
+        setattr(endpoint, ENCRYPTED_ROUTE_ATTR, route)
+        return endpoint
+
+    return decorator
+
+
+def compile_routes(routes: Iterable[BaseRoute]) -> EncryptedRouteTable:
+    """
+    Compiles the encrypted routes of an app into a lookup table.
+
+    :param routes: The routes of the app
+    :return: The table of all routes whose endpoints are marked with `encrypted_route`
+    """
+
+    if iter_route_contexts is not None:
+        # Routes of included routers are only resolved (with their prefixes) through their contexts
+        routes = [
+            context for context in iter_route_contexts(list(routes)) if isinstance(context.original_route, APIRoute)
+        ]
+    else:
+        routes = [route for route in routes if isinstance(route, APIRoute)]
+
+    entries = []
+    for route in routes:
+        route_data = getattr(route.endpoint, ENCRYPTED_ROUTE_ATTR, None)
+        if route_data is None:
+            continue
+
+        for method in sorted(route.methods):
+            entries.append((method, route.path_regex, route_data))
+
+    return EncryptedRouteTable(entries)
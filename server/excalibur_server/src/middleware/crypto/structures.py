@@ -1,6 +1,11 @@
+import re
+from typing import Iterable
+
 from fastapi import status
 from pydantic import BaseModel
 
+_NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+
 
 class EncryptedRoute(BaseModel):
     encrypted_body: bool = True
@@ -17,39 +22,64 @@ class EncryptedRoute(BaseModel):
         return self.encrypted_body or self.encrypted_response
 
 
-class RoutingTree(BaseModel):
-    segment: str
-    "The segment of the path that corresponds to this routing tree"
+class EncryptedRouteTable:
+    """
+    Lookup table of the encrypted routes of an app.
 
-    has_path_param: bool = False
-    "Whether the routing tree has a path parameter"
+    The paths of all encrypted routes sharing a method are compiled into a single regular expression,
+    so finding the route of a request takes one match over its path.
+    """
 
-    subtrees: dict[str, "RoutingTree"] = {}
-    "Subtrees of the routing tree"
+    def __init__(self, routes: Iterable[tuple[str, re.Pattern, EncryptedRoute]] = ()):
+        """
+        Initializes the table.
+
+        :param routes: The method, Starlette path regex and encryption settings of each encrypted
+            route, in the order in which the app matches them
+        """
 
-    encrypted_routes: dict[str, EncryptedRoute] = {}
-    "Encrypted routes for this routing tree"
+        grouped: dict[str, list[tuple[re.Pattern, EncryptedRoute]]] = {}
+        for method, path_regex, route in routes:
+            grouped.setdefault(method, []).append((path_regex, route))
 
-    def traverse(self, path: str) -> dict[str, EncryptedRoute]:
+        self._patterns: dict[str, re.Pattern] = {}
+        self._routes: dict[str, tuple[EncryptedRoute, ...]] = {}
+        for method, entries in grouped.items():
+            # Each path becomes one capturing alternative, so the index of the last group matched is
+            # the index of the route
+            alternatives = "|".join(f"({_strip_groups(path_regex.pattern)})" for path_regex, _ in entries)
+            self._patterns[method] = re.compile(alternatives)
+            self._routes[method] = tuple(route for _, route in entries)
+
+    def __len__(self) -> int:
+        return sum(len(routes) for routes in self._routes.values())
+
+    def lookup(self, method: str, path: str) -> EncryptedRoute | None:
         """
-        Traverses the routing tree to find encrypted routes for a given path.
+        Finds the encrypted route matching a request.
 
-        :param path: The path to traverse, starting from the root of the routing tree.
-        :return: A dictionary of HTTP methods to their corresponding encrypted route configurations
-                if the path matches a segment in the routing tree, otherwise an empty dictionary.
+        :param method: The HTTP method of the request
+        :param path: The path of the request
+        :return: The encryption settings of the route, or `None` if the request is not to an
+            encrypted route
         """
 
-        path = path.removeprefix("/").removesuffix("/")
-        if path == self.segment:
-            return self.encrypted_routes
-        elif self.has_path_param and path.startswith(self.segment):
-            return self.encrypted_routes
+        pattern = self._patterns.get(method)
+        if pattern is None:
+            return None
+
+        match = pattern.fullmatch(path)
+        if match is None:
+            return None
+        return self._routes[method][match.lastindex - 1]
+
 
-        next_path = path.removeprefix(self.segment + "/")
-        next_segment = next_path.split("/")[0]
-        subtree = self.subtrees.get(next_segment)
+def _strip_groups(pattern: str) -> str:
+    """
+    Turns a Starlette path regex into a fragment that can be embedded in a larger regex.
 
-        if subtree is None:
-            return {}
+    :param pattern: The anchored path regex, with one named group per path parameter
+    :return: The unanchored pattern, with the named groups made non-capturing
+    """
 
-        return subtree.traverse(next_path)
+    return _NAMED_GROUP.sub("(?:", pattern.removeprefix("^").removesuffix("$"))
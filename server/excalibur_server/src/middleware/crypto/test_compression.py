@@ -0,0 +1,43 @@
+import pytest
+
+from .compression import SUPPORTED_ENCODINGS, compress, decompress, is_compressible, negotiate_encoding
+
+DATA = b'{"name": "file", "type": "file", "size": 0}' * 100
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, None),
+        ("", None),
+        ("gzip", None),
+        ("deflate", "deflate"),
+        ("gzip, DEFLATE;q=0.5", "deflate"),
+        ("deflate;q=0", None),
+        ("*", SUPPORTED_ENCODINGS[0]),
+        ("*, deflate;q=0", "zstd" if "zstd" in SUPPORTED_ENCODINGS else None),
+    ],
+)
+def test_negotiate_encoding(header: str | None, expected: str | None):
+    assert negotiate_encoding(header) == expected
+
+
+def test_is_compressible():
+    assert is_compressible("application/json")
+    assert is_compressible("text/plain; charset=utf-8")
+    assert not is_compressible("application/octet-stream")
+    assert not is_compressible(None)
+
+
+@pytest.mark.parametrize("encoding", SUPPORTED_ENCODINGS)
+def test_round_trip(encoding: str):
+    compressed = compress(DATA, encoding)
+    assert len(compressed) < len(DATA)
+    assert decompress(compressed, encoding) == DATA
+
+
+def test_unsupported():
+    with pytest.raises(ValueError, match="Unsupported encoding"):
+        compress(DATA, "br")
+    with pytest.raises(ValueError, match="Unsupported encoding"):
+        decompress(DATA, "br")
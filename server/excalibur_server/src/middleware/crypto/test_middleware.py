@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from excalibur_server.api.cache import MASTER_KEYS_CACHE
+from excalibur_server.src.auth.credentials import generate_auth_token
+from excalibur_server.src.exef import ExEF
+
+from .middleware import EncryptionHandler
+from .offload import CryptoOffloader
+from .structures import EncryptedRoute
+
+KEY = b"one demo 16B key"
+DATA = bytes(range(256)) * 400  # 102400 bytes
+
+
+def _run_request(
+    encrypted: bytes, chunk_size: int, offloader: CryptoOffloader | None = None
+) -> tuple[list[dict], dict]:
+    """
+    Sends the encrypted body through the handler in chunks, returning what the app received.
+    """
+
+    MASTER_KEYS_CACHE["middleware-uuid"] = KEY
+    token = generate_auth_token("test-user", "middleware-uuid", datetime.now(tz=timezone.utc).timestamp() + 9999)
+
+    incoming = [
+        {
+            "type": "http.request",
+            "body": encrypted[i : i + chunk_size],
+            "more_body": i + chunk_size < len(encrypted),
+        }
+        for i in range(0, len(encrypted), chunk_size)
+    ]
+    received = []
+    seen_headers = {}
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        pass
+
+    async def app(scope, receive, send):
+        seen_headers.update({k.decode(): v.decode() for k, v in scope["headers"]})
+        while True:
+            message = await receive()
+            received.append(message)
+            if not message.get("more_body", False):
+                break
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "headers": [
+            (b"authorization", f"Bearer {token}".encode()),
+            (b"content-length", str(len(encrypted)).encode()),
+            (b"x-encrypted", b"true"),
+        ],
+    }
+    handler = EncryptionHandler(
+        app,
+        EncryptedRoute(encrypted_response=False),
+        encrypt_response=False,
+        offloader=offloader or CryptoOffloader(0, 0),
+    )
+    asyncio.run(handler(scope, receive, send))
+    return received, seen_headers
+
+
+@pytest.mark.parametrize("chunk_size", [10, 4096, 65536, 1_000_000])
+def test_streamed_decryption(chunk_size: int):
+    encrypted = ExEF(KEY).encrypt(DATA)
+    received, headers = _run_request(encrypted, chunk_size)
+
+    # Content-Length is set once, for the whole plaintext
+    assert headers["content-length"] == str(len(DATA))
+
+    # Every chunk is passed through as it arrives, and only the last one ends the body
+    assert b"".join(message["body"] for message in received) == DATA
+    assert all(message["more_body"] for message in received[:-1])
+    assert not received[-1]["more_body"]
+    assert max(len(message["body"]) for message in received) <= chunk_size
+
+
+def test_offloaded_decryption():
+    # Every chunk goes through the thread pool, yet the plaintext must come out in order
+    offloader = CryptoOffloader(4, 1)
+    encrypted = ExEF(KEY).encrypt(DATA)
+    received, _ = _run_request(encrypted, 1000, offloader)
+    offloader.shutdown()
+
+    assert b"".join(message["body"] for message in received) == DATA
+
+
+def test_tampered_tag():
+    encrypted = bytearray(ExEF(KEY).encrypt(DATA))
+    encrypted[-1] ^= 0x01
+
+    with pytest.raises(HTTPException, match="Invalid encrypted body"):
+        _run_request(bytes(encrypted), 4096)
+
+
+def test_truncated():
+    encrypted = ExEF(KEY).encrypt(DATA)
+
+    with pytest.raises(HTTPException, match="Invalid encrypted body"):
+        _run_request(encrypted[:-5], 4096)
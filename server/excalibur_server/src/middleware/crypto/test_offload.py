@@ -0,0 +1,32 @@
+import asyncio
+import threading
+
+from .offload import CryptoOffloader
+
+
+def _thread_name() -> str:
+    return threading.current_thread().name
+
+
+def test_small_chunks_inline():
+    offloader = CryptoOffloader(2, 100)
+    assert asyncio.run(offloader.run(99, _thread_name)) == threading.current_thread().name
+    assert offloader._executor is None  # Never created
+
+
+def test_large_chunks_offloaded():
+    offloader = CryptoOffloader(2, 100)
+    assert asyncio.run(offloader.run(100, _thread_name)).startswith("excalibur-crypto")
+    offloader.shutdown()
+
+
+def test_disabled():
+    offloader = CryptoOffloader(0, 0)
+    assert not offloader.enabled
+    assert asyncio.run(offloader.run(10**9, _thread_name)) == threading.current_thread().name
+
+
+def test_arguments():
+    offloader = CryptoOffloader(1, 0)
+    assert asyncio.run(offloader.run(1, pow, 2, 10)) == 1024
+    offloader.shutdown()
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, FastAPI
+
+from .routing import compile_routes, encrypted_route
+
+
+def _make_app() -> FastAPI:
+    router = APIRouter()
+
+    @router.get("/plain")
+    def plain(): ...
+
+    @router.post("/items/{path:path}")
+    @encrypted_route()
+    def upload(path: str): ...
+
+    @router.get("/items/{path:path}")
+    @encrypted_route(encrypted_body=False, excluded_statuses=[404])
+    def download(path: str): ...
+
+    @router.get("/users/{username}")
+    @encrypted_route()
+    def user(username: str): ...
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return app
+
+
+def test_lookup():
+    table = compile_routes(_make_app().routes)
+    assert len(table) == 3
+
+    route = table.lookup("GET", "/api/items/some/deep/file.txt")
+    assert route is not None
+    assert not route.encrypted_body
+    assert route.excluded_statuses == [404]
+
+    assert table.lookup("POST", "/api/items/some/deep/file.txt").encrypted_body
+    assert table.lookup("GET", "/api/users/alice") is not None
+
+
+def test_no_match():
+    table = compile_routes(_make_app().routes)
+
+    assert table.lookup("GET", "/api/plain") is None
+    assert table.lookup("DELETE", "/api/items/file.txt") is None
+    assert table.lookup("GET", "/api/users/alice/extra") is None
+    assert table.lookup("GET", "/api/itemsx/file.txt") is None
+    assert table.lookup("GET", "/other/api/users/alice") is None
+
+
+def test_app_routes():
+    from excalibur_server.api.app import app
+
+    table = compile_routes(app.routes)
+    assert table.lookup("GET", "/api/files/list/.") is not None
+    assert table.lookup("POST", "/api/files/upload/some/file.exef") is not None
+    assert table.lookup("POST", "/api/files/mkdir/dir") is not None
+    assert table.lookup("GET", "/api/files/download/some/file.exef") is not None
+    assert table.lookup("GET", "/api/users/vault/test-user") is not None
+    assert table.lookup("POST", "/api/auth/pop-demo/encrypted") is not None
+    assert not table.lookup("GET", "/api/auth/pop-demo/stream").encrypted_body
+
+    assert table.lookup("HEAD", "/api/files/check/path/some/file.exef") is None
+    assert table.lookup("GET", "/api/users/security/test-user") is None
@@ -0,0 +1,66 @@
+from excalibur_server.consts import ROOT_FOLDER
+from excalibur_server.src.config.security import Security
+
+from .base import SessionStore
+from .memory import MemorySessionStore
+from .persistence import SessionPersister
+from .sealing import SessionSealer
+from .sqlite import SQLiteSessionStore
+
+
+def open_session_store(security: Security) -> SessionStore:
+    """
+    Opens the session store selected in the security configuration.
+
+    :param security: The security configuration
+    :return: The session store
+    """
+
+    if security.sessions.store == "sqlite":
+        return SQLiteSessionStore(
+            file=ROOT_FOLDER / security.sessions.file,
+            session_duration=security.session_duration,
+            validity=security.pop.timestamp_validity,
+            max_nonces=security.pop.nonce_cache_size,
+        )
+
+    return MemorySessionStore(
+        max_sessions=security.e2ee.comm_cache_size,
+        session_duration=security.session_duration,
+        validity=security.pop.timestamp_validity,
+        max_nonces=security.pop.nonce_cache_size,
+        compact_nonces=security.pop.compact_nonces,
+    )
+
+
+def open_session_persister(security: Security, store: SessionStore) -> SessionPersister | None:
+    """
+    Sets up the persistence of the session store, if enabled, restoring the sessions of the last run.
+
+    :param security: The security configuration
+    :param store: The session store
+    :return: The persister, or None if the sessions need not be persisted
+    """
+
+    if not security.sessions.persist or not isinstance(store, MemorySessionStore):
+        return None
+
+    persister = SessionPersister(
+        store,
+        file=ROOT_FOLDER / security.sessions.persist_file,
+        key_file=ROOT_FOLDER / security.sessions.persist_key_file,
+        interval=security.sessions.persist_interval,
+    )
+    persister.load()
+    return persister
+
+
+__all__ = [
+    "MemorySessionStore",
+    "SQLiteSessionStore",
+    "SessionPersister",
+    "SessionSealer",
+    "SessionStore",
+    "open_session_persister",
+    "open_session_store",
+]
@@ -0,0 +1,74 @@
+from abc import ABC, abstractmethod
+from typing import MutableMapping
+
+
+class SessionStore(ABC):
+    """
+    Store of the state that authenticated requests rely on: the master keys of login sessions, the
+    nonces of recent Proofs of Possession (PoPs), the sessions that were ended early, and server
+    secrets such as the token signing key.
+
+    Requests can only be served by any worker process if all of them share the same store. A shared
+    store may raise `TimeoutError` from any of its methods if it is too busy to answer in time.
+    """
+
+    @property
+    @abstractmethod
+    def master_keys(self) -> MutableMapping[str, bytes]:
+        """
+        The master keys of the live sessions, by session UUID.
+
+        Sessions are forgotten once they have lasted for the session duration.
+        """
+
+    @abstractmethod
+    def add_nonce(self, nonce: bytes, timestamp: int, now: float | None = None) -> bool:
+        """
+        Records a PoP nonce, if it has not been seen before.
+
+        :param nonce: The nonce
+        :param timestamp: The timestamp of the request that the nonce came with
+        :param now: The current time. If not provided, the system time is used
+        :raises OverflowError: If the nonce is new but the store is full, or too busy to record it
+        :return: True if the nonce is new and False if it is a replay
+        """
+
+    @abstractmethod
+    def secret(self, name: str, size: int) -> bytes:
+        """
+        Gets a random server secret, generating it on first use.
+
+        Every worker sharing the store gets the same secret.
+
+        :param name: The name of the secret
+        :param size: The size of the secret, in bytes
+        :return: The secret
+        """
+
+    @abstractmethod
+    def discard_secret(self, name: str):
+        """
+        Deletes a server secret, if it exists.
+
+        :param name: The name of the secret
+        """
+
+    @abstractmethod
+    def revoke(self, comm_uuid: str):
+        """
+        Ends a session before it expires.
+
+        The master key of the session is forgotten, and the session UUID is remembered for the
+        session duration so that tokens carrying a sealed copy of the key are refused too.
+
+        :param comm_uuid: The UUID of the session
+        """
+
+    @abstractmethod
+    def is_revoked(self, comm_uuid: str) -> bool:
+        """
+        Checks whether a session was ended early.
+
+        :param comm_uuid: The UUID of the session
+        :return: True if the session was revoked and False otherwise
+        """
@@ -0,0 +1,13 @@
+import os
+from pathlib import Path
+
+
+def restrict_permissions(file: Path):
+    """
+    Makes the file only readable and writable by its owner, where the platform supports it.
+
+    :param file: The file
+    """
+
+    if os.name == "posix":
+        os.chmod(file, 0o600)
@@ -0,0 +1,97 @@
+import time
+from typing import MutableMapping
+
+from cachetools import TTLCache
+from Crypto.Random import get_random_bytes
+
+from excalibur_server.src.auth.nonces import NonceStore
+
+from .base import SessionStore
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Session store that keeps everything in the memory of the current process.
+
+    This is the fastest store, but it cannot be shared, so the server must run as a single process.
+    """
+
+    def __init__(
+        self, max_sessions: int, session_duration: int, validity: int, max_nonces: int, compact_nonces: bool = False
+    ):
+        """
+        Initializes the store.
+
+        :param max_sessions: The most sessions to hold at once
+        :param session_duration: How long a session lasts, in seconds
+        :param validity: How long a PoP timestamp is accepted for, in seconds
+        :param max_nonces: The most PoP nonces to hold at once
+        :param compact_nonces: Whether to keep fingerprints of the nonces instead of the nonces
+        """
+
+        self._master_keys: MutableMapping[str, bytes] = TTLCache(maxsize=max_sessions, ttl=session_duration)
+        self._nonces = NonceStore(validity=validity, max_nonces=max_nonces, compact=compact_nonces)
+        self._secrets: dict[str, bytes] = {}
+        self._revoked: dict[str, float] = {}  # Session UUID to the time the revocation can be forgotten
+        self._session_duration = session_duration
+
+    @property
+    def master_keys(self) -> MutableMapping[str, bytes]:
+        return self._master_keys
+
+    def add_nonce(self, nonce: bytes, timestamp: int, now: float | None = None) -> bool:
+        return self._nonces.add(nonce, timestamp, now)
+
+    def secret(self, name: str, size: int) -> bytes:
+        if name not in self._secrets:
+            self._secrets[name] = get_random_bytes(size)
+        return self._secrets[name]
+
+    def discard_secret(self, name: str):
+        self._secrets.pop(name, None)
+
+    def revoke(self, comm_uuid: str):
+        now = time.time()
+        for expired in [uuid for uuid, expiry in self._revoked.items() if expiry <= now]:
+            del self._revoked[expired]
+
+        self._master_keys.pop(comm_uuid, None)
+        self._revoked[comm_uuid] = now + self._session_duration
+
+    def is_revoked(self, comm_uuid: str) -> bool:
+        expiry = self._revoked.get(comm_uuid)
+        return expiry is not None and expiry > time.time()
+
+    def dump(self) -> dict:
+        """
+        Gets the state that is worth keeping across restarts: the live sessions, the secrets, and the
+        revoked sessions.
+
+        :return: The state, which `restore` accepts
+        """
+
+        now = time.time()
+        self._master_keys.expire()
+        return {
+            "sessions": dict(self._master_keys.items()),
+            "secrets": dict(self._secrets),
+            "revoked": {comm_uuid: expiry for comm_uuid, expiry in self._revoked.items() if expiry > now},
+        }
+
+    def restore(self, state: dict, now: float | None = None):
+        """
+        Restores the state from a previous run.
+
+        Restored sessions last for another full session duration, but their tokens still expire on
+        time. PoP nonces are not kept, so PoPs made before now are refused instead.
+
+        :param state: The state, as given by `dump`
+        :param now: The current time. If not provided, the system time is used
+        """
+
+        now = time.time() if now is None else now
+        for comm_uuid, master_key in state["sessions"].items():
+            self._master_keys[comm_uuid] = master_key
+        self._secrets.update(state["secrets"])
+        self._revoked.update({comm_uuid: expiry for comm_uuid, expiry in state["revoked"].items() if expiry > now})
+        self._nonces.refuse_before(int(now) + 1)
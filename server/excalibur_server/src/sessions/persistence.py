@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from base64 import b64decode, b64encode
+from pathlib import Path
+
+from Crypto.Random import get_random_bytes
+
+from excalibur_server.src.exef import ExEF
+
+from .files import restrict_permissions
+from .memory import MemorySessionStore
+
+PERSISTENCE_KEY_SIZE = 32  # Bytes
+SNAPSHOT_VERSION = 1
+
+
+class SessionPersister:
+    """
+    Keeps the sessions of an in-memory store in a sealed file, so that clients need not log in again
+    after the server restarts.
+
+    The file is encrypted with ExEF under a key that is kept in a separate file, which can be placed
+    somewhere other than the snapshot (e.g., a secrets mount). The snapshot is saved periodically
+    and on shutdown; sessions created since the last save are lost if the server crashes.
+    """
+
+    def __init__(self, store: MemorySessionStore, file: Path, key_file: Path, interval: int):
+        """
+        Initializes the persister.
+
+        :param store: The session store
+        :param file: The sealed snapshot file
+        :param key_file: The file holding the key of the snapshot, which is created if needed
+        :param interval: How often to save the snapshot, in seconds
+        """
+
+        self.store = store
+        self.file = file
+        self.key_file = key_file
+        self.interval = interval
+
+        self._key: bytes | None = None
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    # Properties
+    @property
+    def key(self) -> bytes:
+        """
+        The key of the snapshot, which is generated on first use.
+        """
+
+        if self._key is None:
+            if self.key_file.is_file():
+                self._key = self.key_file.read_bytes()
+            else:
+                self.key_file.parent.mkdir(parents=True, exist_ok=True)
+                self.key_file.touch()
+                restrict_permissions(self.key_file)
+                self._key = get_random_bytes(PERSISTENCE_KEY_SIZE)
+                self.key_file.write_bytes(self._key)
+        return self._key
+
+    # Public methods
+    def save(self):
+        """
+        Saves the sessions to the snapshot file.
+
+        The file is replaced atomically, so a crash while saving leaves the previous snapshot intact.
+        The store is not thread-safe, so while `run` is active this should be called from its event
+        loop; use `save_soon` elsewhere.
+        """
+
+        with self._lock:
+            state = self.store.dump()
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "sessions": {uuid: b64encode(key).decode("UTF-8") for uuid, key in state["sessions"].items()},
+                "secrets": {name: b64encode(value).decode("UTF-8") for name, value in state["secrets"].items()},
+                "revoked": state["revoked"],
+            }
+            sealed = ExEF(self.key, get_random_bytes(12)).encrypt(json.dumps(snapshot).encode("UTF-8"))
+
+            # `mkstemp` creates the file readable only by its owner
+            self.file.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=self.file.parent, prefix=self.file.name + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as temp_file:
+                    temp_file.write(sealed)
+                os.replace(temp_name, self.file)
+            except BaseException:
+                os.unlink(temp_name)
+                raise
+
+    def save_soon(self):
+        """
+        Saves the sessions from any thread.
+
+        If `run` is active on another thread's event loop, the save is scheduled on that loop, so that
+        the store is not read while the loop changes it. Otherwise, the sessions are saved now.
+        """
+
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self.save()
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.save()
+        else:
+            loop.call_soon_threadsafe(self.save)
+
+    def load(self, now: float | None = None) -> bool:
+        """
+        Restores the sessions from the snapshot file, if there is one.
+
+        :param now: The current time. If not provided, the system time is used
+        :return: True if the sessions were restored and False if there is no usable snapshot (e.g.,
+            it is missing, or was sealed with another key)
+        """
+
+        if not self.file.is_file():
+            return False
+
+        try:
+            snapshot = json.loads(ExEF(self.key).decrypt(self.file.read_bytes()))
+        except ValueError:
+            return False
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return False
+
+        self.store.restore(
+            {
+                "sessions": {uuid: b64decode(key) for uuid, key in snapshot["sessions"].items()},
+                "secrets": {name: b64decode(value) for name, value in snapshot["secrets"].items()},
+                "revoked": snapshot["revoked"],
+            },
+            now=now,
+        )
+        return True
+
+    async def run(self):
+        """
+        Saves the snapshot every interval, until cancelled.
+        """
+
+        self._loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                self.save()
+        finally:
+            self._loop = None
@@ -0,0 +1,151 @@
+import binascii
+import math
+import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+from .base import SessionStore
+
+SEALING_KEY_SIZE = 32  # Bytes
+SEALING_KEY_PREFIX = "sealing_key/"
+
+_EPOCH_SIZE = 4
+_NONCE_SIZE = 12
+_TAG_SIZE = 16
+_HEADER_SIZE = _EPOCH_SIZE + _NONCE_SIZE
+
+
+class SessionSealer:
+    """
+    Seals the master keys of sessions with AES-GCM, so that they can be carried inside auth tokens
+    instead of being kept by the server.
+
+    The wrapping key is rotated every rotation interval (an "epoch"). The keys are server secrets in
+    the session store, so every worker sharing the store can unseal what any other sealed. A sealed
+    key names the epoch it was sealed in, and is accepted until its token can no longer be valid;
+    after that, the wrapping key of the epoch is discarded.
+    """
+
+    def __init__(self, store: SessionStore, rotation_interval: int, max_age: int, key_prefix: str = SEALING_KEY_PREFIX):
+        """
+        Initializes the sealer.
+
+        :param store: The session store that holds the wrapping keys
+        :param rotation_interval: How long each wrapping key is used for, in seconds
+        :param max_age: How long a sealed key is accepted for, in seconds (i.e., the session duration)
+        :param key_prefix: The prefix of the names of the wrapping keys in the store, so that sealers
+            for different purposes keep separate keys
+        """
+
+        self.store = store
+        self.rotation_interval = rotation_interval
+        self.max_age = max_age
+        self.key_prefix = key_prefix
+
+        self._keys: dict[int, bytes] = {}
+        self._latest_epoch = -1
+
+    # Properties
+    @property
+    def retained_epochs(self) -> int:
+        """
+        The number of past epochs whose wrapping keys are still accepted.
+        """
+
+        return math.ceil(self.max_age / self.rotation_interval)
+
+    # Helper methods
+    def _epoch(self, now: float | None) -> int:
+        return int((time.time() if now is None else now) // self.rotation_interval)
+
+    def _key(self, epoch: int) -> bytes:
+        """
+        Gets the wrapping key of an epoch.
+
+        :param epoch: The epoch
+        :return: The wrapping key
+        """
+
+        key = self._keys.get(epoch)
+        if key is None:
+            key = self.store.secret(f"{self.key_prefix}{epoch}", SEALING_KEY_SIZE)
+            self._keys[epoch] = key
+        return key
+
+    def _rotate(self, epoch: int):
+        """
+        Moves on to a new epoch, discarding the wrapping keys that are no longer accepted.
+
+        Keys are also discarded for as many epochs again before those, in case the server was down
+        when they should have been.
+
+        :param epoch: The new epoch
+        """
+
+        self._latest_epoch = epoch
+        oldest = epoch - self.retained_epochs
+        for old_epoch in range(oldest - self.retained_epochs - 1, oldest):
+            self._keys.pop(old_epoch, None)
+            self.store.discard_secret(f"{self.key_prefix}{old_epoch}")
+
+    @staticmethod
+    def _associated_data(username: str, comm_uuid: str) -> bytes:
+        return f"{username}\x00{comm_uuid}".encode("UTF-8")
+
+    # Public methods
+    def seal(self, master_key: bytes, username: str, comm_uuid: str, now: float | None = None) -> str:
+        """
+        Seals the master key of a session.
+
+        The sealed key is bound to the username and session UUID, so it cannot be moved into a token
+        for another session.
+
+        :param master_key: The master key
+        :param username: The user of the session
+        :param comm_uuid: The UUID of the session
+        :param now: The current time. If not provided, the system time is used
+        :return: The sealed key, encoded in URL-safe base64
+        """
+
+        epoch = self._epoch(now)
+        if epoch > self._latest_epoch:
+            self._rotate(epoch)
+
+        cipher = AES.new(self._key(epoch), AES.MODE_GCM, nonce=get_random_bytes(_NONCE_SIZE))
+        cipher.update(self._associated_data(username, comm_uuid))
+        ciphertext, tag = cipher.encrypt_and_digest(master_key)
+
+        sealed = epoch.to_bytes(_EPOCH_SIZE, "big") + cipher.nonce + ciphertext + tag
+        return urlsafe_b64encode(sealed).decode("UTF-8").rstrip("=")
+
+    def unseal(self, sealed: str, username: str, comm_uuid: str, now: float | None = None) -> bytes | None:
+        """
+        Recovers the master key of a session.
+
+        :param sealed: The sealed key
+        :param username: The user of the session
+        :param comm_uuid: The UUID of the session
+        :param now: The current time. If not provided, the system time is used
+        :return: The master key, or None if the sealed key is invalid, tampered with, or too old
+        """
+
+        try:
+            data = urlsafe_b64decode(sealed + "=" * (-len(sealed) % 4))
+        except (binascii.Error, ValueError):
+            return None
+        if len(data) <= _HEADER_SIZE + _TAG_SIZE:
+            return None
+
+        epoch = int.from_bytes(data[:_EPOCH_SIZE], "big")
+        current_epoch = self._epoch(now)
+        if not current_epoch - self.retained_epochs <= epoch <= current_epoch:
+            return None
+
+        cipher = AES.new(self._key(epoch), AES.MODE_GCM, nonce=data[_EPOCH_SIZE:_HEADER_SIZE])
+        cipher.update(self._associated_data(username, comm_uuid))
+        try:
+            return cipher.decrypt_and_verify(data[_HEADER_SIZE:-_TAG_SIZE], data[-_TAG_SIZE:])
+        except ValueError:
+            return None
@@ -0,0 +1,202 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, MutableMapping
+
+from Crypto.Random import get_random_bytes
+
+from .base import SessionStore
+from .files import restrict_permissions
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (uuid TEXT PRIMARY KEY, key BLOB NOT NULL, expiry REAL NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS nonces (
+    timestamp INTEGER NOT NULL, nonce BLOB NOT NULL, PRIMARY KEY (timestamp, nonce)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS secrets (name TEXT PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS revoked (uuid TEXT PRIMARY KEY, expiry REAL NOT NULL) WITHOUT ROWID;
+"""
+
+# How long to wait for another process to release the database, in seconds. The store is used from
+# the event loop, so this stalls every request; statements are short single-statement transactions
+# (and readers do not wait for writers in WAL mode), so a held lock is normally gone well within it.
+BUSY_TIMEOUT = 0.05
+
+
+class _SQLiteMasterKeys(MutableMapping[str, bytes]):
+    """
+    Mapping view of the sessions table.
+    """
+
+    def __init__(self, store: "SQLiteSessionStore"):
+        self._store = store
+
+    def __getitem__(self, comm_uuid: str) -> bytes:
+        row = self._store._execute(
+            "SELECT key FROM sessions WHERE uuid = ? AND expiry > ?", (comm_uuid, time.time())
+        ).fetchone()
+        if row is None:
+            raise KeyError(comm_uuid)
+        return row[0]
+
+    def __setitem__(self, comm_uuid: str, key: bytes):
+        self._store._execute(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+            (comm_uuid, key, time.time() + self._store.session_duration),
+        )
+
+    def __delitem__(self, comm_uuid: str):
+        if self._store._execute("DELETE FROM sessions WHERE uuid = ?", (comm_uuid,)).rowcount == 0:
+            raise KeyError(comm_uuid)
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._store._execute("SELECT uuid FROM sessions WHERE expiry > ?", (time.time(),)).fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self) -> int:
+        return self._store._execute("SELECT COUNT(*) FROM sessions WHERE expiry > ?", (time.time(),)).fetchone()[0]
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store kept in a local SQLite database, which all worker processes on the host share.
+
+    Writes are atomic across processes, so a nonce can only ever be recorded once, whichever worker
+    receives it. Expired sessions, nonces and revocations are purged at most once a second. Waits for
+    the other processes are capped at `BUSY_TIMEOUT`, after which `TimeoutError` is raised.
+
+    The database holds the session keys in the clear, so it is only readable by the owner.
+    """
+
+    def __init__(self, file: Path, session_duration: int, validity: int, max_nonces: int):
+        """
+        Initializes the store, creating the database if needed.
+
+        :param file: The database file
+        :param session_duration: How long a session lasts, in seconds
+        :param validity: How long a PoP timestamp is accepted for, in seconds
+        :param max_nonces: The most PoP nonces to hold at once. This is checked against the count at
+            the last purge plus the nonces this process has added since, so the store can briefly
+            exceed it by up to a second's worth of nonces from the other processes
+        """
+
+        self.file = file
+        self.session_duration = session_duration
+        self.validity = validity
+        self.max_nonces = max_nonces
+
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.touch(exist_ok=True)
+        restrict_permissions(file)  # SQLite gives its journal files the same permissions
+
+        # The app is served from one thread, but tests and thread pools may call from others
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(file, isolation_level=None, check_same_thread=False, timeout=BUSY_TIMEOUT)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+        self._master_keys = _SQLiteMasterKeys(self)
+        self._last_purge = 0
+        self._nonce_count = 0
+
+    # Helper methods
+    def _execute(self, sql: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        """
+        Executes a single statement, in its own transaction.
+
+        :param sql: The SQL statement
+        :param parameters: The parameters of the statement
+        :raises TimeoutError: If the database stays locked by another process for `BUSY_TIMEOUT`
+        :return: The cursor
+        """
+
+        try:
+            with self._lock:
+                return self._connection.execute(sql, parameters)
+        except sqlite3.OperationalError as e:
+            if e.sqlite_errorcode & 0xFF not in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED):
+                raise
+            raise TimeoutError("session store is busy") from e
+
+    def _purge(self, now: int):
+        """
+        Deletes the expired sessions, nonces and revocations, if this has not been done in the current second.
+
+        :param now: The current timestamp
+        """
+
+        if now == self._last_purge:
+            return
+
+        self._last_purge = now
+        self._execute("DELETE FROM sessions WHERE expiry <= ?", (now,))
+        self._execute("DELETE FROM nonces WHERE timestamp < ?", (now - self.validity,))
+        self._execute("DELETE FROM revoked WHERE expiry <= ?", (now,))
+        self._nonce_count = self._execute("SELECT COUNT(*) FROM nonces").fetchone()[0]
+
+    def _add_nonce(self, nonce: bytes, timestamp: int, now: int) -> bool:
+        """
+        Records a nonce, as in `add_nonce`.
+
+        :param nonce: The nonce
+        :param timestamp: The timestamp given with the nonce
+        :param now: The current timestamp
+        :raises OverflowError: if the nonce is new but the store is full
+        :raises TimeoutError: if the database stays locked by another process
+        :return: True if the nonce is new and False if it is a replay
+        """
+
+        self._purge(now)
+        if timestamp < now - self.validity:
+            return False
+
+        if self._nonce_count >= self.max_nonces:
+            seen = self._execute(
+                "SELECT 1 FROM nonces WHERE timestamp = ? AND nonce = ?", (timestamp, nonce)
+            ).fetchone()
+            if seen is not None:
+                return False
+            raise OverflowError("nonce store is full")
+
+        if self._execute("INSERT OR IGNORE INTO nonces VALUES (?, ?)", (timestamp, nonce)).rowcount == 0:
+            return False
+
+        self._nonce_count += 1
+        return True
+
+    # Public methods
+    @property
+    def master_keys(self) -> MutableMapping[str, bytes]:
+        return self._master_keys
+
+    def add_nonce(self, nonce: bytes, timestamp: int, now: float | None = None) -> bool:
+        try:
+            return self._add_nonce(nonce, timestamp, int(time.time() if now is None else now))
+        except TimeoutError as e:
+            # Busy with another process; the request can be retried like when the store is full
+            raise OverflowError("nonce store is busy") from e
+
+    def secret(self, name: str, size: int) -> bytes:
+        self._execute("INSERT OR IGNORE INTO secrets VALUES (?, ?)", (name, get_random_bytes(size)))
+        return self._execute("SELECT value FROM secrets WHERE name = ?", (name,)).fetchone()[0]
+
+    def discard_secret(self, name: str):
+        self._execute("DELETE FROM secrets WHERE name = ?", (name,))
+
+    def revoke(self, comm_uuid: str):
+        self._execute("DELETE FROM sessions WHERE uuid = ?", (comm_uuid,))
+        self._execute("INSERT OR REPLACE INTO revoked VALUES (?, ?)", (comm_uuid, time.time() + self.session_duration))
+
+    def is_revoked(self, comm_uuid: str) -> bool:
+        row = self._execute("SELECT 1 FROM revoked WHERE uuid = ? AND expiry > ?", (comm_uuid, time.time())).fetchone()
+        return row is not None
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from .memory import MemorySessionStore
+from .persistence import SessionPersister
+
+
+def _store() -> MemorySessionStore:
+    return MemorySessionStore(max_sessions=16, session_duration=60, validity=60, max_nonces=16)
+
+
+def _persister(store: MemorySessionStore, folder: Path) -> SessionPersister:
+    return SessionPersister(store, folder / "sessions.sealed", folder / "sessions.key", interval=60)
+
+
+@pytest.fixture
+def saved(tmp_path: Path) -> MemorySessionStore:
+    store = _store()
+    store.master_keys["one"] = b"key one"
+    store.secret("token_key", 32)
+    store.revoke("revoked")
+    _persister(store, tmp_path).save()
+    return store
+
+
+def test_restore(tmp_path: Path, saved: MemorySessionStore):
+    store = _store()
+    assert _persister(store, tmp_path).load()
+
+    assert store.master_keys["one"] == b"key one"
+    assert store.secret("token_key", 32) == saved.secret("token_key", 32)
+    assert store.is_revoked("revoked")
+
+
+def test_sealed(tmp_path: Path, saved: MemorySessionStore):
+    assert b"key one" not in (tmp_path / "sessions.sealed").read_bytes()
+    assert (tmp_path / "sessions.sealed").stat().st_mode & 0o077 == 0
+    assert (tmp_path / "sessions.key").stat().st_mode & 0o077 == 0
+
+
+def test_old_pops_refused(tmp_path: Path, saved: MemorySessionStore):
+    # The nonces seen before the restart are unknown, so earlier PoPs could be replays
+    now = time.time()
+    store = _store()
+    _persister(store, tmp_path).load(now=now)
+    assert not store.add_nonce(b"nonce", int(now), now=now)
+    assert store.add_nonce(b"nonce", int(now) + 1, now=now)
+
+
+def test_missing_snapshot(tmp_path: Path):
+    assert not _persister(_store(), tmp_path).load()
+
+
+def test_wrong_key(tmp_path: Path, saved: MemorySessionStore):
+    (tmp_path / "sessions.key").write_bytes(b"k" * 32)
+
+    store = _store()
+    assert not _persister(store, tmp_path).load()
+    assert "one" not in store.master_keys
+
+
+def test_concurrent_saves(tmp_path: Path, saved: MemorySessionStore):
+    persister = _persister(saved, tmp_path)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: persister.save(), range(16)))
+
+    assert [file.name for file in tmp_path.iterdir() if file.suffix == ".tmp"] == []
+    store = _store()
+    assert _persister(store, tmp_path).load()
+    assert store.master_keys["one"] == b"key one"
+
+
+def test_save_soon_uses_loop(tmp_path: Path):
+    # While running, saves asked for from other threads happen on the loop that owns the store
+    persister = _persister(_store(), tmp_path)
+    save_threads = []
+    save = persister.save
+    persister.save = lambda: save_threads.append(threading.current_thread()) or save()
+
+    async def main():
+        task = asyncio.create_task(persister.run())
+        await asyncio.sleep(0)
+        await asyncio.to_thread(persister.save_soon)
+        await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(main())
+    assert save_threads == [threading.current_thread()]
+    assert (tmp_path / "sessions.sealed").is_file()
+
+    # Without a running loop, the sessions are saved at once
+    persister.save_soon()
+    assert save_threads == [threading.current_thread()] * 2
@@ -0,0 +1,82 @@
+from .memory import MemorySessionStore
+from .sealing import SEALING_KEY_PREFIX, SessionSealer
+
+KEY = b"some 32-byte session master key!"
+NOW = 1_000_000  # Start of epoch 10_000
+
+
+def _sealer(store: MemorySessionStore | None = None) -> SessionSealer:
+    store = store or MemorySessionStore(max_sessions=16, session_duration=250, validity=60, max_nonces=16)
+    return SessionSealer(store, rotation_interval=100, max_age=250)
+
+
+def test_seal_unseal():
+    sealer = _sealer()
+    sealed = sealer.seal(KEY, "user", "uuid", now=NOW)
+    assert KEY not in sealed.encode("UTF-8")
+    assert sealer.unseal(sealed, "user", "uuid", now=NOW) == KEY
+
+    # Each seal uses a fresh nonce
+    assert sealer.seal(KEY, "user", "uuid", now=NOW) != sealed
+
+
+def test_bound_to_session():
+    sealer = _sealer()
+    sealed = sealer.seal(KEY, "user", "uuid", now=NOW)
+    assert sealer.unseal(sealed, "other-user", "uuid", now=NOW) is None
+    assert sealer.unseal(sealed, "user", "other-uuid", now=NOW) is None
+
+
+def test_invalid():
+    sealer = _sealer()
+    sealed = sealer.seal(KEY, "user", "uuid", now=NOW)
+    tampered = sealed[:-2] + ("AA" if sealed[-2:] != "AA" else "BB")
+
+    assert sealer.unseal(tampered, "user", "uuid", now=NOW) is None
+    assert sealer.unseal("not base64!", "user", "uuid", now=NOW) is None
+    assert sealer.unseal(sealed[:20], "user", "uuid", now=NOW) is None
+
+
+def test_shared_store():
+    store = MemorySessionStore(max_sessions=16, session_duration=250, validity=60, max_nonces=16)
+    sealed = _sealer(store).seal(KEY, "user", "uuid", now=NOW)
+    assert _sealer(store).unseal(sealed, "user", "uuid", now=NOW) == KEY
+
+
+def test_rotation():
+    store = MemorySessionStore(max_sessions=16, session_duration=250, validity=60, max_nonces=16)
+    sealer = _sealer(store)
+    assert sealer.retained_epochs == 3
+
+    old = sealer.seal(KEY, "user", "uuid", now=NOW)
+    new = sealer.seal(KEY, "user", "uuid", now=NOW + 100)
+    assert old[:6] != new[:6]  # Sealed with the keys of different epochs
+
+    # Keys stay accepted for as long as their tokens can be valid
+    assert sealer.unseal(old, "user", "uuid", now=NOW + 399) == KEY
+    assert sealer.unseal(old, "user", "uuid", now=NOW + 400) is None
+    assert sealer.unseal(new, "user", "uuid", now=NOW + 400) == KEY
+
+    # Keys from the future are refused
+    assert sealer.unseal(new, "user", "uuid", now=NOW) is None
+
+    # Wrapping keys are discarded once they are no longer accepted
+    assert f"{SEALING_KEY_PREFIX}10000" in store._secrets
+    sealer.seal(KEY, "user", "uuid", now=NOW + 400)
+    assert f"{SEALING_KEY_PREFIX}10000" not in store._secrets
+    assert f"{SEALING_KEY_PREFIX}10001" in store._secrets
+
+
+def test_key_prefix():
+    store = MemorySessionStore(max_sessions=16, session_duration=250, validity=60, max_nonces=16)
+    sealer = _sealer(store)
+    other_sealer = SessionSealer(store, rotation_interval=100, max_age=250, key_prefix="other_key/")
+
+    # Sealers with different prefixes do not share wrapping keys
+    sealed = sealer.seal(KEY, "user", "uuid", now=NOW)
+    assert other_sealer.unseal(sealed, "user", "uuid", now=NOW) is None
+    assert "other_key/10000" in store._secrets
+
+    # Nor do they discard each other's
+    other_sealer.seal(KEY, "user", "uuid", now=NOW + 400)
+    assert f"{SEALING_KEY_PREFIX}10000" in store._secrets
@@ -0,0 +1,150 @@
+import multiprocessing
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+from .base import SessionStore
+from .memory import MemorySessionStore
+from .sqlite import SQLiteSessionStore
+
+
+def _sqlite_store(file: Path, session_duration: int = 60) -> SQLiteSessionStore:
+    return SQLiteSessionStore(file, session_duration=session_duration, validity=60, max_nonces=3)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request: pytest.FixtureRequest, tmp_path: Path) -> SessionStore:
+    if request.param == "memory":
+        yield MemorySessionStore(max_sessions=16, session_duration=60, validity=60, max_nonces=3)
+        return
+
+    store = _sqlite_store(tmp_path / "sessions.sqlite3")
+    yield store
+    store.close()
+
+
+def test_master_keys(store: SessionStore):
+    keys = store.master_keys
+    keys["one"] = b"key one"
+    keys["two"] = b"key two"
+
+    assert keys["one"] == b"key one"
+    assert "two" in keys
+    assert keys.get("three") is None
+    assert sorted(keys) == ["one", "two"]
+
+    del keys["one"]
+    assert "one" not in keys
+    assert len(keys) == 1
+    with pytest.raises(KeyError):
+        del keys["one"]
+
+
+def test_nonces(store: SessionStore):
+    assert store.add_nonce(b"one", 1000, now=1000)
+    assert not store.add_nonce(b"one", 1000, now=1000)
+    assert store.add_nonce(b"two", 1000, now=1000)
+    assert store.add_nonce(b"three", 1001, now=1001)
+
+    with pytest.raises(OverflowError, match="nonce store is full"):
+        store.add_nonce(b"four", 1001, now=1001)
+    assert not store.add_nonce(b"three", 1001, now=1001)
+
+    # Nonces are forgotten once their timestamps are too old to be accepted
+    assert store.add_nonce(b"four", 1061, now=1061)
+    assert not store.add_nonce(b"one", 1000, now=1061)
+
+
+def test_secret(store: SessionStore):
+    secret = store.secret("some secret", 32)
+    assert len(secret) == 32
+    assert store.secret("some secret", 32) == secret
+    assert store.secret("other secret", 32) != secret
+
+
+def test_discard_secret(store: SessionStore):
+    secret = store.secret("some secret", 32)
+    store.discard_secret("some secret")
+    store.discard_secret("missing secret")
+    assert store.secret("some secret", 32) != secret
+
+
+def test_revoke(store: SessionStore):
+    store.master_keys["one"] = b"key one"
+    assert not store.is_revoked("one")
+
+    store.revoke("one")
+    store.revoke("two")  # Stateless sessions have no stored key
+    assert "one" not in store.master_keys
+    assert store.is_revoked("one")
+    assert store.is_revoked("two")
+    assert not store.is_revoked("three")
+
+
+def test_sqlite_expiry(tmp_path: Path):
+    store = _sqlite_store(tmp_path / "sessions.sqlite3", session_duration=0)
+    store.master_keys["one"] = b"key one"
+    assert "one" not in store.master_keys
+
+    # Revocations are only remembered for as long as tokens can be valid
+    store.revoke("two")
+    assert not store.is_revoked("two")
+    store.close()
+
+
+def test_sqlite_permissions(tmp_path: Path):
+    file = tmp_path / "sessions.sqlite3"
+    _sqlite_store(file).close()
+    assert file.stat().st_mode & 0o077 == 0
+
+
+def test_sqlite_busy(tmp_path: Path):
+    # A lock held by another process must not stall the caller for long
+    file = tmp_path / "sessions.sqlite3"
+    store = _sqlite_store(file)
+    other = sqlite3.connect(file, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    start = time.monotonic()
+    with pytest.raises(OverflowError):
+        store.add_nonce(b"nonce", 1000, now=1000)
+    with pytest.raises(TimeoutError):
+        store.master_keys["session"] = b"key"
+    with pytest.raises(TimeoutError):
+        store.revoke("session")
+    with pytest.raises(TimeoutError):
+        store.secret("token_key", 32)
+    assert time.monotonic() - start < 1
+
+    other.execute("ROLLBACK")
+    other.close()
+    assert store.add_nonce(b"nonce", 1000, now=1000)
+    store.close()
+
+
+def _worker(file: Path, queue: multiprocessing.Queue):
+    store = _sqlite_store(file)
+    store.master_keys["from-worker"] = b"worker key"
+    queue.put((store.secret("token_key", 32), store.add_nonce(b"nonce", 1000, now=1000)))
+    store.close()
+
+
+def test_sqlite_shared_between_processes(tmp_path: Path):
+    file = tmp_path / "sessions.sqlite3"
+    store = _sqlite_store(file)
+    secret = store.secret("token_key", 32)
+
+    queue = multiprocessing.get_context("spawn").Queue()
+    process = multiprocessing.get_context("spawn").Process(target=_worker, args=(file, queue))
+    process.start()
+    worker_secret, worker_fresh = queue.get(timeout=30)
+    process.join(timeout=30)
+
+    # The worker sees the same secret, and its session and nonce are seen here
+    assert worker_secret == secret
+    assert worker_fresh
+    assert store.master_keys["from-worker"] == b"worker key"
+    assert not store.add_nonce(b"nonce", 1000, now=1000)
+    store.close()
@@ -0,0 +1,60 @@
+from uuid import uuid4
+
+import pytest
+from Crypto.Util.number import bytes_to_long
+from sqlalchemy.exc import IntegrityError
+
+from excalibur_server.src.auth.keygen import generate_key
+from excalibur_server.src.auth.srp import SRP, SRPGroup
+from excalibur_server.src.config import CONFIG
+from excalibur_server.src.exef import ExEF
+from excalibur_server.src.users import add_users, create_user, get_existing_usernames, get_user, remove_user
+
+VAULT_KEY = b"some 32-byte vault key for tests"
+
+
+def test_create_user():
+    user = create_user("test-create", "password", VAULT_KEY, SRPGroup.SMALL)
+    assert user.username == "test-create"
+    assert user.srp_group == SRPGroup.SMALL
+
+    # The verifier is that of the SRP key derived from the password
+    srp_key = generate_key("password", {"username": "test-create"}, user.srp_salt)
+    assert bytes_to_long(user.srp_verifier) == SRP(SRPGroup.SMALL).compute_verifier(bytes_to_long(srp_key))
+
+    # The vault key can be recovered with the AUK
+    auk_key = generate_key("password", {"username": "test-create"}, user.auk_salt)
+    assert ExEF(auk_key).decrypt(user.key_enc) == VAULT_KEY
+
+
+def test_add_users():
+    if get_user("test-user") is None:
+        pytest.skip("test-user does not exist")
+
+    usernames = [f"test-import-{uuid4().hex[:8]}" for _ in range(2)]
+    users = [create_user(username, "password", VAULT_KEY, SRPGroup.SMALL) for username in usernames]
+
+    assert get_existing_usernames(usernames) == set()
+    add_users(users)
+    try:
+        assert get_existing_usernames(usernames + ["test-user", "does-not-exist"]) == {*usernames, "test-user"}
+        for username in usernames:
+            assert get_user(username) is not None
+            assert (CONFIG.storage.vault_folder / username).is_dir()
+    finally:
+        for username in usernames:
+            remove_user(username)
+
+
+def test_add_users_failed():
+    if get_user("test-user") is None:
+        pytest.skip("test-user does not exist")
+
+    # The batch clashes with an existing user, so no one is added and no folders are left behind
+    username = f"test-import-{uuid4().hex[:8]}"
+    users = [create_user(name, "password", VAULT_KEY, SRPGroup.SMALL) for name in (username, "test-user")]
+    with pytest.raises(IntegrityError):
+        add_users(users)
+
+    assert get_user(username) is None
+    assert not (CONFIG.storage.vault_folder / username).exists()
@@ -1,3 +1,5 @@
+import pytest
+
 from excalibur_server.src.websocket import WebSocketMsg
 
 
@@ -21,3 +23,28 @@ def test_websocket_msg():
     msg = WebSocketMsg(b"Test", "ERR")
     assert msg.serialize() == {"status": "ERR", "data": "VGVzdA==", "binary": True}
     assert WebSocketMsg(**msg.serialize()) == msg
+
+
+def test_websocket_msg_frame():
+    msg = WebSocketMsg("Test")
+    assert msg.to_frame() == b"\x00\x00Test"
+    assert WebSocketMsg.from_frame(msg.to_frame()) == msg
+
+    msg = WebSocketMsg(b"Test", "OK")
+    assert msg.to_frame() == b"\x01\x01Test"
+    assert WebSocketMsg.from_frame(msg.to_frame()) == msg
+
+    msg = WebSocketMsg("Test", "ERR")
+    assert msg.to_frame() == b"\x00\x02Test"
+    assert WebSocketMsg.from_frame(msg.to_frame()) == msg
+
+    msg = WebSocketMsg(b"", "OK")
+    assert WebSocketMsg.from_frame(msg.to_frame()) == msg
+
+    # Raw bytes are much smaller than base64 in JSON
+    value = bytes(256)
+    assert len(WebSocketMsg(value, "OK").to_frame()) == len(value) + 2
+
+    for frame in (b"", b"\x00", b"\x02\x00Test", b"\x00\x03Test"):
+        with pytest.raises(ValueError):
+            WebSocketMsg.from_frame(frame)
@@ -1,10 +1,19 @@
 import shutil
+from typing import Iterable
 
+from Crypto.Random import get_random_bytes
+from Crypto.Util.number import bytes_to_long, long_to_bytes
+
+from excalibur_server.src.auth.keygen import generate_key
+from excalibur_server.src.auth.srp import SRP, SRPGroup
 from excalibur_server.src.config import CONFIG
 from excalibur_server.src.db.operations import add_user as _add_user
+from excalibur_server.src.db.operations import add_users as _add_users
+from excalibur_server.src.db.operations import get_existing_usernames as _get_existing_usernames
 from excalibur_server.src.db.operations import get_user as _get_user
 from excalibur_server.src.db.operations import remove_user as _remove_user
 from excalibur_server.src.db.tables import User
+from excalibur_server.src.exef.exef import ExEF
 
 
 def is_user(username: str) -> bool:
@@ -34,6 +43,63 @@ def add_user(user: User):
     _add_user(user)
 
 
+def create_user(username: str, password: str, vault_key: bytes, srp_group: SRPGroup) -> User:
+    """
+    Creates the details of a new user from their password, without adding them to the database.
+
+    Derives the Account Unlock Key (AUK) and SRP key from the password (which is slow, by design),
+    then computes the SRP verifier and encrypts the vault key with the AUK.
+
+    :param username: The username
+    :param password: The password
+    :param vault_key: The 32-byte vault key
+    :param srp_group: The SRP group to use for authentication
+    :return: The user
+    """
+
+    # Generate salts and keys
+    auk_salt = get_random_bytes(16)
+    auk_key = generate_key(password, {"username": username}, auk_salt)
+
+    srp_salt = get_random_bytes(16)
+    srp_key = generate_key(password, {"username": username}, srp_salt)
+
+    # Generate SRP verifier
+    verifier = long_to_bytes(SRP(srp_group).compute_verifier(bytes_to_long(srp_key)))
+
+    # Encrypt vault key
+    vault_key_enc = ExEF(auk_key, get_random_bytes(12)).encrypt(vault_key)
+
+    return User(
+        username=username,
+        auk_salt=auk_salt,
+        srp_group=srp_group,
+        srp_salt=srp_salt,
+        srp_verifier=verifier,
+        key_enc=vault_key_enc,
+    )
+
+
+def add_users(users: Iterable[User]):
+    """
+    Adds several users to the database, in a single transaction.
+
+    Assumes that none of the users already exist in the database.
+
+    :param users: The users to add
+    """
+
+    users = list(users)
+    usernames = [user.username for user in users]  # The users cannot be read once they are committed
+
+    # Add users to database
+    _add_users(users)
+
+    # Create new user directories, only once the users exist so that a failed import leaves none behind
+    for username in usernames:
+        (CONFIG.storage.vault_folder / username).mkdir(parents=True, exist_ok=True)
+
+
 def remove_user(username: str):
     """
     Removes a user from the database.
@@ -50,5 +116,15 @@ def remove_user(username: str):
 
 
 get_user = _get_user
-
-__all__ = ["is_user", "add_user", "get_user", "remove_user", "User"]
+get_existing_usernames = _get_existing_usernames
+
+__all__ = [
+    "is_user",
+    "create_user",
+    "add_user",
+    "add_users",
+    "get_user",
+    "get_existing_usernames",
+    "remove_user",
+    "User",
+]
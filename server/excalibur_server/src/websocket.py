@@ -1,9 +1,15 @@
 from base64 import b64decode, b64encode
-from typing import Literal
+from typing import Literal, Self
 
 from fastapi import WebSocket as WebSocket
 from pydantic import BaseModel, model_serializer
 
+BINARY_SUBPROTOCOL = "excalibur.binary"
+
+_TEXT_TYPE, _BINARY_TYPE = 0x00, 0x01
+_STATUS_BYTES: dict[str | None, int] = {None: 0x00, "OK": 0x01, "ERR": 0x02}
+_STATUSES = {value: status for status, value in _STATUS_BYTES.items()}
+
 
 class WebSocketMsg(BaseModel):
     """
@@ -32,10 +38,43 @@ class WebSocketMsg(BaseModel):
 
         return data
 
+    def to_frame(self) -> bytes:
+        """
+        Encodes the message as a binary frame.
+
+        A frame is a type byte (0 for text, 1 for binary data), a status byte (0 for none, 1 for OK
+        and 2 for ERR), then the data as raw bytes (UTF-8 for text).
+
+        :return: the frame
+        """
+
+        if isinstance(self.data, bytes):
+            return bytes((_BINARY_TYPE, _STATUS_BYTES[self.status])) + self.data
+        return bytes((_TEXT_TYPE, _STATUS_BYTES[self.status])) + self.data.encode("utf-8")
+
+    @classmethod
+    def from_frame(cls, frame: bytes) -> Self:
+        """
+        Decodes a message from a binary frame.
+
+        :param frame: the frame
+        :raises ValueError: if the frame is malformed
+        :return: the message
+        """
+
+        if len(frame) < 2 or frame[0] not in (_TEXT_TYPE, _BINARY_TYPE) or frame[1] not in _STATUSES:
+            raise ValueError("malformed WebSocket frame")
+
+        data = frame[2:]
+        return cls(data if frame[0] == _BINARY_TYPE else data.decode("utf-8"), _STATUSES[frame[1]])
+
 
 class WebSocketManager:
     """
     A manager for a WebSocket connection.
+
+    Messages are sent as JSON, unless the client offers the binary subprotocol when connecting, in
+    which case they are sent as binary frames (see `WebSocketMsg.to_frame`).
     """
 
     def __init__(self, ws: WebSocket):
@@ -46,13 +85,15 @@ class WebSocketManager:
         """
 
         self._ws = ws
+        self.binary = False
 
     async def accept(self):
         """
-        Accept the WebSocket connection.
+        Accept the WebSocket connection, using binary frames if the client offered them.
         """
 
-        await self._ws.accept()
+        self.binary = BINARY_SUBPROTOCOL in self._ws.scope.get("subprotocols", [])
+        await self._ws.accept(subprotocol=BINARY_SUBPROTOCOL if self.binary else None)
 
     async def close(self):
         """
@@ -68,7 +109,10 @@ class WebSocketManager:
         :param msg: the message to send
         """
 
-        await self._ws.send_json(msg.serialize())
+        if self.binary:
+            await self._ws.send_bytes(msg.to_frame())
+        else:
+            await self._ws.send_json(msg.serialize())
 
     async def receive(self) -> WebSocketMsg:
         """
@@ -77,4 +121,6 @@ class WebSocketManager:
         :return: the received message
         """
 
+        if self.binary:
+            return WebSocketMsg.from_frame(await self._ws.receive_bytes())
         return WebSocketMsg(**await self._ws.receive_json())